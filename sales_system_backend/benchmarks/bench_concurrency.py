@@ -0,0 +1,152 @@
+"""Mixed read/write load against SQLite: stock defaults vs the engine profile.
+
+Writer processes create sales invoices through ``src.services.invoicing``
+(stock, balance and daily summary updates included) while reader processes
+run the dashboard aggregates, all on one database file as separate
+gunicorn workers would. For each profile the script reports write
+throughput, failed writes (``database is locked`` after retries) and read
+latency percentiles.
+
+    python benchmarks/bench_concurrency.py --writers 4 --readers 4 --seconds 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import multiprocessing
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func
+from src.models.user import db, User
+from src.models.inventory import Product, Customer
+from src.models.invoices import SalesInvoice
+from src.models.operations import DailySummary
+from src.migrations import upgrade
+from src.services import invoicing
+# مستمعو الأحداث نفسها التي يعمل بها التطبيق (أرقام الأجيال وسجلات الحذف)
+from src.services import generations, sync  # noqa: F401
+from src import engine
+
+def make_app(path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    if tuned:
+        engine.configure(app)
+    else:
+        app.config['SQLITE_PRAGMAS'] = {}
+    db.init_app(app)
+    engine.init_app(app)
+    return app
+
+def create_database(path, tuned):
+    app = make_app(path, tuned)
+    with app.app_context():
+        db.create_all()
+        upgrade()
+        user = User(username='bench', full_name='bench', role='admin')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.add_all([Product(name=f'منتج {i}', stock_quantity=10 ** 6) for i in range(200)])
+        db.session.add_all([Customer(name=f'زبون {i}') for i in range(20)])
+        db.session.commit()
+        journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        user_id = user.id
+        db.engine.dispose()
+    return user_id, journal
+
+def writer(path, tuned, user_id, start_at, seconds, index, results):
+    app = make_app(path, tuned)
+    done = failed = 0
+    with app.app_context():
+        time.sleep(max(0, start_at - time.time()))
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            payload = {
+                'customer_id': index % 20 + 1,
+                'payment_type': 'credit' if done % 2 else 'cash',
+                'items': [{'product_id': (done * 7 + n) % 200 + 1, 'quantity': 1, 'unit_price': 1000} for n in range(5)],
+            }
+            try:
+                invoicing.create_sales_invoice(payload, user_id)
+                done += 1
+            except Exception:
+                db.session.rollback()
+                failed += 1
+    results.put(('write', done, failed))
+
+def reader(path, tuned, start_at, seconds, interval, results):
+    app = make_app(path, tuned)
+    latencies = []
+    with app.app_context():
+        time.sleep(max(0, start_at - time.time()))
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            start = time.perf_counter()
+            db.session.query(func.sum(SalesInvoice.final_amount), func.count(SalesInvoice.id)).one()
+            db.session.query(func.sum(DailySummary.sales_total)).one()
+            db.session.commit()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(interval)
+    results.put(('read', latencies))
+
+def run(tuned, args):
+    path = tempfile.mktemp(suffix='.db')
+    user_id, journal = create_database(path, tuned)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    # كل العمليات تبدأ معاً بعد انتهاء تهيئتها
+    start_at = time.time() + 1
+    workers = [context.Process(target=writer, args=(path, tuned, user_id, start_at, args.seconds, i, results))
+               for i in range(args.writers)]
+    workers += [context.Process(target=reader, args=(path, tuned, start_at, args.seconds, args.read_interval / 1000, results))
+                for _ in range(args.readers)]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    writes = sum(result[1] for result in collected if result[0] == 'write')
+    failed = sum(result[2] for result in collected if result[0] == 'write')
+    latencies = sorted(latency for result in collected if result[0] == 'read' for latency in result[1])
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float('nan')
+    return {
+        'journal': journal,
+        'writes/s': writes / args.seconds,
+        'failed': failed,
+        'reads/s': len(latencies) / args.seconds,
+        'read p50 ms': percentile(0.50),
+        'read p95 ms': percentile(0.95),
+        'read p99 ms': percentile(0.99),
+        'read mean ms': statistics.mean(latencies) * 1000 if latencies else float('nan'),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--read-interval', type=float, default=5, help='ms between reads of each reader')
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s per profile, {os.cpu_count()} CPUs")
+    rows = [('sqlite defaults', run(False, args)), ('engine profile', run(True, args))]
+    keys = list(rows[0][1])
+    print(f"{'':<18}" + ''.join(f"{key:>14}" for key in keys))
+    for label, result in rows:
+        cells = ''.join(
+            f"{value:>14}" if isinstance(value, str) else f"{value:>14.2f}" if isinstance(value, float) else f"{value:>14}"
+            for value in (result[key] for key in keys)
+        )
+        print(f"{label:<18}{cells}")
+
+if __name__ == '__main__':
+    main()
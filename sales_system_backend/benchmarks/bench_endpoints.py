@@ -0,0 +1,198 @@
+"""Time the hot endpoints against a generated database and save the results.
+
+Each endpoint is called ``--repeat`` times after a warm-up, in process
+through the Flask test client, and its latency percentiles, SQL
+statement count and response size are written to a JSON file. Passing
+``--compare`` with an earlier file prints the change per endpoint and
+exits non-zero when any p50 got slower than ``--threshold`` or any
+endpoint runs more SQL statements than before.
+
+    python benchmarks/datagen.py --database /tmp/shop.db --scale 0.1
+    python benchmarks/bench_endpoints.py --database /tmp/shop.db --output before.json
+    ... change the code ...
+    python benchmarks/bench_endpoints.py --database /tmp/shop.db --compare before.json
+
+Invoice creation writes to the database; it runs last and only adds
+``--repeat`` invoices, so a file can be reused for many runs.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func
+
+def endpoints(sample):
+    """``[(name, method, url, payload)]`` for the endpoints worth tracking."""
+    return [
+        ('dashboard', 'GET', '/api/reports/dashboard', None),
+        ('sales chart week', 'GET', '/api/reports/sales-chart?period=week', None),
+        ('sales chart year', 'GET', '/api/reports/sales-chart?period=year', None),
+        ('top products', 'GET', '/api/reports/top-products?period=month', None),
+        ('cash flow month', 'GET', '/api/reports/cash-flow', None),
+        ('sales invoices page 1', 'GET', '/api/sales/invoices?per_page=20', None),
+        ('sales invoices deep page', 'GET', f"/api/sales/invoices?per_page=20&page={sample['middle_page']}", None),
+        ('sales invoices cursor', 'GET', '/api/sales/invoices?per_page=20&cursor=', None),
+        ('purchase invoices page 1', 'GET', '/api/purchases/invoices?per_page=20', None),
+        ('sales invoice detail', 'GET', f"/api/sales/invoices/{sample['invoice_id']}", None),
+        ('receipts page 1', 'GET', '/api/payment-receipts?per_page=20', None),
+        ('expenses page 1', 'GET', '/api/expenses?per_page=20', None),
+        ('search customer name', 'GET', f"/api/search?q={sample['customer_word']}", None),
+        ('search invoice number', 'GET', f"/api/search?q={sample['invoice_number']}", None),
+        ('catalog products', 'GET', '/api/products', None),
+        ('catalog categories', 'GET', '/api/categories', None),
+        ('catalog barcode', 'GET', f"/api/products/barcode/{sample['barcode']}", None),
+        ('customers', 'GET', '/api/customers', None),
+        ('low stock', 'GET', '/api/low-stock', None),
+        ('create sales invoice', 'POST', '/api/sales/invoices', {
+            'customer_id': sample['customer_id'],
+            'payment_type': 'credit',
+            'items': [{'product_id': product_id, 'quantity': 1, 'unit_price': 1000}
+                      for product_id in sample['product_ids']],
+        }),
+    ]
+
+def sample_values(app):
+    """Ids and search terms taken from the data, so any generated file works."""
+    from src.models.user import db
+    from src.models.inventory import Customer, Product
+    from src.models.invoices import SalesInvoice
+    with app.app_context():
+        invoice_count = db.session.query(func.count(SalesInvoice.id)).scalar()
+        if not invoice_count:
+            raise SystemExit('the database has no invoices; create it with benchmarks/datagen.py')
+        invoice = db.session.query(SalesInvoice).order_by(SalesInvoice.id).offset(invoice_count // 2).first()
+        customer = db.session.query(Customer).order_by(Customer.id).first()
+        products = db.session.query(Product.id, Product.barcode).order_by(Product.id).limit(5).all()
+        return {
+            'invoice_id': invoice.id,
+            'middle_page': max(1, invoice_count // 40),
+            'invoice_number': invoice.invoice_number,
+            'customer_id': customer.id,
+            'customer_word': customer.name.split()[-1],
+            'barcode': products[0].barcode or 'none',
+            'product_ids': [product.id for product in products],
+        }
+
+def run(app, repeat, warmup):
+    from src.models.user import db
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    if response.status_code != 200:
+        raise SystemExit(f'login failed: {response.get_data(as_text=True)}')
+    headers = {'Authorization': f"Bearer {response.get_json()['access_token']}", 'Accept-Encoding': 'gzip'}
+
+    with app.app_context():
+        engine = db.engine
+    executed = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    event.listen(engine, 'before_cursor_execute', count)
+
+    results = {}
+    for name, method, url, payload in endpoints(sample_values(app)):
+        timings = []
+        statements = size = status = None
+        for iteration in range(warmup + repeat):
+            del executed[:]
+            started = time.perf_counter()
+            response = client.open(url, method=method, headers=headers, json=payload)
+            body = response.get_data()
+            elapsed = time.perf_counter() - started
+            if iteration >= warmup:
+                timings.append(elapsed * 1000)
+            statements, size, status = len(executed), len(body), response.status_code
+        timings.sort()
+        results[name] = {
+            'method': method,
+            'url': url,
+            'status': status,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'min_ms': round(timings[0], 3),
+            'sql_statements': statements,
+            'response_bytes': size,
+        }
+        print(f"{name:<26}{status:>5}{results[name]['p50_ms']:>10.2f}{results[name]['p95_ms']:>10.2f}"
+              f"{statements:>6}{size:>10}")
+    event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+def metadata(database, repeat):
+    try:
+        revision = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                                  text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        revision = ''
+    return {
+        'revision': revision or None,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'database': os.path.abspath(database),
+        'database_mb': round(os.path.getsize(database) / 2 ** 20, 1),
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'cpus': os.cpu_count(),
+    }
+
+def compare(previous, current, threshold):
+    """Print p50 changes; returns the names that regressed beyond ``threshold``."""
+    regressed = []
+    print(f"\n{'endpoint':<26}{'before':>10}{'after':>10}{'change':>9}{'sql':>9}")
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            print(f"{name:<26}{'-':>10}{result['p50_ms']:>10.2f}{'new':>9}")
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0
+        sql = f"{before['sql_statements']}->{result['sql_statements']}"
+        flag = ''
+        if change > threshold or result['sql_statements'] > before['sql_statements']:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<26}{before['p50_ms']:>10.2f}{result['p50_ms']:>10.2f}{change:>+9.0%}{sql:>9}{flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file made by benchmarks/datagen.py')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--output', help='JSON file to write (default: bench-<revision>.json)')
+    parser.add_argument('--compare', help='earlier results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 slowdown (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    from src.main import create_app
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}',
+        'SLOW_REQUEST_MS': float('inf'),
+    })
+    meta = metadata(args.database, args.repeat)
+    print(f"{'endpoint':<26}{'status':>5}{'p50 ms':>10}{'p95 ms':>10}{'sql':>6}{'bytes':>10}")
+    results = run(app, args.repeat, args.warmup)
+
+    output = args.output or f"bench-{meta['revision'] or 'local'}.json"
+    with open(output, 'w') as handle:
+        json.dump({'meta': meta, 'endpoints': results}, handle, ensure_ascii=False, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = json.load(handle)['endpoints']
+        regressed = compare(previous, results, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} regressions: {', '.join(regressed)}")
+            raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
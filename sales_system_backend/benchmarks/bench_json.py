@@ -0,0 +1,83 @@
+"""Compare the stock ``jsonify`` path with the fast JSON/compression layer.
+
+Builds catalog-sized payloads (products and customers with Arabic names),
+encodes them through Flask's default provider and through
+``src.responses.FastJSONProvider``, and reports encode time and bytes on
+the wire raw, gzipped and (when installed) brotli-compressed.
+
+    python benchmarks/bench_json.py --rows 5000 --repeat 20
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.responses import FastJSONProvider, brotli, orjson
+
+NAMES = ['أحمد', 'محمد', 'فاطمة', 'زينب', 'علي', 'حسين', 'مريم', 'نور']
+ITEMS = ['قميص قطني', 'بنطال جينز', 'حذاء رياضي', 'حقيبة جلدية', 'ساعة يد', 'عطر']
+
+def products_payload(rows, rng):
+    return {'products': [{
+        'id': i,
+        'name': f'{rng.choice(ITEMS)} {i}',
+        'description': 'منتج أصلي بجودة عالية',
+        'purchase_price': round(rng.uniform(1000, 50000), 2),
+        'selling_price': round(rng.uniform(1500, 75000), 2),
+        'stock_quantity': rng.randint(0, 500),
+        'unit': 'قطعة',
+        'category_id': rng.randint(1, 20),
+        'category_name': f'فئة {rng.randint(1, 20)}'
+    } for i in range(1, rows + 1)]}
+
+def customers_payload(rows, rng):
+    return {'customers': [{
+        'id': i,
+        'name': f'{rng.choice(NAMES)} {rng.choice(NAMES)}',
+        'phone': f'07{rng.randint(700000000, 899999999)}',
+        'email': '',
+        'address': 'البصرة - العشار',
+        'customer_type': rng.choice(['regular', 'agent']),
+        'balance': round(rng.uniform(0, 1000000), 2)
+    } for i in range(1, rows + 1)]}
+
+def measure(app, provider, payload, repeat):
+    app.json = provider
+    with app.app_context():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            body = provider.response(payload).get_data()
+        elapsed = (time.perf_counter() - start) / repeat
+    sizes = {'raw': len(body), 'gzip': len(gzip.compress(body, compresslevel=6))}
+    if brotli is not None:
+        sizes['br'] = len(brotli.compress(body, quality=5))
+    return elapsed, sizes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = [('jsonify (default)', DefaultJSONProvider(app)), ('fast provider', FastJSONProvider(app))]
+    print(f"orjson: {'yes' if orjson else 'no (stdlib fallback)'}, brotli: {'yes' if brotli else 'no'}")
+
+    for name, build in (('products', products_payload), ('customers', customers_payload)):
+        payload = build(args.rows, random.Random(args.seed))
+        print(f"\n{name}: {args.rows} rows")
+        print(f"{'path':<20}{'encode ms':>12}{'raw KB':>10}{'gzip KB':>10}{'br KB':>10}")
+        for label, provider in providers:
+            elapsed, sizes = measure(app, provider, payload, args.repeat)
+            br = f"{sizes['br'] / 1024:.1f}" if 'br' in sizes else '-'
+            print(f"{label:<20}{elapsed * 1000:>12.2f}{sizes['raw'] / 1024:>10.1f}{sizes['gzip'] / 1024:>10.1f}{br:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Worker startup time and memory for the WSGI entry point.
+
+Each sample is a fresh interpreter, as a gunicorn worker would be. The
+script reports import time, time to the first served request, resident
+memory after each step, and whether importing the app opened the
+database. The ``import + schema work`` row repeats what every worker used
+to do at import time (create_all, migrations, admin lookup) for
+comparison.
+
+    python benchmarks/bench_startup.py --samples 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+def child(mode, path):
+    """Runs inside the measured interpreter and prints one JSON line."""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from src.wsgi import app
+    imported = time.perf_counter()
+    result = {
+        'import ms': (imported - started) * 1000,
+        'rss after import MB': rss_mb(),
+        # SQLite ينشئ الملف عند أول اتصال؛ غيابه يعني أن الاستيراد لم يلمس القاعدة
+        'database opened': os.path.exists(path),
+    }
+    if mode == 'legacy':
+        from src.cli import prepare_database
+        with app.app_context():
+            prepare_database()
+        imported = time.perf_counter()
+        result['import ms'] = (imported - started) * 1000
+    else:
+        # القاعدة المجهزة مسبقاً بـ init-db توضع في مكانها قبل أول طلب
+        os.rename(path + '.ready', path)
+    response = app.test_client().post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    result['first request ms'] = (time.perf_counter() - imported) * 1000
+    result['rss after request MB'] = rss_mb()
+    result['max rss MB'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+def sample(mode, workdir, index):
+    path = os.path.join(workdir, f'{mode}-{index}.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}')
+    if mode == 'wsgi':
+        # تجهيز القاعدة مرة واحدة قبل تشغيل العمليات، كما في النشر الفعلي
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'src.wsgi', 'init-db'],
+                       cwd=ROOT, env=env, check=True, capture_output=True)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.rename(path, path + '.ready')
+    script = f"from benchmarks.bench_startup import child; child({mode!r}, {path!r})"
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = []
+        for label, mode in (('wsgi import', 'wsgi'), ('import + schema work', 'legacy')):
+            results = [sample(mode, workdir, i) for i in range(args.samples)]
+            rows.append((label, results))
+
+    keys = ['import ms', 'first request ms', 'rss after import MB', 'rss after request MB', 'max rss MB']
+    print(f"{args.samples} fresh interpreters per row, medians")
+    print(f"{'':<22}" + ''.join(f"{key:>22}" for key in keys) + f"{'database opened':>18}")
+    for label, results in rows:
+        cells = ''.join(f"{statistics.median(r[key] for r in results):>22.1f}" for key in keys)
+        opened = any(r['database opened'] for r in results)
+        print(f"{label:<22}{cells}{'yes' if opened else 'no':>18}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""Deterministic production-scale data for benchmarks.
+
+Fills every table with a few years of shop activity: at ``--scale 1``
+50k products, 20k customers, 400k sales invoices with 2M lines, purchase
+invoices, receipts, vouchers and daily expenses. The same ``--seed``,
+``--scale`` and ``--end-date`` always produce the same rows. Rows are
+written with chunked Core ``executemany`` inserts, then the daily
+summary rollup, the inventory ledger with its snapshots and the search
+index are rebuilt from them.
+
+    python benchmarks/datagen.py --database /tmp/shop.db --scale 0.1
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# الأحجام عند scale = 1
+VOLUMES = {
+    'users': 12,
+    'categories': 300,
+    'products': 50_000,
+    'customers': 20_000,
+    'suppliers': 1_000,
+    'sales_lines': 2_000_000,
+    'purchase_invoices': 25_000,
+    'receipts': 80_000,
+    'vouchers': 10_000,
+    'expenses_per_day': 3,
+}
+YEARS = 3
+CHUNK = 10_000
+# صفوف الأحجام الصغيرة لا تقل عن هذا حتى تبقى كل الصفحات ممتلئة
+MINIMUM = 20
+
+FIRST_NAMES = ['محمد', 'علي', 'حسين', 'أحمد', 'حسن', 'عباس', 'مصطفى', 'كرار', 'زينب', 'فاطمة',
+               'مريم', 'نور', 'سجاد', 'حيدر', 'جعفر', 'رقية', 'زهراء', 'يوسف', 'عمر', 'سارة']
+FAMILY_NAMES = ['الموسوي', 'الحسيني', 'البصري', 'العبادي', 'التميمي', 'الربيعي', 'الساعدي',
+                'الأسدي', 'الخفاجي', 'المالكي', 'الكعبي', 'الشمري', 'الجبوري', 'العطار']
+PRODUCT_WORDS = ['قميص', 'بنطلون', 'حذاء', 'حقيبة', 'ساعة', 'عطر', 'وشاح', 'قبعة', 'جاكيت', 'فستان',
+                 'حزام', 'نظارة', 'جوارب', 'بيجامة', 'معطف']
+PRODUCT_ADJECTIVES = ['رجالي', 'نسائي', 'أطفال', 'رياضي', 'كلاسيك', 'صيفي', 'شتوي', 'فاخر', 'قطني', 'جلد']
+COLORS = ['', '', '', 'أسود', 'أبيض', 'أحمر', 'أزرق', 'بيج', 'رمادي']
+EXPENSE_CATEGORIES = ['إيجار', 'كهرباء', 'رواتب', 'نقل', 'صيانة', 'ضيافة', 'عام']
+
+def scaled(name, scale):
+    return max(MINIMUM, int(VOLUMES[name] * scale))
+
+class Generator:
+    def __init__(self, connection, scale=1.0, seed=42, end=None, years=YEARS, progress=print):
+        self.connection = connection
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.end = end or date.today()
+        self.start = self.end - timedelta(days=365 * years)
+        self.days = (self.end - self.start).days + 1
+        self.progress = progress
+
+    # -- أدوات -------------------------------------------------------------
+
+    def insert(self, table, rows):
+        """Insert ``rows`` (any iterable of dicts) in chunks; returns the count."""
+        rows = iter(rows)
+        total = 0
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK))
+            if not chunk:
+                return total
+            self.connection.execute(table.insert(), chunk)
+            total += len(chunk)
+
+    def moment(self, day_offset=None):
+        """A timestamp in shop hours on a random (or the given) day of the range."""
+        if day_offset is None:
+            day_offset = self.rng.randrange(self.days)
+        day = self.start + timedelta(days=day_offset)
+        return datetime(day.year, day.month, day.day, self.rng.randint(9, 21),
+                        self.rng.randrange(60), self.rng.randrange(60))
+
+    def sorted_moments(self, count):
+        """``count`` timestamps in time order, denser in recent months."""
+        # مبيعات المتجر تنمو: احتمال اليوم يزداد نحو نهاية المدة
+        offsets = sorted(int(self.days * self.rng.random() ** 0.8) for _ in range(count))
+        return [self.moment(min(offset, self.days - 1)) for offset in offsets]
+
+    def price(self, low, high):
+        return round(self.rng.uniform(low, high) / 250) * 250
+
+    def phone(self):
+        return f"07{self.rng.choice('789')}{self.rng.randrange(10 ** 8):08d}"
+
+    def person(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(FIRST_NAMES)} {self.rng.choice(FAMILY_NAMES)}"
+
+    def weighted_picker(self, ids, skew):
+        """Pick from ``ids`` with popularity falling off as ``1 / rank ** skew``."""
+        order = list(ids)
+        self.rng.shuffle(order)
+        cumulative = list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(len(order))))
+        top = cumulative[-1]
+        rng = self.rng
+        return lambda: order[bisect.bisect(cumulative, rng.random() * top)]
+
+    # -- الجداول -----------------------------------------------------------
+
+    def run(self):
+        from src.models.user import User
+        from src.models.inventory import Category, Product, Customer, Supplier
+        from src.models.invoices import (SalesInvoice, SalesInvoiceItem, PurchaseInvoice,
+                                         PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher)
+        from src.models.operations import Expense
+        from werkzeug.security import generate_password_hash
+
+        created = datetime.combine(self.start, datetime.min.time())
+        counts = {}
+        def step(name, fn):
+            started = time.perf_counter()
+            count = fn()
+            counts[name] = count
+            self.progress(f"{name:<18} {count:>10,} rows  {time.perf_counter() - started:7.1f}s")
+
+        password_hash = generate_password_hash('cashier123')
+        # المستخدم 1 هو الأدمن الذي ينشئه init-db
+        user_ids = list(range(2, VOLUMES['users'] + 2))
+        step('users', lambda: self.insert(User.__table__, (
+            {'id': user_id, 'username': f'cashier{user_id}', 'password_hash': password_hash,
+             'full_name': self.person(), 'role': 'user', 'mobile_access': False,
+             'created_at': created, 'updated_at': created}
+            for user_id in user_ids
+        )))
+        pick_user = self.weighted_picker(user_ids, 0.5)
+
+        category_count = scaled('categories', self.scale)
+        step('categories', lambda: self.insert(Category.__table__, (
+            {'id': i, 'name': f"{self.rng.choice(PRODUCT_WORDS)} {self.rng.choice(PRODUCT_ADJECTIVES)} {i}",
+             'description': '', 'created_at': created, 'updated_at': created}
+            for i in range(1, category_count + 1)
+        )))
+
+        product_count = scaled('products', self.scale)
+        prices = {}
+        def products():
+            for i in range(1, product_count + 1):
+                purchase_price = self.price(1000, 100_000)
+                selling_price = round(purchase_price * self.rng.uniform(1.15, 1.6) / 250) * 250
+                prices[i] = (purchase_price, selling_price)
+                yield {
+                    'id': i,
+                    'name': f"{self.rng.choice(PRODUCT_WORDS)} {self.rng.choice(PRODUCT_ADJECTIVES)} {i}",
+                    'description': '',
+                    'barcode': f"62{i:011d}",
+                    'purchase_price': purchase_price,
+                    'selling_price': selling_price,
+                    'stock_quantity': self.rng.randint(0, 300),
+                    'min_stock': self.rng.choice((0, 5, 10, 20)),
+                    'unit': 'قطعة',
+                    'category_id': self.rng.randint(1, category_count),
+                    'created_at': created,
+                    'updated_at': created,
+                    'version': 1,
+                }
+        step('products', lambda: self.insert(Product.__table__, products()))
+        pick_product = self.weighted_picker(range(1, product_count + 1), 0.9)
+
+        # الأرصدة تُعرف بعد توليد الفواتير والسندات فتُحدَّث في النهاية
+        def parties(count, with_type):
+            for party_id in range(1, count + 1):
+                row = {'id': party_id, 'name': self.person(), 'phone': self.phone(), 'address': 'البصرة',
+                       'email': '', 'balance': 0.0, 'created_at': created, 'updated_at': created, 'version': 1}
+                if with_type:
+                    row['customer_type'] = 'agent' if self.rng.random() < 0.05 else 'regular'
+                yield row
+        customer_count = scaled('customers', self.scale)
+        customer_ids = range(1, customer_count + 1)
+        supplier_count = scaled('suppliers', self.scale)
+        supplier_ids = range(1, supplier_count + 1)
+        step('customers', lambda: self.insert(Customer.__table__, parties(customer_count, True)))
+        step('suppliers', lambda: self.insert(Supplier.__table__, parties(supplier_count, False)))
+        pick_customer = self.weighted_picker(customer_ids, 0.7)
+        pick_supplier = self.weighted_picker(supplier_ids, 0.7)
+
+        # -- المبيعات: الفواتير بترتيب زمني وبنود بمتوسط 5 لكل فاتورة
+        line_target = scaled('sales_lines', self.scale)
+        customer_balance = [0.0] * (customer_count + 1)
+        def sales():
+            invoice_id = line_id = 0
+            for moment in self.sorted_moments(line_target // 5):
+                invoice_id += 1
+                credit = self.rng.random() < 0.4
+                customer_id = pick_customer() if credit or self.rng.random() < 0.2 else None
+                lines = []
+                for _ in range(self.rng.choice((1, 2, 3, 4, 5, 5, 6, 7, 8, 9))):
+                    line_id += 1
+                    product_id = pick_product()
+                    quantity = self.rng.choice((1, 1, 1, 1, 2, 2, 3, 5))
+                    unit_price = prices[product_id][1]
+                    lines.append({'id': line_id, 'invoice_id': invoice_id, 'product_id': product_id,
+                                  'color': self.rng.choice(COLORS), 'quantity': quantity,
+                                  'unit_price': unit_price, 'total_price': quantity * unit_price})
+                total = sum(line['total_price'] for line in lines)
+                discount_percentage = self.rng.choice((0, 0, 0, 0, 0, 0, 0, 0, 5, 10))
+                discount = total * discount_percentage / 100
+                if credit:
+                    customer_balance[customer_id] += total - discount
+                yield {
+                    'id': invoice_id, 'invoice_number': f"S{invoice_id:06d}",
+                    'customer_id': customer_id,
+                    'customer_name': '' if customer_id else self.rng.choice(('', self.person())),
+                    'user_id': pick_user(), 'invoice_date': moment,
+                    'payment_type': 'credit' if credit else 'cash',
+                    'total_amount': total, 'discount_percentage': discount_percentage,
+                    'discount': discount, 'final_amount': total - discount,
+                    'status': 'completed', 'notes': '', 'created_at': moment,
+                }, lines
+        step('sales invoices', lambda: self.insert_documents(SalesInvoice.__table__, SalesInvoiceItem.__table__, sales()))
+
+        supplier_balance = [0.0] * (supplier_count + 1)
+        def purchases():
+            line_id = 0
+            for invoice_id, moment in enumerate(self.sorted_moments(scaled('purchase_invoices', self.scale)), 1):
+                credit = self.rng.random() < 0.6
+                supplier_id = pick_supplier()
+                lines = []
+                for _ in range(self.rng.randint(2, 14)):
+                    line_id += 1
+                    product_id = pick_product()
+                    quantity = self.rng.choice((6, 12, 12, 24, 48))
+                    unit_price = prices[product_id][0]
+                    lines.append({'id': line_id, 'invoice_id': invoice_id, 'product_id': product_id,
+                                  'color': self.rng.choice(COLORS), 'quantity': quantity,
+                                  'unit_price': unit_price, 'total_price': quantity * unit_price})
+                total = sum(line['total_price'] for line in lines)
+                if credit:
+                    supplier_balance[supplier_id] += total
+                yield {
+                    'id': invoice_id, 'invoice_number': f"P{invoice_id:06d}",
+                    'supplier_id': supplier_id, 'user_id': pick_user(), 'invoice_date': moment,
+                    'payment_type': 'credit' if credit else 'cash', 'total_amount': total,
+                    'discount_percentage': 0, 'discount': 0, 'final_amount': total,
+                    'status': 'completed', 'notes': '', 'created_at': moment,
+                }, lines
+        step('purchase invoices', lambda: self.insert_documents(PurchaseInvoice.__table__, PurchaseInvoiceItem.__table__, purchases()))
+
+        # -- السندات: تسدد جزءاً من الرصيد الآجل
+        def payments(count, balances, key, prefix, date_key):
+            debtors = [index for index, balance in enumerate(balances) if balance > 0]
+            if not debtors:
+                return
+            for payment_id, moment in enumerate(self.sorted_moments(count), 1):
+                party = self.rng.choice(debtors)
+                amount = max(1000, round(balances[party] * self.rng.uniform(0.05, 0.3) / 1000) * 1000)
+                balances[party] -= amount
+                yield {
+                    'id': payment_id, f'{prefix}_number': f"{prefix[0].upper()}{payment_id:06d}",
+                    key: party, 'user_id': pick_user(), 'amount': amount,
+                    date_key: moment, 'notes': '', 'created_at': moment,
+                }
+        step('receipts', lambda: self.insert(PaymentReceipt.__table__, payments(
+            scaled('receipts', self.scale), customer_balance, 'customer_id', 'receipt', 'receipt_date')))
+        step('vouchers', lambda: self.insert(PaymentVoucher.__table__, payments(
+            scaled('vouchers', self.scale), supplier_balance, 'supplier_id', 'voucher', 'voucher_date')))
+
+        self.set_balances(Customer.__table__, customer_balance)
+        self.set_balances(Supplier.__table__, supplier_balance)
+
+        def expenses():
+            for day_offset in range(self.days):
+                for _ in range(self.rng.randint(0, 2 * VOLUMES['expenses_per_day'])):
+                    moment = self.moment(day_offset)
+                    category = self.rng.choice(EXPENSE_CATEGORIES)
+                    yield {'description': f"{category} {moment:%Y-%m-%d}", 'amount': self.price(5000, 500_000),
+                           'category': category, 'expense_date': moment, 'user_id': pick_user(),
+                           'notes': '', 'created_at': moment}
+        step('expenses', lambda: self.insert(Expense.__table__, expenses()))
+        return counts
+
+    def set_balances(self, table, balances):
+        rows = [{'party_id': party_id, 'new_balance': balance}
+                for party_id, balance in enumerate(balances) if balance]
+        if rows:
+            self.connection.execute(
+                table.update().where(table.c.id == bindparam('party_id')).values(balance=bindparam('new_balance')),
+                rows
+            )
+
+    def insert_documents(self, invoice_table, item_table, documents):
+        """Insert ``(invoice, lines)`` pairs, chunked by invoice."""
+        total = 0
+        while True:
+            chunk = list(itertools.islice(documents, CHUNK // 5))
+            if not chunk:
+                return total
+            self.connection.execute(invoice_table.insert(), [invoice for invoice, _ in chunk])
+            self.connection.execute(item_table.insert(), [line for _, lines in chunk for line in lines])
+            total += len(chunk)
+
+def generate(app, scale=1.0, seed=42, end=None, progress=print):
+    """Prepare ``app``'s (empty) database and fill it; returns rows per table."""
+    from src.cli import prepare_database
+    from src.models.user import db
+    from src.services import daily_summary, search, stock_ledger
+
+    with app.app_context():
+        prepare_database()
+        with db.engine.begin() as connection:
+            counts = Generator(connection, scale, seed, end, progress=progress).run()
+        started = time.perf_counter()
+        daily_summary.rebuild()
+        progress(f"{'daily summary':<18} {'':>10}       {time.perf_counter() - started:7.1f}s")
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            movements, _ = stock_ledger.backfill(connection)
+        progress(f"{'stock ledger':<18} {movements:>10,} rows  {time.perf_counter() - started:7.1f}s")
+        if db.engine.dialect.name == 'sqlite':
+            started = time.perf_counter()
+            with db.engine.begin() as connection:
+                search.rebuild(connection)
+            progress(f"{'search index':<18} {'':>10}       {time.perf_counter() - started:7.1f}s")
+        db.session.remove()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file to create (must not exist)')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                        help='last day of generated activity (default: today)')
+    args = parser.parse_args()
+    if os.path.exists(args.database):
+        parser.error(f'{args.database} already exists')
+
+    from src.main import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}'})
+    started = time.perf_counter()
+    generate(app, args.scale, args.seed, args.end_date)
+    print(f"done in {time.perf_counter() - started:.1f}s, {os.path.getsize(args.database) / 2 ** 20:.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""Simulated shop day: concurrent cashiers and a polling admin over HTTP.
+
+Starts the app on a copy of a generated database (gunicorn when it is
+installed, otherwise the werkzeug server), or targets ``--url``. Each
+cashier logs in, loads the catalog, then loops: look up products by
+search or barcode, post a sales invoice, and now and then take a
+receipt from a customer. The admin polls the dashboard. At the end the
+script reports throughput, latency percentiles per operation, errors
+(``database is locked`` counted separately), and checks stock, balances,
+invoice count and the daily summary against what the clients were told.
+
+    python benchmarks/datagen.py --database /tmp/shop.db --scale 0.05
+    python benchmarks/load_test.py --database /tmp/shop.db --cashiers 8 --workers 4 --seconds 60
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+class Client:
+    """Minimal JSON client that records the latency of every call."""
+
+    def __init__(self, base_url, stats):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.token = None
+
+    def call(self, operation, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, data = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, data = error.code, error.read()
+        except (urllib.error.URLError, OSError) as error:
+            status, data = 0, str(error).encode()
+        self.stats.record(operation, time.perf_counter() - started, status, data)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def login(self, username, password):
+        status, data = self.call('login', 'POST', '/api/auth/login', {'username': username, 'password': password})
+        if status != 200:
+            raise RuntimeError(f'login failed for {username}: {status} {data}')
+        self.token = data['access_token']
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_errors = 0
+        # ما أكده الخادم للعملاء، للتحقق من القاعدة في النهاية
+        self.sold = defaultdict(float)
+        self.credit = defaultdict(float)
+        self.received = defaultdict(float)
+        self.invoices = 0
+        self.receipts = 0
+        self.sales_total = 0.0
+
+    def record(self, operation, seconds, status, data):
+        with self.lock:
+            self.latencies[operation].append(seconds * 1000)
+            if status >= 400 or status == 0:
+                self.errors[(operation, status)] += 1
+                if b'locked' in data:
+                    self.lock_errors += 1
+
+    def confirm_invoice(self, lines, customer_id, credit):
+        total = sum(line['quantity'] * line['unit_price'] for line in lines)
+        with self.lock:
+            self.invoices += 1
+            self.sales_total += total
+            for line in lines:
+                self.sold[line['product_id']] += line['quantity']
+            if credit:
+                self.credit[customer_id] += total
+
+    def confirm_receipt(self, customer_id, amount):
+        with self.lock:
+            self.receipts += 1
+            self.received[customer_id] += amount
+
+def cashier(index, args, users, stats, stop, start_barrier):
+    rng = random.Random(args.seed + index)
+    client = Client(args.url, stats)
+    username, password = users[index % len(users)]
+    start_barrier.wait()
+    client.login(username, password)
+    status, data = client.call('catalog', 'GET', '/api/products')
+    products = (data or {}).get('products') or []
+    status, data = client.call('customers', 'GET', '/api/customers')
+    customers = [customer['id'] for customer in (data or {}).get('customers') or []]
+    if not products or not customers:
+        raise RuntimeError('the database needs products and customers; create it with benchmarks/datagen.py')
+    # المنتجات الأكثر مبيعاً تمثلها أول الكتالوج بأوزان أعلى
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(products))]
+
+    while not stop.is_set():
+        basket = []
+        for _ in range(rng.choice((1, 1, 2, 3, 4, 5))):
+            product = rng.choices(products, weights)[0]
+            if product.get('barcode') and rng.random() < 0.6:
+                client.call('barcode lookup', 'GET', f"/api/products/barcode/{urllib.parse.quote(product['barcode'])}")
+            else:
+                word = product['name'].split()[0]
+                client.call('product search', 'GET', f"/api/search?types=product&limit=10&q={urllib.parse.quote(word)}")
+            basket.append({'product_id': product['id'], 'quantity': rng.choice((1, 1, 1, 2, 3)),
+                           'unit_price': product['selling_price'] or 1000})
+        credit = rng.random() < 0.3
+        customer_id = rng.choice(customers) if credit else None
+        payload = {'items': basket, 'payment_type': 'credit' if credit else 'cash'}
+        if customer_id:
+            payload['customer_id'] = customer_id
+        status, _ = client.call('create invoice', 'POST', '/api/sales/invoices', payload)
+        if status == 201:
+            stats.confirm_invoice(basket, customer_id, credit)
+
+        if rng.random() < 0.1:
+            customer_id = rng.choice(customers)
+            amount = rng.choice((5000, 10000, 25000))
+            status, _ = client.call('create receipt', 'POST', '/api/payment-receipts',
+                                    {'customer_id': customer_id, 'amount': amount})
+            if status == 201:
+                stats.confirm_receipt(customer_id, amount)
+        stop.wait(args.think_ms / 1000)
+
+def admin(args, stats, stop, start_barrier):
+    client = Client(args.url, stats)
+    start_barrier.wait()
+    client.login(args.admin_user, args.admin_password)
+    while not stop.is_set():
+        client.call('dashboard', 'GET', '/api/reports/dashboard')
+        stop.wait(args.poll_seconds)
+
+# -- الخادم --------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(database, workers, port):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+    try:
+        import gunicorn  # noqa: F401
+        command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', '4',
+                   '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'src.wsgi:app']
+        server = 'gunicorn'
+    except ImportError:
+        # werkzeug: عمليات منفصلة (fork) مثل gunicorn، أو خيوط عند عامل واحد
+        mode = f'processes={workers}' if workers > 1 else 'threaded=True'
+        command = [sys.executable, '-c',
+                   f"from werkzeug.serving import run_simple; from src.wsgi import app; "
+                   f"run_simple('127.0.0.1', {port}, app, {mode})"]
+        server = 'werkzeug'
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process, server
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(process.stderr.read().decode())
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('server did not start')
+
+# -- التحقق من الاتساق -----------------------------------------------------------
+
+def snapshot(app):
+    from sqlalchemy import func
+    from src.models.user import db, User
+    from src.models.inventory import Product, Customer
+    from src.models.invoices import SalesInvoice
+    from src.models.operations import DailySummary
+    with app.app_context():
+        state = {
+            'stock': dict(db.session.query(Product.id, Product.stock_quantity)),
+            'balance': dict(db.session.query(Customer.id, Customer.balance)),
+            'invoices': db.session.query(func.count(SalesInvoice.id)).scalar(),
+            'summary_sales': db.session.query(func.coalesce(func.sum(DailySummary.sales_total), 0)).scalar(),
+            'cashiers': [username for (username,) in db.session.query(User.username).filter(
+                User.role == 'user', User.username.like('cashier%')).order_by(User.id)],
+        }
+        db.session.remove()
+        return state
+
+def check_consistency(before, after, stats):
+    problems = []
+    for product_id, sold in stats.sold.items():
+        expected = before['stock'][product_id] - sold
+        if abs(after['stock'][product_id] - expected) > 1e-6:
+            problems.append(f"product {product_id}: stock {after['stock'][product_id]}, expected {expected}")
+    for customer_id in set(stats.credit) | set(stats.received):
+        expected = before['balance'][customer_id] + stats.credit[customer_id] - stats.received[customer_id]
+        if abs(after['balance'][customer_id] - expected) > 0.01:
+            problems.append(f"customer {customer_id}: balance {after['balance'][customer_id]}, expected {expected}")
+    new_invoices = after['invoices'] - before['invoices']
+    if new_invoices != stats.invoices:
+        problems.append(f"{new_invoices} invoices stored, clients were told {stats.invoices}")
+    summary_delta = after['summary_sales'] - before['summary_sales']
+    if abs(summary_delta - stats.sales_total) > 0.01:
+        problems.append(f"daily summary grew by {summary_delta}, invoices total {stats.sales_total}")
+    return problems
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='SQLite file from benchmarks/datagen.py (a copy is used)')
+    parser.add_argument('--url', help='target a server that is already running on --database instead')
+    parser.add_argument('--cashiers', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--think-ms', type=float, default=200, help='pause between a cashier\'s sales')
+    parser.add_argument('--poll-seconds', type=float, default=2, help='admin dashboard refresh interval')
+    parser.add_argument('--cashier-password', default='cashier123')
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    from src.main import create_app
+    workdir = None
+    database = os.path.abspath(args.database)
+    if not args.url:
+        workdir = tempfile.mkdtemp()
+        database = os.path.join(workdir, 'load.db')
+        shutil.copyfile(args.database, database)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    before = snapshot(app)
+    users = [(username, args.cashier_password) for username in before['cashiers']] or \
+            [(args.admin_user, args.admin_password)]
+
+    process = None
+    try:
+        if not args.url:
+            port = free_port()
+            process, server = start_server(database, args.workers, port)
+            args.url = f'http://127.0.0.1:{port}'
+            print(f"{server} with {args.workers} workers on {args.url}, database copy {database}")
+        print(f"{args.cashiers} cashiers, 1 admin, {args.seconds:g}s, {os.cpu_count()} CPUs")
+
+        stats = Stats()
+        stop = threading.Event()
+        start_barrier = threading.Barrier(args.cashiers + 2)
+        threads = [threading.Thread(target=cashier, args=(i, args, users, stats, stop, start_barrier))
+                   for i in range(args.cashiers)]
+        threads.append(threading.Thread(target=admin, args=(args, stats, stop, start_barrier)))
+        for thread in threads:
+            thread.start()
+        start_barrier.wait()
+        started = time.perf_counter()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"\n{'operation':<18}{'count':>8}{'per s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for operation, values in sorted(stats.latencies.items()):
+        values.sort()
+        print(f"{operation:<18}{len(values):>8}{len(values) / elapsed:>8.1f}{percentile(values, 0.5):>9.1f}"
+              f"{percentile(values, 0.95):>9.1f}{percentile(values, 0.99):>9.1f}{values[-1]:>9.1f}")
+    print(f"\ninvoices: {stats.invoices} ({stats.invoices / elapsed:.1f}/s), "
+          f"receipts: {stats.receipts}")
+    print(f"errors: {sum(stats.errors.values())}, database is locked: {stats.lock_errors}")
+    for (operation, status), count in sorted(stats.errors.items()):
+        print(f"  {operation} -> {status}: {count}")
+
+    problems = check_consistency(before, snapshot(app), stats)
+    print(f"consistency: {'OK' if not problems else f'{len(problems)} problems'}")
+    for problem in problems[:20]:
+        print(f"  {problem}")
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if problems or stats.lock_errors:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import click
+
+def seed_admin(username='admin', password='admin123', full_name='مدير النظام'):
+    """Create the admin user unless ``username`` already exists.
+
+    Returns the new user, or ``None`` when it was already there.
+    """
+    from src.models.user import db, User
+    if User.query.filter_by(username=username).first():
+        return None
+    admin_user = User(
+        username=username,
+        full_name=full_name,
+        role='admin',
+        mobile_access=True
+    )
+    admin_user.set_password(password)
+    db.session.add(admin_user)
+    db.session.commit()
+    return admin_user
+
+def prepare_database():
+    """Create missing tables, apply migrations and seed the default admin.
+
+    Returns ``(applied_migrations, created_admin)``.
+    """
+    from src.models.user import db
+    from src.migrations import upgrade
+    db.create_all()
+    return upgrade(), seed_admin()
+
+def register_commands(app):
+    """Attach the maintenance commands to ``app.cli``.
+
+    Run them with ``flask --app src.wsgi <command>``.
+    """
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create the schema, apply migrations and seed the default admin.
+
+        Run once per deployment, before starting the workers.
+        """
+        applied, admin_user = prepare_database()
+        for version, description in applied:
+            click.echo(f"{version:04d} {description}")
+        click.echo(f"تم تطبيق {len(applied)} ترحيل")
+        if admin_user:
+            click.echo("تم إنشاء مستخدم الأدمن الافتراضي: admin / admin123")
+
+    @app.cli.command('seed-admin')
+    @click.option('--username', default='admin', show_default=True)
+    @click.option('--password', prompt=True, hide_input=True, confirmation_prompt=True)
+    @click.option('--full-name', default='مدير النظام', show_default=True)
+    def seed_admin_command(username, password, full_name):
+        """Create an admin user if it does not exist yet."""
+        if seed_admin(username, password, full_name):
+            click.echo(f"تم إنشاء المستخدم {username}")
+        else:
+            click.echo(f"المستخدم {username} موجود مسبقاً")
+
+    @app.cli.command('rebuild-daily-summary')
+    def rebuild_daily_summary():
+        """Backfill the daily_summaries rollup from existing documents."""
+        from src.services.daily_summary import rebuild
+        days = rebuild()
+        click.echo(f"تم إعادة بناء الملخص اليومي: {days} يوم")
+
+    @app.cli.command('migrate-db')
+    def migrate_db():
+        """Apply pending schema migrations (indexes, new columns)."""
+        from src.migrations import upgrade
+        applied = upgrade()
+        for version, description in applied:
+            click.echo(f"{version:04d} {description}")
+        click.echo(f"تم تطبيق {len(applied)} ترحيل")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail unless every report query is answered through its index."""
+        from src.models.user import db
+        from src.services.query_plans import check_query_plans
+        if db.engine.dialect.name != 'sqlite':
+            click.echo(f"فحص خطط الاستعلام متاح لـ SQLite فقط (القاعدة الحالية {db.engine.dialect.name})")
+            return
+        failed = 0
+        for name, ok, plan in check_query_plans():
+            click.echo(f"[{'OK' if ok else 'FAIL'}] {name}")
+            for line in plan:
+                click.echo(f"       {line}")
+            failed += not ok
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command('check-query-budgets')
+    def check_query_budgets_command():
+        """Fail when a route exceeds its @query_budget or grows with the data."""
+        from src.services.query_budgets import check_query_budgets, SMALL_SCALE, LARGE_SCALE
+        failed = 0
+        click.echo(f"{'':<6}{'route':<48}{'budget':>7}{SMALL_SCALE:>7}{LARGE_SCALE:>7}")
+        for route, status, budget, small, large, problem in check_query_budgets():
+            counts = ''.join(f"{'-' if value is None else value:>7}" for value in (budget, small, large))
+            click.echo(f"[{status}]".ljust(6) + f"{route:<48}{counts}" + (f"  {problem}" if problem else ''))
+            failed += status == 'FAIL'
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Repopulate the FTS5 search index from the source tables."""
+        from src.models.user import db
+        from src.services import search
+        if db.engine.dialect.name != 'sqlite':
+            click.echo("فهرس FTS5 خاص بـ SQLite؛ البحث على هذه القاعدة يستخدم LIKE")
+            return
+        with db.engine.begin() as connection:
+            total = search.rebuild(connection)
+        click.echo(f"تم فهرسة {total} سجل")
+
+    @app.cli.command('import-data')
+    @click.argument('entity', type=click.Choice(['products', 'customers']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--mode', type=click.Choice(['insert', 'upsert']), default='insert', show_default=True)
+    @click.option('--dry-run', is_flag=True, help='Validate only, write nothing.')
+    @click.option('--no-create-categories', is_flag=True, help='Reject rows whose category does not exist.')
+    @click.option('--username', default='admin', show_default=True, help='User the stock movements are recorded under.')
+    def import_data(entity, path, mode, dry_run, no_create_categories, username):
+        """Bulk import products or customers from a CSV or XLSX file."""
+        from src.models.user import User
+        from src.services import imports
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f"المستخدم {username} غير موجود")
+        importer = imports.Importer(entity, mode=mode, create_categories=not no_create_categories, dry_run=dry_run,
+                                    user_id=user.id)
+        with open(path, 'rb') as handle:
+            try:
+                for progress in importer.run(imports.read_rows(handle, path.rsplit('.', 1)[-1].lower())):
+                    click.echo(f"{progress['rows']} صف: {progress['inserted']} جديد، "
+                               f"{progress['updated']} محدّث، {progress['failed']} خطأ")
+            except imports.ImportFileError as e:
+                raise click.ClickException(str(e))
+        for error in importer.errors[:50]:
+            click.echo(f"  سطر {error['row']}: {error['error']}")
+        if importer.failed > 50:
+            click.echo(f"  ... و {importer.failed - 50} خطأ آخر")
+        if dry_run:
+            click.echo("تجربة فقط: لم يُكتب شيء")
+
+    @app.cli.command('snapshot-stock')
+    @click.option('--at', 'moment', type=click.DateTime(formats=['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S']), default=None,
+                  help='Snapshot time (UTC, default: now).')
+    def snapshot_stock(moment):
+        """Snapshot the stock of the products that moved since their last snapshot.
+
+        Schedule it daily (cron) so point-in-time stock queries stay short.
+        """
+        from src.models.user import db
+        from src.services import stock_ledger
+        from datetime import datetime
+        if moment is not None and moment > datetime.utcnow():
+            # لقطة في المستقبل لا تشمل الحركات التي ستُسجَّل قبلها
+            raise click.ClickException("وقت اللقطة لا يمكن أن يكون في المستقبل")
+        with db.engine.begin() as connection:
+            written = stock_ledger.take_snapshot(connection, moment)
+        click.echo(f"تم حفظ لقطة مخزون لـ {written} منتج")
+
+    @app.cli.command('rebuild-stock-ledger')
+    def rebuild_stock_ledger():
+        """Write the ledger movements missing for existing invoices and stock."""
+        from src.models.user import db
+        from src.services import stock_ledger
+        with db.engine.begin() as connection:
+            written, snapshots = stock_ledger.backfill(connection)
+        click.echo(f"تمت إضافة {written} حركة مخزنية ولقطة لـ {snapshots} منتج")
+
+    @app.cli.command('prune-sync-tombstones')
+    def prune_sync_tombstones():
+        """Delete sync deletion records older than the retention window."""
+        from src.services.sync import prune_tombstones
+        click.echo(f"تم حذف {prune_tombstones()} سجل حذف قديم")
@@ -0,0 +1,97 @@
+"""Database engine profile: connection pool settings and SQLite pragmas.
+
+The database itself comes from ``DATABASE_URL`` (SQLite file by default,
+or ``postgresql://...``). Every value can be overridden through the
+environment; setting a pragma's variable to an empty string leaves
+SQLite's own default in place.
+"""
+from src.models.user import db
+from sqlalchemy import event
+import os
+import re
+
+# اسم المتغير البيئي والقيمة الافتراضية لكل pragma
+SQLITE_PRAGMAS = {
+    # WAL يسمح للقراءة بالاستمرار أثناء الكتابة بدل قفل القاعدة كاملة
+    'journal_mode': ('DB_JOURNAL_MODE', 'WAL'),
+    # مع WAL يكفي NORMAL: لا فقدان للبيانات عند تعطل التطبيق، و fsync أقل بكثير
+    'synchronous': ('DB_SYNCHRONOUS', 'NORMAL'),
+    # انتظار القفل بدل الفشل الفوري بـ database is locked
+    'busy_timeout': ('DB_BUSY_TIMEOUT_MS', '5000'),
+    'mmap_size': ('DB_MMAP_SIZE', str(256 * 1024 * 1024)),
+    # القيمة السالبة بالكيلوبايت: 32 ميغابايت لكل اتصال
+    'cache_size': ('DB_CACHE_SIZE', '-32000'),
+    'temp_store': ('DB_TEMP_STORE', 'MEMORY'),
+}
+
+_PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+def database_uri(default, env=None):
+    """``DATABASE_URL`` from the environment, or ``default`` when unset."""
+    env = os.environ if env is None else env
+    uri = env.get('DATABASE_URL') or default
+    # Heroku وغيرها تعطي postgres:// الذي لم يعد SQLAlchemy يقبله
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def sqlite_pragmas(env=None):
+    """Return ``{pragma: value}`` from the environment and the defaults above."""
+    env = os.environ if env is None else env
+    pragmas = {}
+    for name, (variable, default) in SQLITE_PRAGMAS.items():
+        value = env.get(variable, default)
+        if not value:
+            continue
+        if not _PRAGMA_VALUE.match(value):
+            raise ValueError(f"قيمة غير صالحة لـ {variable}: {value!r}")
+        pragmas[name] = value
+    return pragmas
+
+def engine_options(uri, env=None):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` suited to the database in ``uri``."""
+    env = os.environ if env is None else env
+    if uri.startswith('sqlite'):
+        if ':memory:' in uri or uri.rstrip('/') == 'sqlite:':
+            return {}
+        busy_timeout = int(env.get('DB_BUSY_TIMEOUT_MS') or SQLITE_PRAGMAS['busy_timeout'][1])
+        return {
+            'pool_size': int(env.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(env.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(env.get('DB_POOL_TIMEOUT', 30)),
+            'connect_args': {
+                'timeout': busy_timeout / 1000,
+                'check_same_thread': False,
+            },
+        }
+    return {
+        'pool_size': int(env.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(env.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(env.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(env.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+def install_pragmas(engine, pragmas):
+    """Run ``pragmas`` on every new SQLite connection of ``engine``."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+def configure(app, env=None):
+    """Fill in the engine options for ``app``; call before ``db.init_app``."""
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], env)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.config.setdefault('SQLITE_PRAGMAS', sqlite_pragmas(env))
+
+def init_app(app):
+    """Install the pragmas on the app's engine; call after ``db.init_app``."""
+    with app.app_context():
+        install_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
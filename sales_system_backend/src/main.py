@@ -9,77 +9,114 @@ from flask_jwt_extended import JWTManager
 from src.models.user import db
 from src.models.inventory import Category, Product, Customer, Supplier
 from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
-from src.models.operations import Expense, InventoryMovement, PreparationList
+from src.models.operations import Expense, InventoryMovement, PreparationList, DailySummary, SyncTombstone, TableGeneration, StockSnapshot
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.sales import sales_bp
 from src.routes.reports import reports_bp
 from src.routes.inventory import inventory_bp
+from src.routes.search import search_bp
+from src.routes.sync import sync_bp
+from src.routes.metrics import metrics_bp
+from src.routes.printing import print_bp
+from src.routes.exports import export_bp
+from src.routes.imports import import_bp
+from src.cli import register_commands
+from src.metrics import init_app as init_metrics
+from src.responses import init_app as init_responses
+from src.services.printing import init_app as init_printing
+from src.engine import database_uri, configure as configure_engine, init_app as install_pragmas
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-app.config['JWT_SECRET_KEY'] = 'jwt-secret-string-change-in-production'
-
-# بيانات الشركة
-app.config["COMPANY_NAME"] = "لوجيا LOGGIA"
-app.config["COMPANY_ADDRESS"] = "البصرة - التحسينية مقابل بصرة سنتر التحسينية"
-app.config["COMPANY_PHONE_1"] = "+964 786 089 5798"
-app.config["DEVELOPER_NAME"] = "احمد صفاء شعبان"
-app.config["DEVELOPER_PHONE_1"] = "07717555198"
-app.config["DEVELOPER_PHONE_2"] = "07838037021"
-
-# Enable CORS for all routes
-CORS(app, origins="*")
-
-# Initialize JWT
-jwt = JWTManager(app)
-
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(sales_bp, url_prefix='/api')
-app.register_blueprint(reports_bp, url_prefix='/api')
-app.register_blueprint(inventory_bp, url_prefix='/api')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-with app.app_context():
-    db.create_all()
-    
-    # Create default admin user if not exists
-    from src.models.user import User
-    admin_user = User.query.filter_by(username='admin').first()
-    if not admin_user:
-        admin_user = User(
-            username='admin',
-            full_name='مدير النظام',
-            role='admin',
-            mobile_access=True
-        )
-        admin_user.set_password('admin123')
-        db.session.add(admin_user)
-        db.session.commit()
-        print("تم إنشاء مستخدم الأدمن الافتراضي: admin / admin123")
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+def create_app(config=None):
+    """Build the Flask application without touching the database.
+
+    ``config`` is a mapping applied over the defaults, before the database
+    is configured. Schema creation, migrations and the default admin user
+    are handled by ``flask init-db`` (see ``src/cli.py``), not at startup.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string-change-in-production')
+    # هوية المستخدم في التوكن رقم (user.id) وليست نصاً كما يشترط PyJWT الحديث
+    app.config['JWT_VERIFY_SUB'] = False
+
+    # بيانات الشركة
+    app.config["COMPANY_NAME"] = "لوجيا LOGGIA"
+    app.config["COMPANY_ADDRESS"] = "البصرة - التحسينية مقابل بصرة سنتر التحسينية"
+    app.config["COMPANY_PHONE_1"] = "+964 786 089 5798"
+    app.config["DEVELOPER_NAME"] = "احمد صفاء شعبان"
+    app.config["DEVELOPER_PHONE_1"] = "07717555198"
+    app.config["DEVELOPER_PHONE_2"] = "07838037021"
+
+    # Database configuration: SQLite file by default, DATABASE_URL=postgresql://... for larger stores
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(DEFAULT_DATABASE_URI)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    if config:
+        app.config.update(config)
+
+    # Enable CORS for all routes
+    CORS(app, origins="*")
+
+    # زمن الاستجابة وعدد استعلامات SQL لكل endpoint، قبل الضغط ليقيس الحجم بعده
+    init_metrics(app)
+
+    # ترميز JSON السريع وضغط الاستجابات الكبيرة لكل الـ blueprints
+    init_responses(app)
+
+    # Initialize JWT
+    JWTManager(app)
+
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(sales_bp, url_prefix='/api')
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    app.register_blueprint(inventory_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(sync_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+    app.register_blueprint(print_bp, url_prefix='/api')
+    app.register_blueprint(export_bp, url_prefix='/api')
+    app.register_blueprint(import_bp, url_prefix='/api')
+
+    # قالب الطباعة يُترجم مرة واحدة ويبقى في ذاكرة Jinja؛ هنا فقط فلاتر المبالغ
+    init_printing(app)
+
+    # Maintenance commands (flask --app src.wsgi ...)
+    register_commands(app)
+
+    # WAL ومهلة الانتظار وإعدادات الـ pool (قابلة للتغيير بمتغيرات DB_*)
+    # إنشاء الـ engine لا يفتح أي اتصال؛ أول اتصال يحدث مع أول طلب
+    configure_engine(app)
+    db.init_app(app)
+    install_pragmas(app)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+                return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
+
+    return app
 
 
 if __name__ == '__main__':
+    # خادم التطوير: تجهيز القاعدة ثم التشغيل. في الإنتاج: flask init-db ثم gunicorn src.wsgi:app
+    from src.cli import prepare_database
+    app = create_app()
+    with app.app_context():
+        prepare_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
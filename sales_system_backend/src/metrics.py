@@ -0,0 +1,192 @@
+"""Per-request latency, SQL and response size metrics in Prometheus format.
+
+Every request is timed per endpoint; SQL statements executed while it
+runs are counted and timed through the engine cursor events. Requests
+slower than ``SLOW_REQUEST_MS`` are logged with their most expensive
+statements. Streamed responses (``/api/sync``) are timed until their
+headers are ready and have no size. Counters live in the worker process,
+so with several gunicorn workers each scrape reports the worker that
+served it. ``/api/metrics`` answers only local requests unless
+``METRICS_TOKEN`` is set, in which case it requires that Bearer token.
+"""
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import defaultdict
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# عدد الاستعلامات الأعلى كلفة التي تُكتب في سجل الطلبات البطيئة
+SLOW_LOG_STATEMENTS = 5
+
+class Histogram:
+    """Cumulative bucket counts, sum and count for one label set."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    """All metrics of this process, keyed by ``(endpoint, method)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}
+            self.statements = {}
+            self.response_size = {}
+            self.sql_seconds = defaultdict(float)
+            self.requests = defaultdict(int)
+
+    def record(self, endpoint, method, status, seconds, statements, sql_seconds, size):
+        key = (endpoint, method)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(statements)
+            if size is not None:
+                self.response_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(size)
+            self.sql_seconds[key] += sql_seconds
+            self.requests[key + (status,)] += 1
+
+    def render(self, extra=()):
+        """The registry in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _render_histogram(lines, 'http_request_duration_seconds',
+                              'Request latency by endpoint.', self.latency)
+            _render_histogram(lines, 'http_request_sql_statements',
+                              'SQL statements executed per request.', self.statements)
+            _render_histogram(lines, 'http_response_size_bytes',
+                              'Response body size (after compression).', self.response_size)
+            _render_counter(lines, 'http_request_sql_seconds_total',
+                            'Time spent in SQL statements.', self.sql_seconds, ('endpoint', 'method'))
+            _render_counter(lines, 'http_requests_total',
+                            'Requests by endpoint and status code.', self.requests, ('endpoint', 'method', 'status'))
+        for name, help_text, kind, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {_number(value)}']
+        return '\n'.join(lines) + '\n'
+
+def _labels(names, values):
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return ','.join(pairs)
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for key, histogram in sorted(histograms.items()):
+        labels = _labels(('endpoint', 'method'), key)
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+def _render_counter(lines, name, help_text, values, label_names):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for key, value in sorted(values.items()):
+        lines.append(f'{name}{{{_labels(label_names, key)}}} {_number(value)}')
+
+registry = Registry()
+
+# -- قياس استعلامات SQL ------------------------------------------------------
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context() and 'metrics_started' in g:
+        context.metrics_query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_query_start', None)
+    if started is None or not has_request_context() or 'metrics_started' not in g:
+        return
+    g.metrics_sql.append((statement, time.perf_counter() - started))
+
+# -- قياس الطلبات ------------------------------------------------------------
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql = []
+
+def _finish_request(status, size):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    statements = g.pop('metrics_sql', [])
+    sql_seconds = sum(duration for _, duration in statements)
+    endpoint = request.endpoint or 'unmatched'
+    registry.record(endpoint, request.method, status, seconds, len(statements), sql_seconds, size)
+    if seconds * 1000 >= current_app.config['SLOW_REQUEST_MS']:
+        _log_slow_request(seconds, status, statements, sql_seconds)
+
+_WHITESPACE = re.compile(r'\s+')
+
+def top_statements(statements, limit=SLOW_LOG_STATEMENTS):
+    """``[(statement, executions, seconds)]`` for the costliest distinct statements."""
+    totals = {}
+    for statement, duration in statements:
+        statement = _WHITESPACE.sub(' ', statement).strip()
+        executions, seconds = totals.get(statement, (0, 0.0))
+        totals[statement] = (executions + 1, seconds + duration)
+    ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+    return [(statement, executions, seconds) for statement, (executions, seconds) in ranked[:limit]]
+
+def _log_slow_request(seconds, status, statements, sql_seconds):
+    lines = [
+        f"slow request {request.method} {request.full_path.rstrip('?')} -> {status} "
+        f"in {seconds * 1000:.1f} ms ({len(statements)} SQL statements, {sql_seconds * 1000:.1f} ms in SQL)"
+    ]
+    for statement, executions, total in top_statements(statements):
+        lines.append(f"  {total * 1000:8.1f} ms  x{executions:<4} {statement[:300]}")
+    logger.warning('\n'.join(lines))
+
+def after_request(response):
+    size = None if response.is_streamed else response.calculate_content_length()
+    _finish_request(response.status_code, size)
+    return response
+
+def teardown_request(error):
+    # استثناء لم يُعالَج: لم يصل الطلب إلى after_request
+    if error is not None:
+        _finish_request(500, None)
+
+def init_app(app):
+    """Time every request of ``app``.
+
+    Call before ``responses.init_app`` so response sizes are measured
+    after compression.
+    """
+    app.config.setdefault('SLOW_REQUEST_MS', float(os.environ.get('SLOW_REQUEST_MS', 500)))
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    app.before_request(_start_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
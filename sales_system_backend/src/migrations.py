@@ -0,0 +1,150 @@
+from src.models.user import db
+from src.models.inventory import Category, Product, Customer, Supplier
+from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
+from src.models.operations import Expense, InventoryMovement, StockSnapshot
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+class SchemaMigration(db.Model):
+    """One row per migration already applied to this database."""
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register ``fn(connection)`` as schema migration number ``version``."""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+def add_columns(connection, table, *names):
+    """Add the named columns declared on ``table`` if the database lacks them.
+
+    New columns need a ``server_default`` when they are ``NOT NULL``.
+    """
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    for name in names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(connection.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        connection.execute(text(ddl))
+
+def create_indexes(connection, table, *names):
+    """Create the named indexes declared on ``table`` if they are missing."""
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+@migration(1, 'Indexes for report date ranges, foreign keys and invoice lines')
+def _report_indexes(connection):
+    create_indexes(connection, SalesInvoice.__table__,
+                   'ix_sales_invoices_created_at_payment_type',
+                   'ix_sales_invoices_customer_id',
+                   'ix_sales_invoices_user_id')
+    create_indexes(connection, PurchaseInvoice.__table__,
+                   'ix_purchase_invoices_created_at_payment_type',
+                   'ix_purchase_invoices_supplier_id',
+                   'ix_purchase_invoices_user_id')
+    create_indexes(connection, SalesInvoiceItem.__table__,
+                   'ix_sales_invoice_items_invoice_id_product_id',
+                   'ix_sales_invoice_items_product_id')
+    create_indexes(connection, PurchaseInvoiceItem.__table__,
+                   'ix_purchase_invoice_items_invoice_id_product_id',
+                   'ix_purchase_invoice_items_product_id')
+    create_indexes(connection, PaymentReceipt.__table__,
+                   'ix_payment_receipts_created_at',
+                   'ix_payment_receipts_customer_id',
+                   'ix_payment_receipts_user_id')
+    create_indexes(connection, PaymentVoucher.__table__,
+                   'ix_payment_vouchers_created_at',
+                   'ix_payment_vouchers_supplier_id',
+                   'ix_payment_vouchers_user_id')
+    create_indexes(connection, Expense.__table__,
+                   'ix_expenses_created_at',
+                   'ix_expenses_user_id')
+    create_indexes(connection, InventoryMovement.__table__,
+                   'ix_inventory_movements_product_id_created_at',
+                   'ix_inventory_movements_created_at',
+                   'ix_inventory_movements_user_id')
+    create_indexes(connection, Product.__table__, 'ix_products_category_id')
+
+@migration(2, 'FTS5 search index for customers, suppliers, products and invoices')
+def _search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        from src.services import search
+        search.rebuild(connection)
+
+@migration(3, 'Optimistic version columns on products, customers and suppliers')
+def _version_columns(connection):
+    for table in (Product.__table__, Customer.__table__, Supplier.__table__):
+        add_columns(connection, table, 'version')
+
+@migration(4, 'updated_at change tracking for sync, and offline invoice client_ref')
+def _sync_columns(connection):
+    for table in (Category.__table__, Product.__table__, Customer.__table__, Supplier.__table__):
+        add_columns(connection, table, 'updated_at')
+        connection.execute(text(
+            f"UPDATE {table.name} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+            f"WHERE updated_at IS NULL"
+        ))
+        create_indexes(connection, table, f'ix_{table.name}_updated_at')
+    add_columns(connection, SalesInvoice.__table__, 'client_ref')
+    create_indexes(connection, SalesInvoice.__table__, 'ix_sales_invoices_client_ref')
+
+@migration(5, 'Product barcode and min_stock columns')
+def _product_stock_columns(connection):
+    add_columns(connection, Product.__table__, 'barcode', 'min_stock')
+    create_indexes(connection, Product.__table__, 'ix_products_barcode')
+
+@migration(6, 'Inventory ledger backfill and stock snapshots')
+def _stock_ledger(connection):
+    from src.services import stock_ledger
+    StockSnapshot.__table__.create(connection, checkfirst=True)
+    create_indexes(connection, InventoryMovement.__table__, 'ix_inventory_movements_reference')
+    stock_ledger.backfill(connection)
+
+@migration(7, 'Party and date indexes for customer and supplier statements')
+def _statement_indexes(connection):
+    create_indexes(connection, SalesInvoice.__table__, 'ix_sales_invoices_customer_id_created_at')
+    create_indexes(connection, PaymentReceipt.__table__, 'ix_payment_receipts_customer_id_created_at')
+    create_indexes(connection, PurchaseInvoice.__table__, 'ix_purchase_invoices_supplier_id_created_at')
+    create_indexes(connection, PaymentVoucher.__table__, 'ix_payment_vouchers_supplier_id_created_at')
+
+@migration(8, 'Backfill the daily_summaries rollup behind the dashboard')
+def _daily_summary_backfill(connection):
+    from src.services import daily_summary
+    daily_summary.rebuild(connection)
+
+def pending():
+    """Return the registered migrations not yet applied, in version order."""
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.rollback()
+    return [entry for entry in sorted(MIGRATIONS, key=lambda m: m[0]) if entry[0] not in applied]
+
+def upgrade():
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the list of ``(version, description)`` pairs that were applied.
+    """
+    applied = []
+    for version, description, fn in pending():
+        with db.engine.begin() as connection:
+            fn(connection)
+            connection.execute(SchemaMigration.__table__.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append((version, description))
+    return applied
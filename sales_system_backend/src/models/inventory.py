@@ -8,6 +8,7 @@ class Category(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationship
     products = db.relationship('Product', backref='category', lazy=True)
@@ -17,7 +18,8 @@ class Category(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Product(db.Model):
@@ -30,9 +32,19 @@ class Product(db.Model):
     selling_price = db.Column(db.Float, nullable=False, default=0.0)
     stock_quantity = db.Column(db.Integer, nullable=False, default=0)
     unit = db.Column(db.String(50), nullable=False, default='قطعة')
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
+    barcode = db.Column(db.String(100), nullable=True, index=True)
+    # حد التنبيه لانخفاض المخزون
+    min_stock = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # رقم النسخة للتحقق المتفائل من التعارض بين العمليات المتزامنة
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    # اسم بديل يستخدمه نموذج إدارة المخزون
+    sale_price = db.synonym('selling_price')
 
     def to_dict(self):
         return {
@@ -43,6 +55,8 @@ class Product(db.Model):
             'selling_price': self.selling_price,
             'stock_quantity': self.stock_quantity,
             'unit': self.unit,
+            'barcode': self.barcode,
+            'min_stock': self.min_stock,
             'category_id': self.category_id,
             'category_name': self.category.name if self.category else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
@@ -62,6 +76,11 @@ class Customer(db.Model):
     # رصيد الديون للعميل
     balance = db.Column(db.Float, default=0.0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # رقم النسخة للتحقق المتفائل من التعارض بين العمليات المتزامنة
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
     
     # Relationships
     sales_invoices = db.relationship('SalesInvoice', backref='customer', lazy=True)
@@ -77,7 +96,8 @@ class Customer(db.Model):
             'email': self.email,
             'customer_type': self.customer_type,
             'balance': self.balance,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Supplier(db.Model):
@@ -91,6 +111,11 @@ class Supplier(db.Model):
     # رصيد الديون للمورد
     balance = db.Column(db.Float, default=0.0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # رقم النسخة للتحقق المتفائل من التعارض بين العمليات المتزامنة
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
     
     # Relationships
     purchase_invoices = db.relationship('PurchaseInvoice', backref='supplier', lazy=True)
@@ -105,5 +130,6 @@ class Supplier(db.Model):
             'address': self.address,
             'email': self.email,
             'balance': self.balance,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -3,13 +3,19 @@ from datetime import datetime
 
 class SalesInvoice(db.Model):
     __tablename__ = 'sales_invoices'
+    __table_args__ = (
+        db.Index('ix_sales_invoices_created_at_payment_type', 'created_at', 'payment_type'),
+        db.Index('ix_sales_invoices_client_ref', 'client_ref', unique=True),
+        # كشف حساب العميل: فواتيره بترتيب زمني
+        db.Index('ix_sales_invoices_customer_id_created_at', 'customer_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=True, index=True)
     # إضافة حقل اسم الزبون للمبيعات النقدية
     customer_name = db.Column(db.String(200), nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     invoice_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     payment_type = db.Column(db.String(20), nullable=False, default='cash')  # cash or credit
     total_amount = db.Column(db.Float, nullable=False, default=0.0)
@@ -20,6 +26,8 @@ class SalesInvoice(db.Model):
     status = db.Column(db.String(20), nullable=False, default='completed')
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # معرّف الفاتورة لدى الجهاز الذي أنشأها دون اتصال، يمنع تكرار رفعها
+    client_ref = db.Column(db.String(64), nullable=True)
     
     # Relationships
     items = db.relationship('SalesInvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
@@ -47,10 +55,13 @@ class SalesInvoice(db.Model):
 
 class SalesInvoiceItem(db.Model):
     __tablename__ = 'sales_invoice_items'
+    __table_args__ = (
+        db.Index('ix_sales_invoice_items_invoice_id_product_id', 'invoice_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey('sales_invoices.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     # إضافة حقل اللون
     color = db.Column(db.String(100), nullable=True)
     quantity = db.Column(db.Float, nullable=False)
@@ -74,11 +85,16 @@ class SalesInvoiceItem(db.Model):
 
 class PurchaseInvoice(db.Model):
     __tablename__ = 'purchase_invoices'
+    __table_args__ = (
+        db.Index('ix_purchase_invoices_created_at_payment_type', 'created_at', 'payment_type'),
+        # كشف حساب المورد: فواتيره بترتيب زمني
+        db.Index('ix_purchase_invoices_supplier_id_created_at', 'supplier_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
-    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     invoice_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     payment_type = db.Column(db.String(20), nullable=False, default='cash')  # cash or credit
     total_amount = db.Column(db.Float, nullable=False, default=0.0)
@@ -116,10 +132,13 @@ class PurchaseInvoice(db.Model):
 
 class PurchaseInvoiceItem(db.Model):
     __tablename__ = 'purchase_invoice_items'
+    __table_args__ = (
+        db.Index('ix_purchase_invoice_items_invoice_id_product_id', 'invoice_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey('purchase_invoices.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     # إضافة حقل اللون
     color = db.Column(db.String(100), nullable=True)
     quantity = db.Column(db.Float, nullable=False)
@@ -144,15 +163,18 @@ class PurchaseInvoiceItem(db.Model):
 # إضافة نموذج سندات القبض
 class PaymentReceipt(db.Model):
     __tablename__ = 'payment_receipts'
+    __table_args__ = (
+        db.Index('ix_payment_receipts_customer_id_created_at', 'customer_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     receipt_number = db.Column(db.String(50), unique=True, nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False, default=0.0)
     receipt_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     user = db.relationship('User', backref='payment_receipts')
@@ -174,15 +196,18 @@ class PaymentReceipt(db.Model):
 # إضافة نموذج سندات الدفع
 class PaymentVoucher(db.Model):
     __tablename__ = 'payment_vouchers'
+    __table_args__ = (
+        db.Index('ix_payment_vouchers_supplier_id_created_at', 'supplier_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     voucher_number = db.Column(db.String(50), unique=True, nullable=False)
-    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False, default=0.0)
     voucher_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     user = db.relationship('User', backref='payment_vouchers')
@@ -10,9 +10,9 @@ class Expense(db.Model):
     amount = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(100), nullable=False)
     expense_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     user = db.relationship('User', backref='expenses')
@@ -32,16 +32,21 @@ class Expense(db.Model):
 
 class InventoryMovement(db.Model):
     __tablename__ = 'inventory_movements'
+    __table_args__ = (
+        db.Index('ix_inventory_movements_product_id_created_at', 'product_id', 'created_at'),
+        db.Index('ix_inventory_movements_reference', 'reference_type', 'reference_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     movement_type = db.Column(db.String(20), nullable=False)  # in, out, adjustment
+    # موجبة لـ in و out، وبإشارتها (زيادة أو نقص) لـ adjustment
     quantity = db.Column(db.Float, nullable=False)
-    reference_type = db.Column(db.String(50))  # sale, purchase, adjustment
+    reference_type = db.Column(db.String(50))  # sale, purchase, adjustment, opening, import
     reference_id = db.Column(db.Integer)  # ID of the related invoice or adjustment
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     product = db.relationship('Product', backref='movements')
@@ -62,6 +67,26 @@ class InventoryMovement(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class StockSnapshot(db.Model):
+    """A product's stock as of ``taken_at``, the sum of its ledger up to then.
+
+    Written by ``src.services.stock_ledger.take_snapshot`` only for the
+    products that moved since their previous snapshot, so point-in-time
+    stock reads the nearest snapshot and the movements after it.
+    """
+    __tablename__ = 'stock_snapshots'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    taken_at = db.Column(db.DateTime, primary_key=True)
+    quantity = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'taken_at': self.taken_at.isoformat() if self.taken_at else None,
+            'quantity': self.quantity
+        }
+
 class PreparationList(db.Model):
     __tablename__ = 'preparation_lists'
     
@@ -105,3 +130,67 @@ class PreparationList(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
+class DailySummary(db.Model):
+    """Per-day rollup of sales, purchases and expenses used by the dashboard.
+
+    Rows are maintained incrementally by ``src.services.daily_summary`` in the
+    same transaction as the documents they summarize.
+    """
+    __tablename__ = 'daily_summaries'
+
+    day = db.Column(db.Date, primary_key=True)
+    sales_total = db.Column(db.Float, nullable=False, default=0.0)
+    sales_cash = db.Column(db.Float, nullable=False, default=0.0)
+    sales_credit = db.Column(db.Float, nullable=False, default=0.0)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    purchases_total = db.Column(db.Float, nullable=False, default=0.0)
+    purchases_cash = db.Column(db.Float, nullable=False, default=0.0)
+    purchases_credit = db.Column(db.Float, nullable=False, default=0.0)
+    purchases_count = db.Column(db.Integer, nullable=False, default=0)
+    expenses_total = db.Column(db.Float, nullable=False, default=0.0)
+    expenses_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'sales_total': self.sales_total,
+            'sales_cash': self.sales_cash,
+            'sales_credit': self.sales_credit,
+            'sales_count': self.sales_count,
+            'purchases_total': self.purchases_total,
+            'purchases_cash': self.purchases_cash,
+            'purchases_credit': self.purchases_credit,
+            'purchases_count': self.purchases_count,
+            'expenses_total': self.expenses_total,
+            'expenses_count': self.expenses_count
+        }
+
+class SyncTombstone(db.Model):
+    """Record of a deleted row, so sync clients can drop their local copy.
+
+    Written by ``src.services.sync`` whenever a synced model is deleted.
+    """
+    __tablename__ = 'sync_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)
+    ref_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'entity': self.entity,
+            'id': self.ref_id,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
+
+class TableGeneration(db.Model):
+    """Write counter per catalog table, used as the ETag of its list endpoints.
+
+    Bumped by ``src.services.generations`` in the same transaction as every
+    insert, update or delete on a tracked table.
+    """
+    __tablename__ = 'table_generations'
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
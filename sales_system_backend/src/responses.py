@@ -0,0 +1,116 @@
+"""JSON encoding and compression for every response the API sends.
+
+``init_app`` swaps Flask's JSON provider for one backed by orjson, when it
+is installed, and compresses large responses with brotli or gzip,
+whichever the client prefers.
+"""
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from datetime import date
+from decimal import Decimal
+import gzip
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - يعمل بدون orjson بالمكتبة القياسية
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# الاستجابات الأصغر من هذا لا تستحق كلفة الضغط
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/csv'}
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """``app.json`` provider that encodes with orjson and falls back to ``json``.
+
+    Both paths emit compact UTF-8 with sorted keys, so Arabic text is sent
+    as-is instead of ``\\uXXXX`` escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj):
+        if orjson is not None and not isinstance(obj, (str, bytes)):
+            try:
+                return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # أعداد أكبر من 64 بت وما شابه، نتركها للمكتبة القياسية
+                pass
+        return json.dumps(obj, default=_default, ensure_ascii=False, sort_keys=True,
+                          separators=(',', ':')).encode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+def _encoding_for(response):
+    """Pick ``br`` or ``gzip`` for ``response``, or None to send it as-is."""
+    if response.status_code != 200 or response.direct_passthrough:
+        return None
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES:
+        return None
+    if response.is_streamed:
+        # البث يُضغط بـ gzip أثناء الإرسال، وحجمه غير معروف مسبقاً
+        return request.accept_encodings.best_match(['gzip'])
+    if (response.content_length or 0) < COMPRESS_MIN_SIZE:
+        return None
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk if isinstance(chunk, bytes) else chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def compress(response):
+    response.vary.add('Accept-Encoding')
+    encoding = _encoding_for(response)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response)
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+
+    # كل ترميز تمثيل مختلف، فيأخذ وسمه الخاص حتى لا تخلط الوسائط بينها
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
+
+def matching_etag(etag):
+    """Return the tag from ``If-None-Match`` that names ``etag`` in any encoding."""
+    for candidate in (etag, f'{etag}-gzip', f'{etag}-br'):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+    app.after_request(compress)
@@ -1,11 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from src.models.user import db, User
+from src.services.query_budgets import query_budget
 from datetime import timedelta
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/login', methods=['POST'])
+@query_budget(1)
 def login():
     try:
         data = request.get_json()
@@ -35,6 +37,7 @@ def login():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/profile', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_profile():
     try:
@@ -50,6 +53,7 @@ def get_profile():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/change-password', methods=['POST'])
+@query_budget(2)
 @jwt_required()
 def change_password():
     try:
@@ -0,0 +1,50 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
+from src.services import exports
+from src.services.query_budgets import query_budget
+from datetime import date, datetime, time, timedelta
+
+export_bp = Blueprint('export', __name__)
+
+# تصدير الفواتير وبنودها والمصروفات والسندات وحركات المخزون (CSV أو Excel)
+# ?format=csv|xlsx&from=YYYY-MM-DD&to=YYYY-MM-DD ونفس فلاتر القوائم: search و product_id
+@export_bp.route('/export/<dataset>', methods=['GET'])
+@query_budget(1)
+@jwt_required()
+def export_dataset(dataset):
+    try:
+        if dataset not in exports.EXPORTS:
+            return jsonify({'error': 'نوع التصدير غير معروف'}), 404
+
+        file_format = request.args.get('format', 'csv')
+        if file_format not in exports.FORMATS:
+            return jsonify({'error': 'format يجب أن تكون csv أو xlsx'}), 400
+        if file_format == 'xlsx' and not exports.xlsx_available():
+            return jsonify({'error': 'تصدير Excel غير متاح على هذا الخادم (openpyxl غير مثبت)، استخدم csv'}), 400
+
+        try:
+            start_day = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end_day = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'error': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+
+        if start_day and end_day and start_day > end_day:
+            return jsonify({'error': 'تاريخ البداية يجب أن يسبق تاريخ النهاية'}), 400
+
+        query = exports.export_query(
+            dataset,
+            start=datetime.combine(start_day, time.min) if start_day else None,
+            end=datetime.combine(end_day + timedelta(days=1), time.min) if end_day else None,
+            search_term=request.args.get('search', ''),
+            product_id=request.args.get('product_id', type=int),
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    chunks = exports.csv_chunks if file_format == 'csv' else exports.xlsx_chunks
+    filename = f"{dataset}-{start_day or 'all'}-{end_day or date.today()}.{file_format}"
+    return Response(
+        stream_with_context(chunks(dataset, query)),
+        mimetype=exports.FORMATS[file_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,61 @@
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models.user import db
+from src.routes.user import require_admin
+from src.services import imports
+from itertools import chain
+
+import_bp = Blueprint('import', __name__)
+
+def _line(payload):
+    return current_app.json.dumps(payload) + '\n'
+
+@import_bp.route('/import/<entity>', methods=['POST'])
+@jwt_required()
+def import_file(entity):
+    """Import products or customers from an uploaded CSV/XLSX ``file``.
+
+    Options (query string or form): ``mode=insert|upsert``,
+    ``dry_run=1`` to validate only, ``create_categories=0`` to reject
+    unknown categories. The response is NDJSON: a ``progress`` line per
+    chunk of rows, then ``done`` with the totals and the row errors.
+    """
+    admin_check = require_admin()
+    if admin_check:
+        return admin_check
+
+    if entity not in imports.ENTITIES:
+        return jsonify({'error': 'نوع الاستيراد غير معروف'}), 404
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'أرفق الملف في الحقل file'}), 400
+    options = request.values
+    file_format = options.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    try:
+        importer = imports.Importer(
+            entity,
+            mode=options.get('mode', 'insert'),
+            create_categories=options.get('create_categories', 1, type=int) == 1,
+            dry_run=options.get('dry_run', 0, type=int) == 1,
+            user_id=get_jwt_identity(),
+        )
+        rows = imports.read_rows(upload.stream, file_format)
+        # قراءة الرأس الآن حتى يُعاد خطأ الملف كاستجابة 400 قبل بدء البث
+        first = next(rows, None)
+    except imports.ImportFileError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'الملف يجب أن يكون بترميز UTF-8'}), 400
+
+    def generate():
+        try:
+            for progress in importer.run(chain([first] if first else [], rows)):
+                yield _line({'type': 'progress', **progress})
+        except Exception as e:
+            db.session.rollback()
+            yield _line({'type': 'error', 'error': str(e), **importer.progress()})
+            return
+        yield _line({'type': 'done', 'dry_run': importer.dry_run, **importer.progress(), 'errors': importer.errors})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -1,14 +1,21 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.user import db
+from src.models.user import db, User
 from src.models.inventory import Product, Category, Customer, Supplier
-from src.models.operations import InventoryMovement, PreparationList
-from datetime import datetime
+from src.models.operations import InventoryMovement, PreparationList, StockSnapshot
+from src.services.listing import list_query, paginate, page_size, encode_cursor, decode_cursor, InvalidCursor
+from src.serializers import projection
+from src.services import catalog_cache, generations, search as search_index, stock_ledger
+from src.services.transactions import retry_on_conflict
+from src.services.query_budgets import query_budget
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, or_, select
 
 inventory_bp = Blueprint('inventory', __name__)
 
 @inventory_bp.route('/products', methods=['GET'])
 @jwt_required()
+@generations.conditional(Product, Category)
 def get_products():
     try:
         page = request.args.get('page', 1, type=int)
@@ -16,9 +23,12 @@ def get_products():
         search = request.args.get('search', '')
         category_id = request.args.get('category_id', type=int)
         
-        query = Product.query
+        products_view = projection('product.inventory')
+        query = products_view.query()
         
-        if search:
+        if search and search_index.match_expression(search) and search_index.search_available():
+            query = query.filter(Product.id.in_(search_index.matching_ids('product', search)))
+        elif search:
             query = query.filter(Product.name.contains(search))
         
         if category_id:
@@ -29,21 +39,7 @@ def get_products():
         )
         
         return jsonify({
-            'products': [{
-                'id': product.id,
-                'name': product.name,
-                'description': product.description,
-                'barcode': product.barcode,
-                'category_id': product.category_id,
-                'category_name': product.category.name if product.category else None,
-                'sale_price': float(product.sale_price),
-                'purchase_price': float(product.purchase_price),
-                'stock_quantity': product.stock_quantity,
-                'min_stock': product.min_stock,
-                'unit': product.unit,
-                'is_low_stock': product.stock_quantity <= product.min_stock,
-                'created_at': product.created_at.isoformat()
-            } for product in products.items],
+            'products': products_view.rows(products.items),
             'total': products.total,
             'pages': products.pages,
             'current_page': page
@@ -52,6 +48,7 @@ def get_products():
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/products', methods=['POST'])
+@query_budget(6)
 @jwt_required()
 def create_product():
     try:
@@ -62,14 +59,18 @@ def create_product():
             description=data.get('description', ''),
             barcode=data.get('barcode'),
             category_id=data.get('category_id'),
-            sale_price=data.get('sale_price'),
-            purchase_price=data.get('purchase_price'),
+            sale_price=data.get('sale_price', 0),
+            purchase_price=data.get('purchase_price', 0),
             stock_quantity=data.get('stock_quantity', 0),
             min_stock=data.get('min_stock', 0),
             unit=data.get('unit', 'قطعة')
         )
         
         db.session.add(product)
+        db.session.flush()
+        # الكمية الأولية تُسجَّل كرصيد أول المدة حتى يطابق سجل المخزون الكمية
+        stock_ledger.record(db.session, {product.id: float(product.stock_quantity or 0)}, 'opening', None,
+                            get_jwt_identity(), adjustment=True, notes='رصيد أول المدة')
         db.session.commit()
         
         return jsonify({
@@ -82,34 +83,58 @@ def create_product():
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/products/<int:product_id>', methods=['PUT'])
+@query_budget(5)
 @jwt_required()
 def update_product(product_id):
     try:
-        product = Product.query.get_or_404(product_id)
-        data = request.get_json()
-        
-        product.name = data.get('name', product.name)
-        product.description = data.get('description', product.description)
-        product.barcode = data.get('barcode', product.barcode)
-        product.category_id = data.get('category_id', product.category_id)
-        product.sale_price = data.get('sale_price', product.sale_price)
-        product.purchase_price = data.get('purchase_price', product.purchase_price)
-        product.stock_quantity = data.get('stock_quantity', product.stock_quantity)
-        product.min_stock = data.get('min_stock', product.min_stock)
-        product.unit = data.get('unit', product.unit)
-        
-        db.session.commit()
+        product = _update_product(product_id, request.get_json(), get_jwt_identity())
+        if product is None:
+            return jsonify({'error': 'تم تعديل المنتج من مستخدم آخر، أعد تحميل البيانات'}), 409
         
-        return jsonify({'message': 'تم تحديث المنتج بنجاح'})
+        return jsonify({'message': 'تم تحديث المنتج بنجاح', 'version': product.version})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@retry_on_conflict()
+def _update_product(product_id, data, user_id):
+    """Apply ``data`` to the product; returns None on a client version mismatch.
+
+    A client that sends the ``version`` it loaded gets a 409 instead of
+    silently overwriting someone else's edit; without it the update is
+    retried against the fresh row when a concurrent write wins the race.
+    A changed ``stock_quantity`` is recorded as an adjustment movement.
+    """
+    product = Product.query.get_or_404(product_id)
+    if 'version' in data and data['version'] != product.version:
+        return None
+    
+    product.name = data.get('name', product.name)
+    product.description = data.get('description', product.description)
+    product.barcode = data.get('barcode', product.barcode)
+    product.category_id = data.get('category_id', product.category_id)
+    product.sale_price = data.get('sale_price', product.sale_price)
+    product.purchase_price = data.get('purchase_price', product.purchase_price)
+    old_stock = product.stock_quantity
+    product.stock_quantity = data.get('stock_quantity', product.stock_quantity)
+    product.min_stock = data.get('min_stock', product.min_stock)
+    product.unit = data.get('unit', product.unit)
+    
+    # فرق الجرد اليدوي يدخل سجل المخزون
+    stock_ledger.record(db.session, {product.id: float(product.stock_quantity or 0) - float(old_stock or 0)},
+                        'adjustment', None, user_id, adjustment=True, notes='تعديل يدوي')
+    db.session.commit()
+    return product
+
 @inventory_bp.route('/products/<int:product_id>', methods=['DELETE'])
+@query_budget(10)
 @jwt_required()
 def delete_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
+        # سجل المخزون ولقطاته خاصة بالمنتج فتُحذف معه
+        InventoryMovement.query.filter_by(product_id=product_id).delete(synchronize_session=False)
+        StockSnapshot.query.filter_by(product_id=product_id).delete(synchronize_session=False)
         db.session.delete(product)
         db.session.commit()
         
@@ -118,23 +143,41 @@ def delete_product(product_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@inventory_bp.route('/products/barcode/<barcode>', methods=['GET'])
+@query_budget(1)
+@jwt_required()
+def get_product_by_barcode(barcode):
+    try:
+        product = catalog_cache.get_cache().by_barcode(barcode)
+        if product is None:
+            return jsonify({'error': 'لا يوجد منتج بهذا الباركود'}), 404
+        return jsonify({'product': product})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/catalog/cache-stats', methods=['GET'])
+@query_budget(0)
+@jwt_required()
+def get_catalog_cache_stats():
+    try:
+        return jsonify(catalog_cache.get_cache().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @inventory_bp.route('/categories', methods=['GET'])
+@query_budget(4)
 @jwt_required()
+@generations.conditional(Category, Product)
 def get_categories():
     try:
-        categories = Category.query.order_by(Category.name).all()
         return jsonify({
-            'categories': [{
-                'id': category.id,
-                'name': category.name,
-                'description': category.description,
-                'products_count': len(category.products)
-            } for category in categories]
+            'categories': catalog_cache.get_cache().categories()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/categories', methods=['POST'])
+@query_budget(3)
 @jwt_required()
 def create_category():
     try:
@@ -158,21 +201,18 @@ def create_category():
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/inventory-movements', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_inventory_movements():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         product_id = request.args.get('product_id', type=int)
         
-        query = InventoryMovement.query
+        query = list_query(InventoryMovement, eager=[InventoryMovement.product, InventoryMovement.user])
         
         if product_id:
             query = query.filter(InventoryMovement.product_id == product_id)
         
-        movements = query.order_by(InventoryMovement.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        movements, meta = paginate(query, InventoryMovement, request.args, default_per_page=20)
         
         return jsonify({
             'movements': [{
@@ -186,11 +226,141 @@ def get_inventory_movements():
                 'notes': movement.notes,
                 'created_at': movement.created_at.isoformat(),
                 'user_name': movement.user.full_name if movement.user else None
-            } for movement in movements.items],
-            'total': movements.total,
-            'pages': movements.pages,
-            'current_page': page
+            } for movement in movements],
+            **meta
+        })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _day_arg(name):
+    """``?name=YYYY-MM-DD`` as a date, None when absent; ValueError when malformed."""
+    return date.fromisoformat(request.args[name]) if request.args.get(name) else None
+
+# المخزون في نهاية يوم (?date=YYYY-MM-DD) من أقرب لقطة قبله والحركات بعدها، مرتباً بالمعرف
+# ?after_id= للصفحة التالية، ويُحصر بـ product_id أو category_id
+@inventory_bp.route('/inventory/stock-at', methods=['GET'])
+@query_budget(1)
+@jwt_required()
+def get_stock_at():
+    try:
+        try:
+            day = _day_arg('date') or datetime.now().date()
+        except ValueError:
+            return jsonify({'error': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+        per_page = page_size(request.args, 100, limit=1000)
+        product_id = request.args.get('product_id', type=int)
+        category_id = request.args.get('category_id', type=int)
+        
+        query = stock_ledger.stock_at(
+            datetime.combine(day + timedelta(days=1), time.min), inclusive=False
+        ).add_columns(
+            Product.name, Product.barcode, Product.unit, Product.stock_quantity
+        ).where(Product.id > request.args.get('after_id', 0, type=int))
+        if product_id:
+            query = query.where(Product.id == product_id)
+        if category_id:
+            query = query.where(Product.category_id == category_id)
+        
+        rows = db.session.execute(query.order_by(Product.id).limit(per_page + 1)).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        
+        return jsonify({
+            'date': day.isoformat(),
+            'products': [{
+                'product_id': row.product_id,
+                'name': row.name,
+                'barcode': row.barcode,
+                'unit': row.unit,
+                'quantity': row.quantity,
+                'current_quantity': row.stock_quantity
+            } for row in rows],
+            'has_more': has_more,
+            'next_after_id': rows[-1].product_id if has_more else None
+        })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# حركات منتج من الأقدم للأحدث مع الرصيد بعد كل حركة (?from=&to=)
+# رصيد البداية من أقرب لقطة قبل from، و cursor الصفحة التالية يحمل الرصيد الجاري
+@inventory_bp.route('/products/<int:product_id>/stock-history', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def get_product_stock_history(product_id):
+    try:
+        try:
+            start_day, end_day = _day_arg('from'), _day_arg('to')
+        except ValueError:
+            return jsonify({'error': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+        if start_day and end_day and start_day > end_day:
+            return jsonify({'error': 'تاريخ البداية يجب أن يسبق تاريخ النهاية'}), 400
+        per_page = page_size(request.args, 50, limit=500)
+        start = datetime.combine(start_day, time.min) if start_day else None
+        
+        query = select(
+            InventoryMovement.id,
+            InventoryMovement.created_at,
+            InventoryMovement.movement_type,
+            InventoryMovement.quantity,
+            stock_ledger.signed_quantity().label('change'),
+            InventoryMovement.reference_type,
+            InventoryMovement.reference_id,
+            InventoryMovement.notes,
+            User.full_name.label('user_name')
+        ).outerjoin(User, InventoryMovement.user_id == User.id).where(InventoryMovement.product_id == product_id)
+        if start:
+            query = query.where(InventoryMovement.created_at >= start)
+        if end_day:
+            query = query.where(InventoryMovement.created_at < datetime.combine(end_day + timedelta(days=1), time.min))
+        
+        opening = None
+        if request.args.get('cursor'):
+            created_at, row_id, balance = decode_cursor(request.args['cursor'], with_balance=True)
+            query = query.where(or_(
+                InventoryMovement.created_at > created_at,
+                and_(InventoryMovement.created_at == created_at, InventoryMovement.id > row_id)
+            ))
+        else:
+            row = db.session.execute(
+                stock_ledger.stock_at(start or stock_ledger.BEGINNING, inclusive=False).where(Product.id == product_id)
+            ).first()
+            if row is None:
+                return jsonify({'error': 'المنتج غير موجود'}), 404
+            balance = opening = row.quantity
+        
+        rows = db.session.execute(
+            query.order_by(InventoryMovement.created_at, InventoryMovement.id).limit(per_page + 1)
+        ).all()
+        has_more = len(rows) > per_page
+        movements = []
+        for row in rows[:per_page]:
+            balance += row.change
+            movements.append({
+                'id': row.id,
+                'created_at': row.created_at.isoformat(),
+                'movement_type': row.movement_type,
+                'quantity': row.quantity,
+                'reference_type': row.reference_type,
+                'reference_id': row.reference_id,
+                'notes': row.notes,
+                'user_name': row.user_name,
+                'balance': balance
+            })
+        last = rows[per_page - 1] if has_more else None
+        
+        return jsonify({
+            'product_id': product_id,
+            'opening_quantity': opening,
+            'movements': movements,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(last.created_at, last.id, balance) if has_more else None
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -285,6 +455,7 @@ def get_preparation_list(list_id):
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/preparation-lists/<int:list_id>/status', methods=['PUT'])
+@query_budget(2)
 @jwt_required()
 def update_preparation_list_status(list_id):
     try:
@@ -320,22 +491,17 @@ def toggle_preparation_item(list_id, item_id):
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/low-stock', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_low_stock_products():
     try:
-        products = Product.query.filter(
+        low_stock_view = projection('product.low_stock')
+        products = low_stock_view.query().filter(
             Product.stock_quantity <= Product.min_stock
-        ).order_by(Product.stock_quantity).all()
+        ).order_by(Product.stock_quantity)
         
         return jsonify({
-            'products': [{
-                'id': product.id,
-                'name': product.name,
-                'stock_quantity': product.stock_quantity,
-                'min_stock': product.min_stock,
-                'unit': product.unit,
-                'category_name': product.category.name if product.category else None
-            } for product in products]
+            'products': low_stock_view.rows(products)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
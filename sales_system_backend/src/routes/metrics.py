@@ -0,0 +1,38 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from src.metrics import registry
+from src.services.catalog_cache import get_cache
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# عناوين الجهاز نفسه: بدون METRICS_TOKEN لا يُخدم غيرها
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics, closed by default.
+
+    Set ``METRICS_TOKEN`` and have the scraper send it as a Bearer token
+    (``authorization: {credentials: ...}`` in the Prometheus scrape
+    config). Without a token only a scraper on the same host is answered;
+    behind a reverse proxy on that host every request looks local, so set
+    the token there.
+    """
+    # Prometheus لا يحمل توكن JWT؛ عند ضبط METRICS_TOKEN يُطلب كـ Bearer
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'غير مصرح'}), 401
+    elif request.remote_addr not in LOOPBACK_ADDRESSES:
+        return jsonify({'error': 'غير موجود'}), 404
+    try:
+        cache = get_cache().stats()
+        extra = [
+            ('catalog_cache_hits_total', 'Catalog cache reads served from memory.', 'counter', cache['hits']),
+            ('catalog_cache_misses_total', 'Catalog cache reads that reloaded rows.', 'counter', cache['misses']),
+            ('catalog_cache_rows_loaded_total', 'Rows loaded into the catalog cache.', 'counter', cache['rows_loaded']),
+            ('catalog_cache_products', 'Products held in the catalog cache.', 'gauge', cache['products']),
+        ]
+        return Response(registry.render(extra), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,73 @@
+from flask import Blueprint, request, jsonify, render_template, stream_template
+from flask_jwt_extended import jwt_required
+from src.services import printing
+from src.services.query_budgets import query_budget
+from datetime import date, datetime, time, timedelta
+
+print_bp = Blueprint('print', __name__)
+
+def _context(kind, documents):
+    return {
+        'spec': printing.DOCUMENT_TYPES[kind],
+        'documents': documents,
+        'min_rows': printing.MIN_ROWS,
+        'auto_print': request.args.get('print', type=int) == 1,
+    }
+
+# طباعة مستند واحد (فاتورة مبيعات/مشتريات، سند قبض/صرف) بصيغة HTML جاهزة لورق A5
+@print_bp.route('/print/<kind>/<int:document_id>', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def print_document(kind, document_id):
+    try:
+        if kind not in printing.DOCUMENT_TYPES:
+            return jsonify({'error': 'نوع المستند غير معروف'}), 404
+
+        headers = printing.header_rows(kind, ids=[document_id])
+        if not headers:
+            return jsonify({'error': 'المستند غير موجود'}), 404
+
+        return render_template(printing.TEMPLATE, **_context(kind, printing.documents(kind, headers)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# طباعة مجمّعة: كل مستندات فترة (?from=&to=) أو قائمة (?ids=1,2,3) في صفحة واحدة تُبث أثناء القراءة
+@print_bp.route('/print/<kind>', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def print_documents(kind):
+    try:
+        if kind not in printing.DOCUMENT_TYPES:
+            return jsonify({'error': 'نوع المستند غير معروف'}), 404
+
+        ids = None
+        if request.args.get('ids'):
+            try:
+                ids = [int(value) for value in request.args['ids'].split(',')]
+            except ValueError:
+                return jsonify({'error': 'ids يجب أن تكون أرقاماً مفصولة بفواصل'}), 400
+
+        # الافتراضي: مستندات اليوم
+        today = datetime.now().date()
+        try:
+            start_day = date.fromisoformat(request.args.get('from') or today.isoformat())
+            end_day = date.fromisoformat(request.args.get('to') or start_day.isoformat())
+        except ValueError:
+            return jsonify({'error': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+
+        if start_day > end_day:
+            return jsonify({'error': 'تاريخ البداية يجب أن يسبق تاريخ النهاية'}), 400
+
+        if ids is not None:
+            headers = printing.header_rows(kind, ids=ids)
+        else:
+            headers = printing.header_rows(kind, start=datetime.combine(start_day, time.min),
+                                           end=datetime.combine(end_day + timedelta(days=1), time.min))
+        if not headers:
+            return jsonify({'error': 'لا توجد مستندات للطباعة'}), 404
+
+        return stream_template(printing.TEMPLATE, **_context(kind, printing.documents(kind, headers)))
+    except printing.TooManyDocuments as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
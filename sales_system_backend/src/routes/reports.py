@@ -1,24 +1,24 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db
-from src.models.operations import Expense
-from src.models.invoices import SalesInvoice, PurchaseInvoice, SalesInvoiceItem, PurchaseInvoiceItem
+from src.models.operations import Expense, DailySummary
+from src.models.invoices import SalesInvoice, PurchaseInvoice, SalesInvoiceItem, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
 from src.models.inventory import Product
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_, extract
+from datetime import date, datetime, timedelta, time
+from sqlalchemy import func, and_, extract, case
+from src.services import daily_summary
+from src.services.dialects import day_of
+from src.services.listing import list_query, paginate, InvalidCursor
+from src.services.query_budgets import query_budget
 
 reports_bp = Blueprint('reports', __name__)
 
 @reports_bp.route('/expenses', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_expenses():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        expenses = Expense.query.order_by(Expense.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        expenses, meta = paginate(list_query(Expense, eager=[Expense.user]), Expense, request.args)
         
         return jsonify({
             'expenses': [{
@@ -28,15 +28,16 @@ def get_expenses():
                 'category': expense.category,
                 'created_at': expense.created_at.isoformat(),
                 'user_name': expense.user.full_name if expense.user else None
-            } for expense in expenses.items],
-            'total': expenses.total,
-            'pages': expenses.pages,
-            'current_page': page
+            } for expense in expenses],
+            **meta
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @reports_bp.route('/expenses', methods=['POST'])
+@query_budget(3)
 @jwt_required()
 def create_expense():
     try:
@@ -51,6 +52,8 @@ def create_expense():
         )
         
         db.session.add(expense)
+        db.session.flush()
+        daily_summary.record_expense(expense)
         db.session.commit()
         
         return jsonify({
@@ -63,10 +66,12 @@ def create_expense():
         return jsonify({'error': str(e)}), 500
 
 @reports_bp.route('/expenses/<int:expense_id>', methods=['DELETE'])
+@query_budget(3)
 @jwt_required()
 def delete_expense(expense_id):
     try:
         expense = Expense.query.get_or_404(expense_id)
+        daily_summary.record_expense(expense, sign=-1)
         db.session.delete(expense)
         db.session.commit()
         
@@ -76,6 +81,7 @@ def delete_expense(expense_id):
         return jsonify({'error': str(e)}), 500
 
 @reports_bp.route('/reports/dashboard', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_dashboard_stats():
     try:
@@ -84,66 +90,42 @@ def get_dashboard_stats():
         month_start = today.replace(day=1)
         year_start = today.replace(month=1, day=1)
         
-        # Sales stats
-        today_sales = db.session.query(func.sum(SalesInvoice.total_amount)).filter(
-            func.date(SalesInvoice.created_at) == today
-        ).scalar() or 0
-        
-        week_sales = db.session.query(func.sum(SalesInvoice.total_amount)).filter(
-            func.date(SalesInvoice.created_at) >= week_start
-        ).scalar() or 0
-        
-        month_sales = db.session.query(func.sum(SalesInvoice.total_amount)).filter(
-            func.date(SalesInvoice.created_at) >= month_start
-        ).scalar() or 0
-        
-        year_sales = db.session.query(func.sum(SalesInvoice.total_amount)).filter(
-            func.date(SalesInvoice.created_at) >= year_start
-        ).scalar() or 0
-        
-        # Purchase stats
-        today_purchases = db.session.query(func.sum(PurchaseInvoice.total_amount)).filter(
-            func.date(PurchaseInvoice.created_at) == today
-        ).scalar() or 0
-        
-        week_purchases = db.session.query(func.sum(PurchaseInvoice.total_amount)).filter(
-            func.date(PurchaseInvoice.created_at) >= week_start
-        ).scalar() or 0
-        
-        month_purchases = db.session.query(func.sum(PurchaseInvoice.total_amount)).filter(
-            func.date(PurchaseInvoice.created_at) >= month_start
-        ).scalar() or 0
-        
-        year_purchases = db.session.query(func.sum(PurchaseInvoice.total_amount)).filter(
-            func.date(PurchaseInvoice.created_at) >= year_start
-        ).scalar() or 0
-        
-        # Expense stats
-        today_expenses = db.session.query(func.sum(Expense.amount)).filter(
-            func.date(Expense.created_at) == today
-        ).scalar() or 0
-        
-        week_expenses = db.session.query(func.sum(Expense.amount)).filter(
-            func.date(Expense.created_at) >= week_start
-        ).scalar() or 0
-        
-        month_expenses = db.session.query(func.sum(Expense.amount)).filter(
-            func.date(Expense.created_at) >= month_start
-        ).scalar() or 0
-        
-        year_expenses = db.session.query(func.sum(Expense.amount)).filter(
-            func.date(Expense.created_at) >= year_start
-        ).scalar() or 0
+        periods = {
+            'today': DailySummary.day == today,
+            'week': DailySummary.day >= week_start,
+            'month': DailySummary.day >= month_start,
+            'year': DailySummary.day >= year_start
+        }
+        metrics = {
+            'sales': DailySummary.sales_total,
+            'purchases': DailySummary.purchases_total,
+            'expenses': DailySummary.expenses_total
+        }
+        
+        # كل الإحصائيات من جدول الملخص اليومي باستعلام واحد
+        columns = [
+            func.sum(case((condition, column), else_=0)).label(f'{metric}_{period}')
+            for metric, column in metrics.items()
+            for period, condition in periods.items()
+        ]
+        columns.append(func.sum(DailySummary.sales_count).label('sales_count'))
+        columns.append(func.sum(DailySummary.purchases_count).label('purchases_count'))
+        summary = db.session.query(*columns).one()._mapping
+        
+        stats = {
+            metric: {period: float(summary[f'{metric}_{period}'] or 0) for period in periods}
+            for metric in metrics
+        }
         
         # Profit calculations
-        today_profit = today_sales - today_purchases - today_expenses
-        week_profit = week_sales - week_purchases - week_expenses
-        month_profit = month_sales - month_purchases - month_expenses
-        year_profit = year_sales - year_purchases - year_expenses
+        stats['profit'] = {
+            period: stats['sales'][period] - stats['purchases'][period] - stats['expenses'][period]
+            for period in periods
+        }
         
         # Invoice counts
-        total_sales_invoices = SalesInvoice.query.count()
-        total_purchase_invoices = PurchaseInvoice.query.count()
+        total_sales_invoices = int(summary['sales_count'] or 0)
+        total_purchase_invoices = int(summary['purchases_count'] or 0)
         
         # Low stock products
         low_stock_products = Product.query.filter(
@@ -151,30 +133,7 @@ def get_dashboard_stats():
         ).count()
         
         return jsonify({
-            'sales': {
-                'today': float(today_sales),
-                'week': float(week_sales),
-                'month': float(month_sales),
-                'year': float(year_sales)
-            },
-            'purchases': {
-                'today': float(today_purchases),
-                'week': float(week_purchases),
-                'month': float(month_purchases),
-                'year': float(year_purchases)
-            },
-            'expenses': {
-                'today': float(today_expenses),
-                'week': float(week_expenses),
-                'month': float(month_expenses),
-                'year': float(year_expenses)
-            },
-            'profit': {
-                'today': float(today_profit),
-                'week': float(week_profit),
-                'month': float(month_profit),
-                'year': float(year_profit)
-            },
+            **stats,
             'counts': {
                 'sales_invoices': total_sales_invoices,
                 'purchase_invoices': total_purchase_invoices,
@@ -184,51 +143,83 @@ def get_dashboard_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def day_start(day):
+    """Midnight at the start of ``day``, for half-open ``[start, end)`` filters.
+
+    Comparing the raw ``created_at`` column against datetimes (instead of
+    wrapping it in ``func.date``) lets SQLite use the ``created_at`` indexes.
+    """
+    return datetime.combine(day, time.min)
+
+def in_range(column, start_day, end_day):
+    """``column`` falls on any day from ``start_day`` up to ``end_day`` inclusive."""
+    return and_(column >= day_start(start_day), column < day_start(end_day + timedelta(days=1)))
+
+def sales_by_day_query(start_day, end_day):
+    return db.session.query(
+        day_of(SalesInvoice.created_at).label('date'),
+        func.sum(SalesInvoice.total_amount).label('total')
+    ).filter(
+        in_range(SalesInvoice.created_at, start_day, end_day)
+    ).group_by(day_of(SalesInvoice.created_at))
+
+def sales_by_month_query(start_day, end_day):
+    return db.session.query(
+        extract('year', SalesInvoice.created_at).label('year'),
+        extract('month', SalesInvoice.created_at).label('month'),
+        func.sum(SalesInvoice.total_amount).label('total')
+    ).filter(
+        in_range(SalesInvoice.created_at, start_day, end_day)
+    ).group_by(
+        extract('year', SalesInvoice.created_at),
+        extract('month', SalesInvoice.created_at)
+    )
+
+def top_products_query(start_day, end_day, limit=10):
+    return db.session.query(
+        Product.name,
+        func.sum(SalesInvoiceItem.quantity).label('total_quantity'),
+        func.sum(SalesInvoiceItem.total_price).label('total_revenue')
+    ).select_from(
+        SalesInvoice
+    ).join(
+        SalesInvoiceItem, SalesInvoiceItem.invoice_id == SalesInvoice.id
+    ).join(
+        Product, Product.id == SalesInvoiceItem.product_id
+    ).filter(
+        in_range(SalesInvoice.created_at, start_day, end_day)
+    ).group_by(
+        Product.id, Product.name
+    ).order_by(
+        func.sum(SalesInvoiceItem.total_price).desc()
+    ).limit(limit)
+
 @reports_bp.route('/reports/sales-chart', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_sales_chart():
     try:
         period = request.args.get('period', 'week')  # week, month, year
+        today = datetime.now().date()
         
         if period == 'week':
             # Last 7 days
-            start_date = datetime.now().date() - timedelta(days=6)
-            sales_data = db.session.query(
-                func.date(SalesInvoice.created_at).label('date'),
-                func.sum(SalesInvoice.total_amount).label('total')
-            ).filter(
-                func.date(SalesInvoice.created_at) >= start_date
-            ).group_by(func.date(SalesInvoice.created_at)).all()
+            sales_data = sales_by_day_query(today - timedelta(days=6), today).all()
             
         elif period == 'month':
             # Last 30 days
-            start_date = datetime.now().date() - timedelta(days=29)
-            sales_data = db.session.query(
-                func.date(SalesInvoice.created_at).label('date'),
-                func.sum(SalesInvoice.total_amount).label('total')
-            ).filter(
-                func.date(SalesInvoice.created_at) >= start_date
-            ).group_by(func.date(SalesInvoice.created_at)).all()
+            sales_data = sales_by_day_query(today - timedelta(days=29), today).all()
             
         else:  # year
             # Last 12 months
-            start_date = datetime.now().replace(day=1) - timedelta(days=365)
-            sales_data = db.session.query(
-                extract('year', SalesInvoice.created_at).label('year'),
-                extract('month', SalesInvoice.created_at).label('month'),
-                func.sum(SalesInvoice.total_amount).label('total')
-            ).filter(
-                SalesInvoice.created_at >= start_date
-            ).group_by(
-                extract('year', SalesInvoice.created_at),
-                extract('month', SalesInvoice.created_at)
-            ).all()
+            start_day = today.replace(day=1) - timedelta(days=365)
+            sales_data = sales_by_month_query(start_day, today).all()
         
         chart_data = []
         if period in ['week', 'month']:
             for data in sales_data:
                 chart_data.append({
-                    'date': data.date.isoformat(),
+                    'date': data.date.isoformat() if hasattr(data.date, 'isoformat') else data.date,
                     'total': float(data.total or 0)
                 })
         else:
@@ -243,33 +234,21 @@ def get_sales_chart():
         return jsonify({'error': str(e)}), 500
 
 @reports_bp.route('/reports/top-products', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_top_products():
     try:
         period = request.args.get('period', 'month')  # week, month, year
+        today = datetime.now().date()
         
         if period == 'week':
-            start_date = datetime.now().date() - timedelta(days=6)
+            start_date = today - timedelta(days=6)
         elif period == 'month':
-            start_date = datetime.now().date() - timedelta(days=29)
+            start_date = today - timedelta(days=29)
         else:  # year
-            start_date = datetime.now().date() - timedelta(days=365)
+            start_date = today - timedelta(days=365)
         
-        top_products = db.session.query(
-            Product.name,
-            func.sum(SalesInvoiceItem.quantity).label('total_quantity'),
-            func.sum(SalesInvoiceItem.total_price).label('total_revenue')
-        ).join(
-            SalesInvoiceItem, Product.id == SalesInvoiceItem.product_id
-        ).join(
-            SalesInvoice, SalesInvoiceItem.invoice_id == SalesInvoice.id
-        ).filter(
-            func.date(SalesInvoice.created_at) >= start_date
-        ).group_by(
-            Product.id, Product.name
-        ).order_by(
-            func.sum(SalesInvoiceItem.total_price).desc()
-        ).limit(10).all()
+        top_products = top_products_query(start_date, today).all()
         
         return jsonify({
             'products': [{
@@ -281,49 +260,100 @@ def get_top_products():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+CASH_FLOW_GRANULARITIES = ('day', 'week', 'month')
+CASH_FLOW_MAX_DAYS = 3660
+
+def cash_flow_sources():
+    """(key, direction, amount column, created_at column, extra filters) per cash source."""
+    return [
+        ('sales', 'inflow', SalesInvoice.total_amount, SalesInvoice.created_at,
+         [SalesInvoice.payment_type == 'cash']),
+        ('receipts', 'inflow', PaymentReceipt.amount, PaymentReceipt.created_at, []),
+        ('purchases', 'outflow', PurchaseInvoice.total_amount, PurchaseInvoice.created_at,
+         [PurchaseInvoice.payment_type == 'cash']),
+        ('vouchers', 'outflow', PaymentVoucher.amount, PaymentVoucher.created_at, []),
+        ('expenses', 'outflow', Expense.amount, Expense.created_at, []),
+    ]
+
+def daily_totals_query(amount_column, created_at, start_day, end_day, *filters):
+    day = day_of(created_at)
+    return db.session.query(
+        day.label('day'),
+        func.sum(amount_column).label('total')
+    ).filter(
+        in_range(created_at, start_day, end_day), *filters
+    ).group_by(day)
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _bucket(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
 @reports_bp.route('/reports/cash-flow', methods=['GET'])
+@query_budget(5)
 @jwt_required()
 def get_cash_flow():
     try:
-        # Calculate cash flow for the current month
+        # الافتراضي: من بداية الشهر الحالي حتى اليوم
         today = datetime.now().date()
-        month_start = today.replace(day=1)
+        try:
+            start_day = date.fromisoformat(request.args.get('from') or today.replace(day=1).isoformat())
+            end_day = date.fromisoformat(request.args.get('to') or today.isoformat())
+        except ValueError:
+            return jsonify({'error': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+        
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in CASH_FLOW_GRANULARITIES:
+            return jsonify({'error': 'granularity يجب أن تكون day أو week أو month'}), 400
+        
+        if start_day > end_day:
+            return jsonify({'error': 'تاريخ البداية يجب أن يسبق تاريخ النهاية'}), 400
+        
+        if (end_day - start_day).days > CASH_FLOW_MAX_DAYS:
+            return jsonify({'error': 'الفترة المطلوبة طويلة جداً'}), 400
+        
+        # تهيئة كل الفترات بأصفار حتى تظهر الأيام التي لا حركة فيها
+        sources = cash_flow_sources()
+        buckets = {}
+        current_date = start_day
+        while current_date <= end_day:
+            buckets.setdefault(_bucket(current_date, granularity), dict.fromkeys(
+                [key for key, *_ in sources], 0.0
+            ))
+            current_date += timedelta(days=1)
         
-        # Daily cash flow for current month
-        cash_flow_data = []
-        current_date = month_start
+        # استعلام مجمّع واحد لكل مصدر نقدي
+        for key, direction, amount_column, created_at, filters in sources:
+            for row in daily_totals_query(amount_column, created_at, start_day, end_day, *filters):
+                buckets[_bucket(_as_date(row.day), granularity)][key] += float(row.total or 0)
         
-        while current_date <= today:
-            daily_sales = db.session.query(func.sum(SalesInvoice.total_amount)).filter(
-                and_(
-                    func.date(SalesInvoice.created_at) == current_date,
-                    SalesInvoice.payment_type == 'cash'
-                )
-            ).scalar() or 0
-            
-            daily_purchases = db.session.query(func.sum(PurchaseInvoice.total_amount)).filter(
-                and_(
-                    func.date(PurchaseInvoice.created_at) == current_date,
-                    PurchaseInvoice.payment_type == 'cash'
-                )
-            ).scalar() or 0
-            
-            daily_expenses = db.session.query(func.sum(Expense.amount)).filter(
-                func.date(Expense.created_at) == current_date
-            ).scalar() or 0
-            
-            net_cash_flow = daily_sales - daily_purchases - daily_expenses
-            
+        cash_flow_data = []
+        totals = {'inflow': 0.0, 'outflow': 0.0, 'net': 0.0}
+        for bucket_start, amounts in buckets.items():
+            inflow = sum(amounts[key] for key, direction, *_ in sources if direction == 'inflow')
+            outflow = sum(amounts[key] for key, direction, *_ in sources if direction == 'outflow')
             cash_flow_data.append({
-                'date': current_date.isoformat(),
-                'inflow': float(daily_sales),
-                'outflow': float(daily_purchases + daily_expenses),
-                'net': float(net_cash_flow)
+                'date': bucket_start.isoformat(),
+                'inflow': inflow,
+                'outflow': outflow,
+                'net': inflow - outflow,
+                **amounts
             })
-            
-            current_date += timedelta(days=1)
+            totals['inflow'] += inflow
+            totals['outflow'] += outflow
+            totals['net'] += inflow - outflow
         
-        return jsonify({'data': cash_flow_data})
+        return jsonify({
+            'from': start_day.isoformat(),
+            'to': end_day.isoformat(),
+            'granularity': granularity,
+            'totals': totals,
+            'data': cash_flow_data
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
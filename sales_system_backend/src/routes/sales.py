@@ -2,112 +2,46 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db, User
 from src.models.invoices import SalesInvoice, PurchaseInvoice, SalesInvoiceItem, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
-from src.models.inventory import Product, Customer, Supplier
-from datetime import datetime
+from src.models.inventory import Product, Category, Customer, Supplier
+from src.services import catalog_cache, generations, invoicing, search, statements
+from src.services.listing import list_query, paginate, page_size, encode_cursor, decode_cursor, InvalidCursor
+from src.serializers import projection
+from src.services.query_budgets import query_budget
+from datetime import date, datetime, time, timedelta
 
 sales_bp = Blueprint('sales', __name__)
 
 @sales_bp.route('/sales/invoices', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_sales_invoices():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
         # إضافة خيار البحث عن طريق اسم العميل أو رقم الفاتورة
         search_term = request.args.get('search', '')
         
-        query = SalesInvoice.query
+        invoices_view = projection('sales_invoice.list')
+        query = invoices_view.query()
         
         if search_term:
-            # البحث في رقم الفاتورة
-            if search_term.isdigit():
-                query = query.filter(SalesInvoice.invoice_number.like(f"%{search_term}%"))
-            else:
-                # البحث في اسم العميل (سواء كان مخزناً أو مدخلاً يدوياً)
-                customer_ids = [c.id for c in Customer.query.filter(Customer.name.like(f"%{search_term}%")).all()]
-                query = query.filter(
-                    (SalesInvoice.customer_id.in_(customer_ids)) | 
-                    (SalesInvoice.customer_name.like(f"%{search_term}%"))
-                )
+            query = search.filter_sales_invoices(query, search_term)
         
-        invoices = query.order_by(SalesInvoice.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        invoices, meta = paginate(query, SalesInvoice, request.args)
         
         return jsonify({
-            'invoices': [{
-                'id': invoice.id,
-                'invoice_number': invoice.invoice_number,
-                'customer_name': invoice.customer.name if invoice.customer else invoice.customer_name or 'عميل نقدي',
-                'total_amount': float(invoice.total_amount),
-                'payment_type': invoice.payment_type,
-                'status': invoice.status,
-                'created_at': invoice.created_at.isoformat(),
-                'items_count': len(invoice.items)
-            } for invoice in invoices.items],
-            'total': invoices.total,
-            'pages': invoices.pages,
-            'current_page': page
+            'invoices': invoices_view.rows(invoices),
+            **meta
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/sales/invoices', methods=['POST'])
+@query_budget(16)
 @jwt_required()
 def create_sales_invoice():
     try:
-        data = request.get_json()
-        user_id = get_jwt_identity()
-        
-        # Create invoice
-        invoice = SalesInvoice(
-            customer_id=data.get('customer_id'),
-            customer_name=data.get('customer_name', ''),  # اسم الزبون للمبيعات النقدية
-            user_id=user_id,
-            payment_type=data.get('payment_type', 'cash'),
-            notes=data.get('notes', ''),
-            discount_percentage=data.get('discount_percentage', 0),
-        )
-        
-        db.session.add(invoice)
-        db.session.flush()  # Get invoice ID
-        
-        # Generate invoice number
-        invoice.invoice_number = f"S{invoice.id:06d}"
-        
-        total_amount = 0
-        
-        # Add items
-        for item_data in data.get('items', []):
-            item = SalesInvoiceItem(
-                invoice_id=invoice.id,
-                product_id=item_data['product_id'],
-                color=item_data.get('color', ''),  # اللون المدخل يدوياً
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['quantity'] * item_data['unit_price']
-            )
-            db.session.add(item)
-            total_amount += item.total_price
-            
-            # Update product stock
-            product = Product.query.get(item_data['product_id'])
-            if product:
-                product.stock_quantity -= item_data['quantity']
-        
-        # Calculate discount and final total
-        invoice.total_amount = total_amount
-        invoice.discount = total_amount * (invoice.discount_percentage / 100)
-        invoice.final_amount = total_amount - invoice.discount
-        
-        # إذا كان الدفع آجل، أضف المبلغ إلى ديون العميل
-        if invoice.payment_type == 'credit' and invoice.customer_id:
-            customer = Customer.query.get(invoice.customer_id)
-            if customer:
-                customer.balance += invoice.final_amount
-        
-        db.session.commit()
+        invoice = invoicing.create_sales_invoice(request.get_json(), get_jwt_identity())
         
         return jsonify({
             'message': 'تم إنشاء فاتورة المبيعات بنجاح',
@@ -115,144 +49,66 @@ def create_sales_invoice():
             'invoice_number': invoice.invoice_number
         }), 201
         
+    except invoicing.InvoiceError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/sales/invoices/<int:invoice_id>', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_sales_invoice(invoice_id):
     try:
-        invoice = SalesInvoice.query.get_or_404(invoice_id)
+        invoice_view = projection('sales_invoice.detail')
+        row = invoice_view.query().filter(SalesInvoice.id == invoice_id).first()
+        if row is None:
+            return jsonify({'error': 'الفاتورة غير موجودة'}), 404
+        
+        items_view = projection('sales_invoice_item.detail')
+        items = items_view.query().filter(
+            SalesInvoiceItem.invoice_id == invoice_id
+        ).order_by(SalesInvoiceItem.id)
         
         return jsonify({
-            'id': invoice.id,
-            'invoice_number': invoice.invoice_number,
-            'customer': {
-                'id': invoice.customer.id if invoice.customer else None,
-                'name': invoice.customer.name if invoice.customer else invoice.customer_name or 'عميل نقدي',
-                'phone': invoice.customer.phone if invoice.customer else None
-            },
-            'payment_type': invoice.payment_type,
-            'status': invoice.status,
-            'total_amount': float(invoice.total_amount),
-            'discount_percentage': float(invoice.discount_percentage),
-            'discount': float(invoice.discount),
-            'final_amount': float(invoice.final_amount),
-            'notes': invoice.notes,
-            'created_at': invoice.created_at.isoformat(),
-            'items': [{
-                'id': item.id,
-                'product': {
-                    'id': item.product.id,
-                    'name': item.product.name,
-                },
-                'color': item.color,
-                'quantity': item.quantity,
-                'unit_price': float(item.unit_price),
-                'total_price': float(item.total_price)
-            } for item in invoice.items]
+            **invoice_view.row(row),
+            'items': items_view.rows(items)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/purchases/invoices', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_purchase_invoices():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
         # إضافة خيار البحث عن طريق اسم المورد أو رقم الفاتورة
         search_term = request.args.get('search', '')
         
-        query = PurchaseInvoice.query
+        invoices_view = projection('purchase_invoice.list')
+        query = invoices_view.query()
         
         if search_term:
-            # البحث في رقم الفاتورة
-            if search_term.isdigit():
-                query = query.filter(PurchaseInvoice.invoice_number.like(f"%{search_term}%"))
-            else:
-                # البحث في اسم المورد
-                supplier_ids = [s.id for s in Supplier.query.filter(Supplier.name.like(f"%{search_term}%")).all()]
-                query = query.filter(PurchaseInvoice.supplier_id.in_(supplier_ids))
+            query = search.filter_purchase_invoices(query, search_term)
         
-        invoices = query.order_by(PurchaseInvoice.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        invoices, meta = paginate(query, PurchaseInvoice, request.args)
         
         return jsonify({
-            'invoices': [{
-                'id': invoice.id,
-                'invoice_number': invoice.invoice_number,
-                'supplier_name': invoice.supplier.name if invoice.supplier else 'مورد نقدي',
-                'total_amount': float(invoice.total_amount),
-                'payment_type': invoice.payment_type,
-                'status': invoice.status,
-                'created_at': invoice.created_at.isoformat(),
-                'items_count': len(invoice.items)
-            } for invoice in invoices.items],
-            'total': invoices.total,
-            'pages': invoices.pages,
-            'current_page': page
+            'invoices': invoices_view.rows(invoices),
+            **meta
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/purchases/invoices', methods=['POST'])
+@query_budget(16)
 @jwt_required()
 def create_purchase_invoice():
     try:
-        data = request.get_json()
-        user_id = get_jwt_identity()
-        
-        # Create invoice
-        invoice = PurchaseInvoice(
-            supplier_id=data.get('supplier_id'),
-            user_id=user_id,
-            payment_type=data.get('payment_type', 'cash'),
-            notes=data.get('notes', ''),
-            discount_percentage=data.get('discount_percentage', 0),
-        )
-        
-        db.session.add(invoice)
-        db.session.flush()  # Get invoice ID
-        
-        # Generate invoice number
-        invoice.invoice_number = f"P{invoice.id:06d}"
-        
-        total_amount = 0
-        
-        # Add items
-        for item_data in data.get('items', []):
-            item = PurchaseInvoiceItem(
-                invoice_id=invoice.id,
-                product_id=item_data['product_id'],
-                color=item_data.get('color', ''),  # اللون المدخل يدوياً
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['quantity'] * item_data['unit_price']
-            )
-            db.session.add(item)
-            total_amount += item.total_price
-            
-            # Update product stock
-            product = Product.query.get(item_data['product_id'])
-            if product:
-                product.stock_quantity += item_data['quantity']
-        
-        # Calculate discount and final total
-        invoice.total_amount = total_amount
-        invoice.discount = total_amount * (invoice.discount_percentage / 100)
-        invoice.final_amount = total_amount - invoice.discount
-        
-        # إذا كان الدفع آجل، أضف المبلغ إلى ديون المورد
-        if invoice.payment_type == 'credit' and invoice.supplier_id:
-            supplier = Supplier.query.get(invoice.supplier_id)
-            if supplier:
-                supplier.balance += invoice.final_amount
-        
-        db.session.commit()
+        invoice = invoicing.create_purchase_invoice(request.get_json(), get_jwt_identity())
         
         return jsonify({
             'message': 'تم إنشاء فاتورة المشتريات بنجاح',
@@ -260,30 +116,28 @@ def create_purchase_invoice():
             'invoice_number': invoice.invoice_number
         }), 201
         
+    except invoicing.InvoiceError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/customers', methods=['GET'])
+@query_budget(2)
 @jwt_required()
+@generations.conditional(Customer)
 def get_customers():
     try:
-        customers = Customer.query.all()
+        customers_view = projection('customer.list')
         return jsonify({
-            'customers': [{
-                'id': customer.id,
-                'name': customer.name,
-                'phone': customer.phone,
-                'email': customer.email,
-                'address': customer.address,
-                'customer_type': customer.customer_type,
-                'balance': float(customer.balance)
-            } for customer in customers]
+            'customers': customers_view.rows(customers_view.query().order_by(Customer.id))
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/customers', methods=['POST'])
+@query_budget(5)
 @jwt_required()
 def create_customer():
     try:
@@ -310,157 +164,164 @@ def create_customer():
         return jsonify({'error': str(e)}), 500
 
 @sales_bp.route('/suppliers', methods=['GET'])
+@query_budget(2)
 @jwt_required()
+@generations.conditional(Supplier)
 def get_suppliers():
     try:
-        suppliers = Supplier.query.all()
+        suppliers_view = projection('supplier.list')
         return jsonify({
-            'suppliers': [{
-                'id': supplier.id,
-                'name': supplier.name,
-                'phone': supplier.phone,
-                'email': supplier.email,
-                'address': supplier.address,
-                'balance': float(supplier.balance)
-            } for supplier in suppliers]
+            'suppliers': suppliers_view.rows(suppliers_view.query().order_by(Supplier.id))
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _statement(kind, party_id):
+    """Statement page of account ``kind`` (see ``src/services/statements.py``).
+
+    ``?from=&to=`` (YYYY-MM-DD) bound the range, ``per_page`` the page
+    size; the first page carries the opening balance and the range
+    totals, ``next_cursor`` continues with the running balance.
+    """
+    account = statements.ACCOUNTS[kind]
+    try:
+        start_day = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end_day = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'صيغة التاريخ يجب أن تكون YYYY-MM-DD'}), 400
+    if start_day and end_day and start_day > end_day:
+        return jsonify({'error': 'تاريخ البداية يجب أن يسبق تاريخ النهاية'}), 400
+    start = datetime.combine(start_day, time.min) if start_day else None
+    end = datetime.combine(end_day + timedelta(days=1), time.min) if end_day else None
+    per_page = page_size(request.args, 50, limit=500)
+    
+    result = {f'{kind}_id': party_id}
+    after = None
+    if request.args.get('cursor'):
+        created_at, sequence, balance = decode_cursor(request.args['cursor'], with_balance=True)
+        after = (created_at, sequence)
+    else:
+        header = db.session.execute(statements.summary(account, party_id, start, end)).first()
+        if header is None:
+            return jsonify({'error': account.not_found}), 404
+        balance = header.opening
+        result.update({
+            f'{kind}_name': header.name,
+            'current_balance': header.balance,
+            'opening_balance': header.opening,
+            'total_debit': header.total_debit,
+            'total_credit': header.total_credit,
+            'closing_balance': header.opening + header.total_debit - header.total_credit
+        })
+    
+    rows = db.session.execute(statements.page(account, party_id, start, end, after, per_page + 1)).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    result['entries'] = [{
+        'type': row.kind,
+        'id': row.id,
+        'number': row.number,
+        'created_at': row.created_at.isoformat(),
+        'debit': row.debit,
+        'credit': row.credit,
+        'balance': balance + row.running,
+        'notes': row.notes
+    } for row in rows]
+    result['has_more'] = has_more
+    result['next_cursor'] = encode_cursor(rows[-1].created_at, rows[-1].sequence, balance + rows[-1].running) if has_more else None
+    return jsonify(result)
+
+# كشف حساب العميل: الفواتير الآجلة وسندات القبض مع الرصيد بعد كل حركة
+@sales_bp.route('/customers/<int:customer_id>/statement', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def get_customer_statement(customer_id):
+    try:
+        return _statement('customer', customer_id)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# كشف حساب المورد: فواتير الشراء الآجلة وسندات الصرف مع الرصيد بعد كل حركة
+@sales_bp.route('/suppliers/<int:supplier_id>/statement', methods=['GET'])
+@query_budget(2)
+@jwt_required()
+def get_supplier_statement(supplier_id):
+    try:
+        return _statement('supplier', supplier_id)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @sales_bp.route('/products', methods=['GET'])
+@query_budget(2)
 @jwt_required()
+@generations.conditional(Product, Category)
 def get_products():
     try:
-        products = Product.query.all()
+        # قائمة المنتجات تُقرأ من الذاكرة المؤقتة، وتُحدَّث عند تغيّر رقم الجيل
+        category_id = request.args.get('category_id', type=int)
         return jsonify({
-            'products': [{
-                'id': product.id,
-                'name': product.name,
-                'description': product.description,
-                'purchase_price': float(product.purchase_price),
-                'selling_price': float(product.selling_price),
-                'stock_quantity': product.stock_quantity,
-                'unit': product.unit,
-                'category_id': product.category_id,
-                'category_name': product.category.name if product.category else None
-            } for product in products]
+            'products': catalog_cache.get_cache().products(category_id)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # إضافة سندات القبض
 @sales_bp.route('/payment-receipts', methods=['POST'])
+@query_budget(5)
 @jwt_required()
 def create_payment_receipt():
     try:
-        data = request.get_json()
-        user_id = get_jwt_identity()
-        
-        customer_id = data.get('customer_id')
-        amount = float(data.get('amount', 0))
-        
-        if not customer_id:
-            return jsonify({'error': 'يجب تحديد العميل'}), 400
-            
-        if amount <= 0:
-            return jsonify({'error': 'يجب أن يكون المبلغ أكبر من صفر'}), 400
-        
-        # التحقق من وجود العميل
-        customer = Customer.query.get(customer_id)
-        if not customer:
+        receipt = invoicing.create_payment_receipt(request.get_json(), get_jwt_identity())
+        if receipt is None:
             return jsonify({'error': 'العميل غير موجود'}), 404
         
-        # إنشاء سند القبض
-        receipt = PaymentReceipt(
-            customer_id=customer_id,
-            user_id=user_id,
-            amount=amount,
-            notes=data.get('notes', '')
-        )
-        
-        db.session.add(receipt)
-        db.session.flush()  # للحصول على معرف السند
-        
-        # إنشاء رقم السند
-        receipt.receipt_number = f"R{receipt.id:06d}"
-        
-        # تحديث رصيد العميل
-        customer.balance -= amount
-        
-        db.session.commit()
-        
         return jsonify({
             'message': 'تم إنشاء سند القبض بنجاح',
             'receipt_id': receipt.id,
             'receipt_number': receipt.receipt_number
         }), 201
         
+    except invoicing.InvoiceError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # إضافة سندات الدفع
 @sales_bp.route('/payment-vouchers', methods=['POST'])
+@query_budget(5)
 @jwt_required()
 def create_payment_voucher():
     try:
-        data = request.get_json()
-        user_id = get_jwt_identity()
-        
-        supplier_id = data.get('supplier_id')
-        amount = float(data.get('amount', 0))
-        
-        if not supplier_id:
-            return jsonify({'error': 'يجب تحديد المورد'}), 400
-            
-        if amount <= 0:
-            return jsonify({'error': 'يجب أن يكون المبلغ أكبر من صفر'}), 400
-        
-        # التحقق من وجود المورد
-        supplier = Supplier.query.get(supplier_id)
-        if not supplier:
+        voucher = invoicing.create_payment_voucher(request.get_json(), get_jwt_identity())
+        if voucher is None:
             return jsonify({'error': 'المورد غير موجود'}), 404
         
-        # إنشاء سند الدفع
-        voucher = PaymentVoucher(
-            supplier_id=supplier_id,
-            user_id=user_id,
-            amount=amount,
-            notes=data.get('notes', '')
-        )
-        
-        db.session.add(voucher)
-        db.session.flush()  # للحصول على معرف السند
-        
-        # إنشاء رقم السند
-        voucher.voucher_number = f"V{voucher.id:06d}"
-        
-        # تحديث رصيد المورد
-        supplier.balance -= amount
-        
-        db.session.commit()
-        
         return jsonify({
             'message': 'تم إنشاء سند الدفع بنجاح',
             'voucher_id': voucher.id,
             'voucher_number': voucher.voucher_number
         }), 201
         
+    except invoicing.InvoiceError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # الحصول على سندات القبض
 @sales_bp.route('/payment-receipts', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_payment_receipts():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        receipts = PaymentReceipt.query.order_by(PaymentReceipt.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        receipts, meta = paginate(list_query(PaymentReceipt, eager=[PaymentReceipt.customer]), PaymentReceipt, request.args)
         
         return jsonify({
             'receipts': [{
@@ -471,25 +332,21 @@ def get_payment_receipts():
                 'receipt_date': receipt.receipt_date.isoformat(),
                 'notes': receipt.notes,
                 'created_at': receipt.created_at.isoformat()
-            } for receipt in receipts.items],
-            'total': receipts.total,
-            'pages': receipts.pages,
-            'current_page': page
+            } for receipt in receipts],
+            **meta
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # الحصول على سندات الدفع
 @sales_bp.route('/payment-vouchers', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_payment_vouchers():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        vouchers = PaymentVoucher.query.order_by(PaymentVoucher.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        vouchers, meta = paginate(list_query(PaymentVoucher, eager=[PaymentVoucher.supplier]), PaymentVoucher, request.args)
         
         return jsonify({
             'vouchers': [{
@@ -500,16 +357,17 @@ def get_payment_vouchers():
                 'voucher_date': voucher.voucher_date.isoformat(),
                 'notes': voucher.notes,
                 'created_at': voucher.created_at.isoformat()
-            } for voucher in vouchers.items],
-            'total': vouchers.total,
-            'pages': vouchers.pages,
-            'current_page': page
+            } for voucher in vouchers],
+            **meta
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # الحصول على سند قبض محدد
 @sales_bp.route('/payment-receipts/<int:receipt_id>', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 def get_payment_receipt(receipt_id):
     try:
@@ -534,6 +392,7 @@ def get_payment_receipt(receipt_id):
 
 # الحصول على سند دفع محدد
 @sales_bp.route('/payment-vouchers/<int:voucher_id>', methods=['GET'])
+@query_budget(3)
 @jwt_required()
 def get_payment_voucher(voucher_id):
     try:
@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from src.services import search
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/search', methods=['GET'])
+@jwt_required()
+def global_search():
+    try:
+        term = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        kinds = [kind for kind in request.args.get('types', '').split(',') if kind]
+
+        unknown = [kind for kind in kinds if kind not in search.KIND_CODES]
+        if unknown:
+            return jsonify({'error': f"نوع بحث غير معروف: {', '.join(unknown)}"}), 400
+
+        if not term:
+            return jsonify({'results': []})
+
+        if not search.search_available():
+            return jsonify({'error': 'فهرس البحث غير متوفر، شغّل flask rebuild-search-index'}), 503
+
+        return jsonify({
+            'results': [{
+                'type': kind,
+                'id': ref_id,
+                'label': label,
+                'rank': rank
+            } for kind, ref_id, label, rank in search.search(term, kinds, limit)]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
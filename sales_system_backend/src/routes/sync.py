@@ -0,0 +1,123 @@
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models.user import db
+from src.models.invoices import SalesInvoice
+from src.services import invoicing, sync
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+
+sync_bp = Blueprint('sync', __name__)
+
+# أقصى عدد فواتير في دفعة رفع واحدة
+MAX_UPLOAD_BATCH = 200
+
+def _line(payload):
+    return current_app.json.dumps(payload) + '\n'
+
+@sync_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def get_changes():
+    """Stream changes since ``?since=<token>`` as NDJSON.
+
+    Each line is ``{"type", "op": "upsert", "row"}`` or
+    ``{"type", "op": "delete", "id"}``; the last line carries the token
+    for the next call. ``"reset": true`` means the client must drop its
+    local copy first, because the stream is a full snapshot.
+    """
+    try:
+        kinds = [kind for kind in request.args.get('types', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in sync.SYNCED_MODELS]
+        if unknown:
+            return jsonify({'error': f"نوع مزامنة غير معروف: {', '.join(unknown)}"}), 400
+
+        token = request.args.get('since')
+        since = sync.decode_token(token) if token else None
+        reset = since is None or sync.needs_reset(since)
+        if reset:
+            since = None
+        # يُحسب الرمز التالي قبل القراءة حتى لا يضيع أي تغيير يحدث أثناءها
+        next_token = sync.encode_token(datetime.utcnow())
+    except sync.InvalidToken as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        for kind, op, payload in sync.changes(since, kinds):
+            if op == 'delete':
+                yield _line({'type': kind, 'op': op, 'id': payload['id']})
+            else:
+                yield _line({'type': kind, 'op': op, 'row': payload})
+        yield _line({'type': 'token', 'token': next_token, 'reset': reset})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _offline_time(value):
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise invoicing.InvoiceError('تاريخ الفاتورة غير صحيح')
+    if moment.tzinfo is not None:
+        # الأعمدة تخزن UTC بدون منطقة زمنية
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def _existing_invoices(client_refs):
+    if not client_refs:
+        return {}
+    rows = db.session.query(
+        SalesInvoice.client_ref, SalesInvoice.id, SalesInvoice.invoice_number
+    ).filter(SalesInvoice.client_ref.in_(client_refs))
+    return {client_ref: (invoice_id, number) for client_ref, invoice_id, number in rows}
+
+@sync_bp.route('/sync/invoices', methods=['POST'])
+@jwt_required()
+def upload_invoices():
+    """Store sales invoices made offline, each identified by ``client_ref``.
+
+    Uploading the same ``client_ref`` again returns the stored invoice, so
+    a client can safely retry a batch after a dropped connection. Each
+    invoice is committed on its own; one bad invoice does not block the rest.
+    """
+    try:
+        invoices = (request.get_json() or {}).get('invoices') or []
+        if len(invoices) > MAX_UPLOAD_BATCH:
+            return jsonify({'error': f'الحد الأقصى {MAX_UPLOAD_BATCH} فاتورة في الدفعة'}), 400
+        user_id = get_jwt_identity()
+
+        existing = _existing_invoices([data.get('client_ref') for data in invoices if data.get('client_ref')])
+        results = []
+        for data in invoices:
+            client_ref = data.get('client_ref')
+            if not client_ref:
+                results.append({'client_ref': None, 'status': 'error', 'error': 'client_ref مطلوب'})
+                continue
+            if client_ref in existing:
+                invoice_id, number = existing[client_ref]
+                results.append({'client_ref': client_ref, 'status': 'duplicate',
+                                'invoice_id': invoice_id, 'invoice_number': number})
+                continue
+            try:
+                invoice = invoicing.create_sales_invoice(data, user_id, created_at=_offline_time(data.get('created_at')))
+            except IntegrityError:
+                # رُفعت الفاتورة نفسها في طلب آخر متزامن
+                db.session.rollback()
+                existing.update(_existing_invoices([client_ref]))
+                if client_ref not in existing:
+                    raise
+                invoice_id, number = existing[client_ref]
+                results.append({'client_ref': client_ref, 'status': 'duplicate',
+                                'invoice_id': invoice_id, 'invoice_number': number})
+                continue
+            except invoicing.InvoiceError as e:
+                db.session.rollback()
+                results.append({'client_ref': client_ref, 'status': 'error', 'error': str(e)})
+                continue
+            existing[client_ref] = (invoice.id, invoice.invoice_number)
+            results.append({'client_ref': client_ref, 'status': 'created',
+                            'invoice_id': invoice.id, 'invoice_number': invoice.invoice_number})
+
+        return jsonify({'results': results})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
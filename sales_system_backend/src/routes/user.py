@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db, User
+from src.services.query_budgets import query_budget
 
 user_bp = Blueprint('users', __name__)
 
@@ -13,6 +14,7 @@ def require_admin():
     return None
 
 @user_bp.route('/users', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_users():
     try:
@@ -30,6 +32,7 @@ def get_users():
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users', methods=['POST'])
+@query_budget(4)
 @jwt_required()
 def create_user():
     try:
@@ -81,6 +84,7 @@ def create_user():
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
+@query_budget(4)
 @jwt_required()
 def update_user(user_id):
     try:
@@ -130,6 +134,7 @@ def update_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
+@query_budget(10)
 @jwt_required()
 def delete_user(user_id):
     try:
@@ -155,6 +160,7 @@ def delete_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_user(user_id):
     try:
@@ -0,0 +1,352 @@
+"""Column projections for read endpoints.
+
+Each serializer names the exact columns an endpoint returns, including
+lookups such as ``category_name`` that are joined in SQL. Rows come back
+as plain tuples turned into dicts, so no ORM objects, identity map
+entries or relationship loads are involved, and the JSON provider
+encodes them directly.
+"""
+from src.models.user import db, User
+from src.models.inventory import Category, Product, Customer, Supplier
+from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
+from src.models.operations import Expense, InventoryMovement
+from src.services.listing import items_count
+from sqlalchemy import Boolean, func, select, type_coerce
+
+SERIALIZERS = {}
+
+class Projection:
+    """The columns of ``model`` (and outer-joined lookups) one endpoint returns.
+
+    ``fields`` maps output keys to column expressions; a dotted key such
+    as ``product.name`` is emitted as a nested object.
+    """
+
+    def __init__(self, model, fields, joins=()):
+        self.model = model
+        self.fields = fields
+        self.joins = joins
+        self._nested = any('.' in key for key in fields)
+
+    def query(self):
+        """ORM query of labelled columns, for filtering and ``paginate``."""
+        query = db.session.query(*[column.label(key) for key, column in self.fields.items()])
+        query = query.select_from(self.model)
+        for target, onclause in self.joins:
+            query = query.outerjoin(target, onclause)
+        return query
+
+    def row(self, row):
+        data = row._asdict()
+        if not self._nested:
+            return data
+        nested = {}
+        for key, value in data.items():
+            parent, _, child = key.rpartition('.')
+            (nested.setdefault(parent, {}) if parent else nested)[child or key] = value
+        return nested
+
+    def rows(self, query):
+        return [self.row(row) for row in query]
+
+def serializer(name, model, fields, joins=()):
+    """Register a projection under ``name`` (``<model>.<endpoint>``)."""
+    SERIALIZERS[name] = Projection(model, fields, joins)
+
+def projection(name):
+    return SERIALIZERS[name]
+
+serializer('customer.list', Customer, {
+    'id': Customer.id,
+    'name': Customer.name,
+    'phone': Customer.phone,
+    'email': Customer.email,
+    'address': Customer.address,
+    'customer_type': Customer.customer_type,
+    'balance': Customer.balance,
+})
+
+serializer('supplier.list', Supplier, {
+    'id': Supplier.id,
+    'name': Supplier.name,
+    'phone': Supplier.phone,
+    'email': Supplier.email,
+    'address': Supplier.address,
+    'balance': Supplier.balance,
+})
+
+serializer('product.list', Product, {
+    'id': Product.id,
+    'name': Product.name,
+    'description': Product.description,
+    'purchase_price': Product.purchase_price,
+    'selling_price': Product.selling_price,
+    'stock_quantity': Product.stock_quantity,
+    'unit': Product.unit,
+    'category_id': Product.category_id,
+    'category_name': Category.name,
+    'barcode': Product.barcode,
+}, joins=[(Category, Product.category_id == Category.id)])
+
+serializer('product.inventory', Product, {
+    'id': Product.id,
+    'name': Product.name,
+    'description': Product.description,
+    'barcode': Product.barcode,
+    'category_id': Product.category_id,
+    'category_name': Category.name,
+    'sale_price': Product.selling_price,
+    'purchase_price': Product.purchase_price,
+    'stock_quantity': Product.stock_quantity,
+    'min_stock': Product.min_stock,
+    'unit': Product.unit,
+    'is_low_stock': type_coerce(Product.stock_quantity <= Product.min_stock, Boolean),
+    'created_at': Product.created_at,
+}, joins=[(Category, Product.category_id == Category.id)])
+
+serializer('product.low_stock', Product, {
+    'id': Product.id,
+    'name': Product.name,
+    'stock_quantity': Product.stock_quantity,
+    'min_stock': Product.min_stock,
+    'unit': Product.unit,
+    'category_name': Category.name,
+}, joins=[(Category, Product.category_id == Category.id)])
+
+serializer('category.list', Category, {
+    'id': Category.id,
+    'name': Category.name,
+    'description': Category.description,
+    'products_count': select(
+        func.count(Product.id)
+    ).where(
+        Product.category_id == Category.id
+    ).correlate(Category).scalar_subquery(),
+})
+
+# اسم العميل المسجل، أو الاسم المدخل يدوياً للمبيعات النقدية
+_sales_customer_name = func.coalesce(Customer.name, func.nullif(SalesInvoice.customer_name, ''), 'عميل نقدي')
+
+serializer('sales_invoice.list', SalesInvoice, {
+    'id': SalesInvoice.id,
+    'invoice_number': SalesInvoice.invoice_number,
+    'customer_name': _sales_customer_name,
+    'total_amount': SalesInvoice.total_amount,
+    'payment_type': SalesInvoice.payment_type,
+    'status': SalesInvoice.status,
+    'created_at': SalesInvoice.created_at,
+    'items_count': items_count(SalesInvoice, SalesInvoiceItem),
+}, joins=[(Customer, SalesInvoice.customer_id == Customer.id)])
+
+serializer('purchase_invoice.list', PurchaseInvoice, {
+    'id': PurchaseInvoice.id,
+    'invoice_number': PurchaseInvoice.invoice_number,
+    'supplier_name': func.coalesce(Supplier.name, 'مورد نقدي'),
+    'total_amount': PurchaseInvoice.total_amount,
+    'payment_type': PurchaseInvoice.payment_type,
+    'status': PurchaseInvoice.status,
+    'created_at': PurchaseInvoice.created_at,
+    'items_count': items_count(PurchaseInvoice, PurchaseInvoiceItem),
+}, joins=[(Supplier, PurchaseInvoice.supplier_id == Supplier.id)])
+
+serializer('sales_invoice.detail', SalesInvoice, {
+    'id': SalesInvoice.id,
+    'invoice_number': SalesInvoice.invoice_number,
+    'customer.id': Customer.id,
+    'customer.name': _sales_customer_name,
+    'customer.phone': Customer.phone,
+    'payment_type': SalesInvoice.payment_type,
+    'status': SalesInvoice.status,
+    'total_amount': SalesInvoice.total_amount,
+    'discount_percentage': SalesInvoice.discount_percentage,
+    'discount': SalesInvoice.discount,
+    'final_amount': SalesInvoice.final_amount,
+    'notes': SalesInvoice.notes,
+    'created_at': SalesInvoice.created_at,
+}, joins=[(Customer, SalesInvoice.customer_id == Customer.id)])
+
+serializer('sales_invoice_item.detail', SalesInvoiceItem, {
+    'id': SalesInvoiceItem.id,
+    'product.id': Product.id,
+    'product.name': Product.name,
+    'color': SalesInvoiceItem.color,
+    'quantity': SalesInvoiceItem.quantity,
+    'unit_price': SalesInvoiceItem.unit_price,
+    'total_price': SalesInvoiceItem.total_price,
+}, joins=[(Product, SalesInvoiceItem.product_id == Product.id)])
+
+# الطباعة: رأس المستند وبنوده في استعلامين مهما كان عدد المستندات
+serializer('sales_invoice.print', SalesInvoice, {
+    'id': SalesInvoice.id,
+    'number': SalesInvoice.invoice_number,
+    'party_name': _sales_customer_name,
+    'party_phone': Customer.phone,
+    'date': SalesInvoice.invoice_date,
+    'payment_type': SalesInvoice.payment_type,
+    'total_amount': SalesInvoice.total_amount,
+    'discount': SalesInvoice.discount,
+    'final_amount': SalesInvoice.final_amount,
+    'notes': SalesInvoice.notes,
+    'user_name': User.full_name,
+}, joins=[(Customer, SalesInvoice.customer_id == Customer.id), (User, SalesInvoice.user_id == User.id)])
+
+serializer('purchase_invoice.print', PurchaseInvoice, {
+    'id': PurchaseInvoice.id,
+    'number': PurchaseInvoice.invoice_number,
+    'party_name': func.coalesce(Supplier.name, 'مورد نقدي'),
+    'party_phone': Supplier.phone,
+    'date': PurchaseInvoice.invoice_date,
+    'payment_type': PurchaseInvoice.payment_type,
+    'total_amount': PurchaseInvoice.total_amount,
+    'discount': PurchaseInvoice.discount,
+    'final_amount': PurchaseInvoice.final_amount,
+    'notes': PurchaseInvoice.notes,
+    'user_name': User.full_name,
+}, joins=[(Supplier, PurchaseInvoice.supplier_id == Supplier.id), (User, PurchaseInvoice.user_id == User.id)])
+
+serializer('payment_receipt.print', PaymentReceipt, {
+    'id': PaymentReceipt.id,
+    'number': PaymentReceipt.receipt_number,
+    'party_name': Customer.name,
+    'party_phone': Customer.phone,
+    'date': PaymentReceipt.receipt_date,
+    'final_amount': PaymentReceipt.amount,
+    'notes': PaymentReceipt.notes,
+    'user_name': User.full_name,
+}, joins=[(Customer, PaymentReceipt.customer_id == Customer.id), (User, PaymentReceipt.user_id == User.id)])
+
+serializer('payment_voucher.print', PaymentVoucher, {
+    'id': PaymentVoucher.id,
+    'number': PaymentVoucher.voucher_number,
+    'party_name': Supplier.name,
+    'party_phone': Supplier.phone,
+    'date': PaymentVoucher.voucher_date,
+    'final_amount': PaymentVoucher.amount,
+    'notes': PaymentVoucher.notes,
+    'user_name': User.full_name,
+}, joins=[(Supplier, PaymentVoucher.supplier_id == Supplier.id), (User, PaymentVoucher.user_id == User.id)])
+
+serializer('sales_invoice_item.print', SalesInvoiceItem, {
+    'invoice_id': SalesInvoiceItem.invoice_id,
+    'name': Product.name,
+    'color': SalesInvoiceItem.color,
+    'quantity': SalesInvoiceItem.quantity,
+    'unit_price': SalesInvoiceItem.unit_price,
+    'total_price': SalesInvoiceItem.total_price,
+}, joins=[(Product, SalesInvoiceItem.product_id == Product.id)])
+
+serializer('purchase_invoice_item.print', PurchaseInvoiceItem, {
+    'invoice_id': PurchaseInvoiceItem.invoice_id,
+    'name': Product.name,
+    'color': PurchaseInvoiceItem.color,
+    'quantity': PurchaseInvoiceItem.quantity,
+    'unit_price': PurchaseInvoiceItem.unit_price,
+    'total_price': PurchaseInvoiceItem.total_price,
+}, joins=[(Product, PurchaseInvoiceItem.product_id == Product.id)])
+
+# التصدير (CSV/Excel): صف مسطح لكل سجل، بلا كائنات متداخلة
+serializer('sales_invoice.export', SalesInvoice, {
+    'invoice_number': SalesInvoice.invoice_number,
+    'invoice_date': SalesInvoice.invoice_date,
+    'customer_id': SalesInvoice.customer_id,
+    'customer_name': _sales_customer_name,
+    'payment_type': SalesInvoice.payment_type,
+    'status': SalesInvoice.status,
+    'total_amount': SalesInvoice.total_amount,
+    'discount': SalesInvoice.discount,
+    'final_amount': SalesInvoice.final_amount,
+    'user_name': User.full_name,
+    'notes': SalesInvoice.notes,
+    'created_at': SalesInvoice.created_at,
+}, joins=[(Customer, SalesInvoice.customer_id == Customer.id), (User, SalesInvoice.user_id == User.id)])
+
+serializer('sales_invoice_item.export', SalesInvoiceItem, {
+    'invoice_number': SalesInvoice.invoice_number,
+    'invoice_date': SalesInvoice.invoice_date,
+    'customer_name': _sales_customer_name,
+    'product_id': SalesInvoiceItem.product_id,
+    'product_name': Product.name,
+    'barcode': Product.barcode,
+    'color': SalesInvoiceItem.color,
+    'quantity': SalesInvoiceItem.quantity,
+    'unit_price': SalesInvoiceItem.unit_price,
+    'total_price': SalesInvoiceItem.total_price,
+}, joins=[(SalesInvoice, SalesInvoiceItem.invoice_id == SalesInvoice.id),
+          (Customer, SalesInvoice.customer_id == Customer.id),
+          (Product, SalesInvoiceItem.product_id == Product.id)])
+
+serializer('purchase_invoice.export', PurchaseInvoice, {
+    'invoice_number': PurchaseInvoice.invoice_number,
+    'invoice_date': PurchaseInvoice.invoice_date,
+    'supplier_id': PurchaseInvoice.supplier_id,
+    'supplier_name': Supplier.name,
+    'payment_type': PurchaseInvoice.payment_type,
+    'status': PurchaseInvoice.status,
+    'total_amount': PurchaseInvoice.total_amount,
+    'discount': PurchaseInvoice.discount,
+    'final_amount': PurchaseInvoice.final_amount,
+    'user_name': User.full_name,
+    'notes': PurchaseInvoice.notes,
+    'created_at': PurchaseInvoice.created_at,
+}, joins=[(Supplier, PurchaseInvoice.supplier_id == Supplier.id), (User, PurchaseInvoice.user_id == User.id)])
+
+serializer('purchase_invoice_item.export', PurchaseInvoiceItem, {
+    'invoice_number': PurchaseInvoice.invoice_number,
+    'invoice_date': PurchaseInvoice.invoice_date,
+    'supplier_name': Supplier.name,
+    'product_id': PurchaseInvoiceItem.product_id,
+    'product_name': Product.name,
+    'barcode': Product.barcode,
+    'color': PurchaseInvoiceItem.color,
+    'quantity': PurchaseInvoiceItem.quantity,
+    'unit_price': PurchaseInvoiceItem.unit_price,
+    'total_price': PurchaseInvoiceItem.total_price,
+}, joins=[(PurchaseInvoice, PurchaseInvoiceItem.invoice_id == PurchaseInvoice.id),
+          (Supplier, PurchaseInvoice.supplier_id == Supplier.id),
+          (Product, PurchaseInvoiceItem.product_id == Product.id)])
+
+serializer('expense.export', Expense, {
+    'id': Expense.id,
+    'expense_date': Expense.expense_date,
+    'description': Expense.description,
+    'category': Expense.category,
+    'amount': Expense.amount,
+    'user_name': User.full_name,
+    'notes': Expense.notes,
+    'created_at': Expense.created_at,
+}, joins=[(User, Expense.user_id == User.id)])
+
+serializer('payment_receipt.export', PaymentReceipt, {
+    'receipt_number': PaymentReceipt.receipt_number,
+    'receipt_date': PaymentReceipt.receipt_date,
+    'customer_id': PaymentReceipt.customer_id,
+    'customer_name': Customer.name,
+    'amount': PaymentReceipt.amount,
+    'user_name': User.full_name,
+    'notes': PaymentReceipt.notes,
+    'created_at': PaymentReceipt.created_at,
+}, joins=[(Customer, PaymentReceipt.customer_id == Customer.id), (User, PaymentReceipt.user_id == User.id)])
+
+serializer('payment_voucher.export', PaymentVoucher, {
+    'voucher_number': PaymentVoucher.voucher_number,
+    'voucher_date': PaymentVoucher.voucher_date,
+    'supplier_id': PaymentVoucher.supplier_id,
+    'supplier_name': Supplier.name,
+    'amount': PaymentVoucher.amount,
+    'user_name': User.full_name,
+    'notes': PaymentVoucher.notes,
+    'created_at': PaymentVoucher.created_at,
+}, joins=[(Supplier, PaymentVoucher.supplier_id == Supplier.id), (User, PaymentVoucher.user_id == User.id)])
+
+serializer('inventory_movement.export', InventoryMovement, {
+    'id': InventoryMovement.id,
+    'created_at': InventoryMovement.created_at,
+    'product_id': InventoryMovement.product_id,
+    'product_name': Product.name,
+    'movement_type': InventoryMovement.movement_type,
+    'quantity': InventoryMovement.quantity,
+    'reference_type': InventoryMovement.reference_type,
+    'reference_id': InventoryMovement.reference_id,
+    'user_name': User.full_name,
+    'notes': InventoryMovement.notes,
+}, joins=[(Product, InventoryMovement.product_id == Product.id), (User, InventoryMovement.user_id == User.id)])
@@ -0,0 +1,199 @@
+from src.models.user import db
+from src.models.inventory import Category, Product
+from src.models.operations import SyncTombstone
+from src.serializers import projection
+from src.services import generations
+from src.services.sync import SYNC_OVERLAP
+from datetime import datetime
+from sqlalchemy import or_, select
+import threading
+
+# ذاكرة مؤقتة للمنتجات والفئات داخل كل عملية (worker).
+# قبل كل قراءة نقارن رقم الجيل المشترك في table_generations بما حمّلناه؛
+# أي كتابة على المنتجات أو الفئات من أي عملية ترفع الرقم، فنجلب الفرق فقط.
+WATCHED_TABLES = (Category.__tablename__, Product.__tablename__)
+
+class _Snapshot:
+    """One loaded version of the catalog; never changed once published."""
+
+    def __init__(self, products=None, by_barcode=None, by_category=None, categories=None):
+        self.products = products if products is not None else {}
+        self.by_barcode = by_barcode if by_barcode is not None else {}
+        self.by_category = by_category if by_category is not None else {}
+        self.categories = categories if categories is not None else {}
+        # القوائم المرتبة تُبنى عند أول طلب؛ بناؤها مرتين من خيطين لا يضر
+        self.product_list = None
+        self.category_list = None
+
+    def copy(self):
+        """A private copy to apply a delta to before publishing it."""
+        return _Snapshot(
+            dict(self.products),
+            dict(self.by_barcode),
+            {category_id: set(ids) for category_id, ids in self.by_category.items()},
+            self.categories
+        )
+
+class CatalogCache:
+    """Read-through cache of the product list, keyed by id, barcode and category.
+
+    Readers use the published ``_Snapshot`` without locking; a refresh
+    builds a new one under ``_lock`` and swaps it in with one assignment,
+    so a reader never sees a half-applied delta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._loaded_at = None
+        self._snapshot = _Snapshot()
+        self.hits = 0
+        self.misses = 0
+        self.full_loads = 0
+        self.delta_loads = 0
+        self.rows_loaded = 0
+
+    # -- القراءة -------------------------------------------------------------
+
+    def products(self, category_id=None):
+        """All products in ``product.list`` shape, ordered by id."""
+        snapshot = self._ensure_fresh()
+        if category_id is not None:
+            return [snapshot.products[product_id] for product_id in sorted(snapshot.by_category.get(category_id, ()))]
+        if snapshot.product_list is None:
+            snapshot.product_list = [snapshot.products[product_id] for product_id in sorted(snapshot.products)]
+        return snapshot.product_list
+
+    def product(self, product_id):
+        return self._ensure_fresh().products.get(product_id)
+
+    def by_barcode(self, barcode):
+        snapshot = self._ensure_fresh()
+        product_id = snapshot.by_barcode.get(barcode)
+        return snapshot.products.get(product_id) if product_id is not None else None
+
+    def categories(self):
+        """All categories in ``category.list`` shape, ordered by name."""
+        snapshot = self._ensure_fresh()
+        if snapshot.category_list is None:
+            snapshot.category_list = sorted((
+                dict(category, products_count=len(snapshot.by_category.get(category['id'], ())))
+                for category in snapshot.categories.values()
+            ), key=lambda category: category['name'] or '')
+        return snapshot.category_list
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'full_loads': self.full_loads,
+            'delta_loads': self.delta_loads,
+            'rows_loaded': self.rows_loaded,
+            'products': len(snapshot.products),
+            'categories': len(snapshot.categories),
+            'generation': self._generation,
+        }
+
+    # -- التحديث -------------------------------------------------------------
+
+    def _ensure_fresh(self):
+        """Refresh if another write happened, and return the snapshot to read from."""
+        generation = self._current_generation()
+        if generation == self._generation:
+            self.hits += 1
+            return self._snapshot
+        with self._lock:
+            if generation == self._generation:
+                self.hits += 1
+                return self._snapshot
+            self.misses += 1
+            # وقت البدء يُحفظ قبل القراءة حتى لا يفوتنا تغيير يحدث أثناءها
+            started_at = datetime.utcnow()
+            if self._loaded_at is None or self._deleted_categories():
+                snapshot = self._full_load()
+            else:
+                snapshot = self._delta_load()
+            self._snapshot = snapshot
+            self._generation = generation
+            self._loaded_at = started_at
+            return snapshot
+
+    def _current_generation(self):
+        current = generations.current(WATCHED_TABLES)
+        return tuple(current[name] for name in WATCHED_TABLES)
+
+    def _deleted_categories(self):
+        return db.session.query(SyncTombstone.id).filter(
+            SyncTombstone.entity == 'category',
+            SyncTombstone.deleted_at >= self._loaded_at - SYNC_OVERLAP
+        ).first() is not None
+
+    def _load_categories(self):
+        view = projection('category.list')
+        columns = [column for key, column in view.fields.items() if key != 'products_count']
+        return {
+            row.id: row._asdict()
+            for row in db.session.execute(select(*columns))
+        }
+
+    def _full_load(self):
+        self.full_loads += 1
+        snapshot = _Snapshot(categories=self._load_categories())
+        view = projection('product.list')
+        for row in view.query():
+            self._put(snapshot, view.row(row))
+        return snapshot
+
+    def _delta_load(self):
+        self.delta_loads += 1
+        since = self._loaded_at - SYNC_OVERLAP
+        snapshot = self._snapshot.copy()
+        snapshot.categories = self._load_categories()
+
+        deleted = db.session.query(SyncTombstone.ref_id).filter(
+            SyncTombstone.entity == 'product',
+            SyncTombstone.deleted_at >= since
+        )
+        for (product_id,) in deleted:
+            self._drop(snapshot, product_id)
+
+        # المنتجات المعدّلة، ومنتجات الفئات التي تغيّر اسمها
+        view = projection('product.list')
+        changed = view.query().filter(or_(
+            Product.updated_at >= since,
+            Product.category_id.in_(select(Category.id).where(Category.updated_at >= since))
+        ))
+        for row in changed:
+            self._put(snapshot, view.row(row))
+        return snapshot
+
+    def _put(self, snapshot, product):
+        self._drop(snapshot, product['id'])
+        snapshot.products[product['id']] = product
+        if product.get('barcode'):
+            snapshot.by_barcode[product['barcode']] = product['id']
+        snapshot.by_category.setdefault(product['category_id'], set()).add(product['id'])
+        self.rows_loaded += 1
+
+    def _drop(self, snapshot, product_id):
+        old = snapshot.products.pop(product_id, None)
+        if old is None:
+            return
+        if old.get('barcode') and snapshot.by_barcode.get(old['barcode']) == product_id:
+            del snapshot.by_barcode[old['barcode']]
+        snapshot.by_category.get(old['category_id'], set()).discard(product_id)
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache():
+    """The cache for the current database (one per engine URL)."""
+    url = str(db.engine.url)
+    cache = _caches.get(url)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(url, CatalogCache())
+    return cache
@@ -0,0 +1,100 @@
+from src.models.user import db
+from src.models.operations import DailySummary, Expense
+from src.models.invoices import SalesInvoice, PurchaseInvoice
+from datetime import date, datetime
+from src.services.dialects import day_of, upsert
+from sqlalchemy import delete, func, select
+
+COUNTERS = (
+    'sales_total', 'sales_cash', 'sales_credit', 'sales_count',
+    'purchases_total', 'purchases_cash', 'purchases_credit', 'purchases_count',
+    'expenses_total', 'expenses_count',
+)
+
+def _day_of(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value or datetime.utcnow().date()
+
+def apply_delta(day, **deltas):
+    """Add ``deltas`` to the rollup row for ``day``, creating it if needed.
+
+    Runs as a single upsert on the current session so it commits or rolls
+    back together with the document that caused it.
+    """
+    table = DailySummary.__table__
+    stmt = upsert(table).values(day=day, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day],
+        set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+    )
+    db.session.execute(stmt)
+
+def _invoice_deltas(prefix, invoice, sign):
+    amount = (invoice.total_amount or 0) * sign
+    deltas = {f'{prefix}_total': amount, f'{prefix}_count': sign}
+    if invoice.payment_type == 'credit':
+        deltas[f'{prefix}_credit'] = amount
+    else:
+        deltas[f'{prefix}_cash'] = amount
+    return deltas
+
+def record_sales_invoice(invoice, sign=1):
+    apply_delta(_day_of(invoice.created_at), **_invoice_deltas('sales', invoice, sign))
+
+def record_purchase_invoice(invoice, sign=1):
+    apply_delta(_day_of(invoice.created_at), **_invoice_deltas('purchases', invoice, sign))
+
+def record_expense(expense, sign=1):
+    apply_delta(
+        _day_of(expense.created_at),
+        expenses_total=(expense.amount or 0) * sign,
+        expenses_count=sign
+    )
+
+def _grouped(executor, model, amount_column, with_payment_type=True):
+    day = day_of(model.created_at)
+    columns = [day.label('day'), func.sum(amount_column).label('total'), func.count(model.id).label('count')]
+    if with_payment_type:
+        columns.append(model.payment_type)
+    query = select(*columns).group_by(day)
+    if with_payment_type:
+        query = query.group_by(model.payment_type)
+    return executor.execute(query).all()
+
+def rebuild(connection=None):
+    """Recompute every rollup row from the source tables.
+
+    Runs on ``connection`` inside the caller's transaction when given
+    (migrations), otherwise on the session and commits.
+    Returns the number of days written.
+    """
+    executor = db.session if connection is None else connection
+    rows = {}
+
+    def row_for(day):
+        key = date.fromisoformat(day) if isinstance(day, str) else day
+        return rows.setdefault(key, dict.fromkeys(COUNTERS, 0))
+
+    for prefix, model in (('sales', SalesInvoice), ('purchases', PurchaseInvoice)):
+        for result in _grouped(executor, model, model.total_amount):
+            row = row_for(result.day)
+            row[f'{prefix}_total'] += result.total or 0
+            row[f'{prefix}_count'] += result.count
+            split = 'credit' if result.payment_type == 'credit' else 'cash'
+            row[f'{prefix}_{split}'] += result.total or 0
+
+    for result in _grouped(executor, Expense, Expense.amount, with_payment_type=False):
+        row = row_for(result.day)
+        row['expenses_total'] += result.total or 0
+        row['expenses_count'] += result.count
+
+    executor.execute(delete(DailySummary.__table__))
+    if rows:
+        executor.execute(
+            DailySummary.__table__.insert(),
+            [dict(values, day=day) for day, values in rows.items()]
+        )
+    if connection is None:
+        db.session.commit()
+    return len(rows)
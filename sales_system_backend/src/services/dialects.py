@@ -0,0 +1,37 @@
+"""The few SQL constructs that differ between SQLite and PostgreSQL."""
+from src.models.user import db
+from sqlalchemy import Date
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+class day_of(FunctionElement):
+    """Calendar day of a timestamp column, returned as a ``date``.
+
+    SQLite has no date type, so ``DATE(x)`` yields ``'YYYY-MM-DD'`` text
+    that the ``Date`` result type parses; PostgreSQL casts natively.
+    """
+    type = Date()
+    name = 'day_of'
+    inherit_cache = True
+
+@compiles(day_of)
+def _day_of_default(element, compiler, **kw):
+    return f"DATE({compiler.process(element.clauses, **kw)})"
+
+@compiles(day_of, 'postgresql')
+def _day_of_postgresql(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+_UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+def upsert(table, bind=None):
+    """``insert(table)`` with ``on_conflict_do_update`` for the current database."""
+    name = (bind or db.session.get_bind()).dialect.name
+    try:
+        return _UPSERT_INSERTS[name](table)
+    except KeyError:
+        raise NotImplementedError(f"قاعدة البيانات {name} غير مدعومة")
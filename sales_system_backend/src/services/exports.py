@@ -0,0 +1,130 @@
+"""Streaming CSV and Excel exports of documents, line items and movements.
+
+Rows are read with ``yield_per`` (``EXPORT_BATCH`` at a time) from the
+export projections in ``src/serializers.py`` and written out as they
+arrive, so exporting a year of line items keeps memory flat. CSV is sent
+while it is being read. Excel is written with ``openpyxl``; its write-only
+workbook is saved to a temporary file that is then streamed, so memory
+stays flat there too but the first byte waits for the last row.
+"""
+from src.serializers import projection
+from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
+from src.models.operations import Expense, InventoryMovement
+from src.services import search
+from datetime import datetime
+import csv
+import io
+import tempfile
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl في requirements.txt؛ هذا حماية لتثبيت ناقص فقط
+    openpyxl = None
+
+# عدد الصفوف المقروءة من القاعدة في كل دفعة
+EXPORT_BATCH = 1000
+# حجم كل قطعة تُرسل للعميل
+CHUNK_BYTES = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+class Export:
+    """One exportable dataset.
+
+    ``document`` is the model whose ``created_at`` the ``from``/``to``
+    filter and the row order use (the invoice, for line items);
+    ``search`` applies the list endpoint's ``?search=`` filter and
+    ``product`` is the column ``?product_id=`` filters on.
+    """
+
+    def __init__(self, view, model, document=None, search=None, product=None):
+        self.view = view
+        self.model = model
+        self.document = document or model
+        self.search = search
+        self.product = product
+
+EXPORTS = {
+    'sales-invoices': Export('sales_invoice.export', SalesInvoice, search=search.filter_sales_invoices),
+    'sales-invoice-items': Export('sales_invoice_item.export', SalesInvoiceItem, SalesInvoice,
+                                  search=search.filter_sales_invoices, product=SalesInvoiceItem.product_id),
+    'purchase-invoices': Export('purchase_invoice.export', PurchaseInvoice, search=search.filter_purchase_invoices),
+    'purchase-invoice-items': Export('purchase_invoice_item.export', PurchaseInvoiceItem, PurchaseInvoice,
+                                     search=search.filter_purchase_invoices, product=PurchaseInvoiceItem.product_id),
+    'expenses': Export('expense.export', Expense),
+    'payment-receipts': Export('payment_receipt.export', PaymentReceipt),
+    'payment-vouchers': Export('payment_voucher.export', PaymentVoucher),
+    'inventory-movements': Export('inventory_movement.export', InventoryMovement, product=InventoryMovement.product_id),
+}
+
+def export_query(name, start=None, end=None, search_term=None, product_id=None):
+    """The filtered query for dataset ``name``, oldest first."""
+    export = EXPORTS[name]
+    query = projection(export.view).query()
+    if start is not None:
+        query = query.filter(export.document.created_at >= start)
+    if end is not None:
+        query = query.filter(export.document.created_at < end)
+    if search_term and export.search:
+        query = export.search(query, search_term)
+    if product_id and export.product is not None:
+        query = query.filter(export.product == product_id)
+    order = [export.document.created_at, export.document.id]
+    if export.model is not export.document:
+        order.append(export.model.id)
+    return query.order_by(*order)
+
+def columns(name):
+    return list(projection(EXPORTS[name].view).fields)
+
+# نص يبدأ بأحد هذه الأحرف يقرؤه Excel كمعادلة (أسماء العملاء والملاحظات من المستخدمين)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _text(value):
+    """Prefix text Excel would run as a formula with ``'`` so it stays text."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return _text(value)
+
+def csv_chunks(name, query):
+    """Yield the CSV text in chunks of about ``CHUNK_BYTES``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM حتى يفتح Excel الملف بترميز UTF-8 ويظهر النص العربي
+    buffer.write('\ufeff')
+    writer.writerow(columns(name))
+    for row in query.yield_per(EXPORT_BATCH):
+        writer.writerow([_cell(value) for value in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def xlsx_chunks(name, query):
+    """Write the rows to a write-only workbook, then yield the file in chunks."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(name[:31])
+    sheet.append(columns(name))
+    for row in query.yield_per(EXPORT_BATCH):
+        # التواريخ تبقى خلايا تاريخ في Excel
+        sheet.append([_text(value) for value in row])
+    with tempfile.TemporaryFile(suffix='.xlsx') as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while True:
+            chunk = handle.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+def xlsx_available():
+    return openpyxl is not None
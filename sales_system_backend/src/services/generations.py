@@ -0,0 +1,88 @@
+from src.models.user import db
+from src.models.inventory import Category, Product, Customer, Supplier
+from src.models.operations import TableGeneration
+from src.responses import matching_etag
+from src.services.dialects import upsert
+from flask import make_response
+from functools import wraps
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# الجداول التي تُعرض قوائمها كاملة وتستفيد من 304
+TRACKED_TABLES = {model.__tablename__ for model in (Category, Product, Customer, Supplier)}
+
+# ارفع هذا الرقم عند تغيير شكل استجابة أي قائمة، حتى لا يحتفظ العميل بنسخة قديمة
+ETAG_SCHEMA = 2
+
+def bump(connection, tables):
+    """Increment the generation of every table in ``tables`` on ``connection``."""
+    table = TableGeneration.__table__
+    for name in sorted(tables):
+        stmt = upsert(table, connection).values(table_name=name, generation=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.table_name],
+            set_={'generation': table.c.generation + 1}
+        )
+        connection.execute(stmt)
+
+def _tracked(mappers):
+    return {mapper.local_table.name for mapper in mappers} & TRACKED_TABLES
+
+@event.listens_for(Session, 'after_flush')
+def _on_flush(session, flush_context):
+    changed = list(session.new) + list(session.deleted)
+    changed += [target for target in session.dirty if session.is_modified(target)]
+    tables = _tracked(inspect(target).mapper for target in changed)
+    if tables:
+        bump(session.connection(), tables)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_bulk_write(orm_execute_state):
+    # update(Product)... و insert/delete الجماعية لا تمر عبر flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return None
+    tables = _tracked(orm_execute_state.all_mappers)
+    if not tables:
+        return None
+    result = orm_execute_state.invoke_statement()
+    bump(orm_execute_state.session.connection(), tables)
+    return result
+
+def current(tables):
+    """Return ``{table: generation}`` for ``tables`` with one query."""
+    rows = db.session.query(
+        TableGeneration.table_name, TableGeneration.generation
+    ).filter(TableGeneration.table_name.in_(tables))
+    generations = dict.fromkeys(tables, 0)
+    generations.update(rows)
+    return generations
+
+def etag_for(*models):
+    generations = current([model.__tablename__ for model in models])
+    return '-'.join(f'{name}.{generation}' for name, generation in sorted(generations.items())) + f'-v{ETAG_SCHEMA}'
+
+def conditional(*models):
+    """Serve a list endpoint with a strong ETag built from ``models``' generations.
+
+    The generations are read before the rows, so a concurrent write can
+    only make the tag older than the data, never newer; a client whose
+    ``If-None-Match`` still matches gets a bare 304 and the view never runs.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag = etag_for(*models)
+            matched = matching_etag(etag)
+            if matched:
+                # نعيد الوسم كما أرسله العميل، بلاحقة الترميز إن وُجدت
+                response = make_response('', 304)
+                response.set_etag(matched)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
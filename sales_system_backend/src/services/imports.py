@@ -0,0 +1,337 @@
+"""Bulk import of products and customers from CSV or Excel files.
+
+The file is read row by row (``csv`` reader or an ``openpyxl`` read-only
+workbook), validated and written ``CHUNK_SIZE`` rows at a time: one
+``executemany`` insert and one ``executemany`` update per chunk, then
+the chunk is committed. Bulk statements skip the ORM events, so each
+chunk also re-indexes its rows for search and bumps the table
+generations itself; ``updated_at`` is set on every written row, so the
+catalog cache and ``/api/sync`` pick the changes up like any other edit.
+Imported stock quantities are written to the inventory ledger as opening
+balances (new products) or adjustments (updated ones).
+
+In ``upsert`` mode a row whose key (product barcode, customer phone)
+already exists updates that record, changing only the columns present in
+the file; in ``insert`` mode such a row is reported as an error.
+"""
+from src.models.user import db
+from src.models.inventory import Category, Product, Customer
+from src.services import generations, search, stock_ledger
+from datetime import datetime
+from sqlalchemy import bindparam, func, select, update
+import csv
+import io
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl في requirements.txt؛ هذا حماية لتثبيت ناقص فقط
+    openpyxl = None
+
+# عدد الصفوف التي تُتحقق وتُكتب وتُثبَّت معاً
+CHUNK_SIZE = 2000
+# أقصى عدد أخطاء تُعاد تفاصيلها (العدد الكلي يُحسب دائماً)
+MAX_REPORTED_ERRORS = 1000
+
+MODES = ('insert', 'upsert')
+
+class ImportFileError(ValueError):
+    pass
+
+class Field:
+    def __init__(self, kind=str, required=False, choices=None):
+        self.kind = kind
+        self.required = required
+        self.choices = choices
+
+class Entity:
+    """An importable table: its fields, the key ``upsert`` matches on and its search kind."""
+
+    def __init__(self, model, fields, key, search_kind, tables):
+        self.model = model
+        self.fields = fields
+        self.key = key
+        self.search_kind = search_kind
+        self.tables = tables
+
+ENTITIES = {
+    'products': Entity(Product, {
+        'name': Field(required=True),
+        'barcode': Field(),
+        'category': Field(),
+        'description': Field(),
+        'purchase_price': Field(float),
+        'selling_price': Field(float),
+        'stock_quantity': Field(int),
+        'min_stock': Field(int),
+        'unit': Field(),
+    }, key='barcode', search_kind='product', tables={'products', 'categories'}),
+    'customers': Entity(Customer, {
+        'name': Field(required=True),
+        'phone': Field(),
+        'address': Field(),
+        'email': Field(),
+        'customer_type': Field(choices=('regular', 'agent')),
+    }, key='phone', search_kind='customer', tables={'customers'}),
+}
+
+# أسماء الأعمدة المقبولة في رأس الملف (عربي أو كما يصدرها /api/export)
+HEADER_ALIASES = {
+    'الاسم': 'name', 'اسم المنتج': 'name', 'product_name': 'name', 'اسم العميل': 'name', 'customer_name': 'name',
+    'الباركود': 'barcode',
+    'الفئة': 'category', 'category_name': 'category',
+    'الوصف': 'description',
+    'سعر الشراء': 'purchase_price',
+    'سعر البيع': 'selling_price', 'sale_price': 'selling_price',
+    'الكمية': 'stock_quantity', 'المخزون': 'stock_quantity',
+    'الحد الأدنى': 'min_stock',
+    'الوحدة': 'unit',
+    'الهاتف': 'phone',
+    'العنوان': 'address',
+    'البريد': 'email',
+    'النوع': 'customer_type',
+}
+
+# -- قراءة الملف -----------------------------------------------------------------
+
+def _csv_rows(stream):
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    yield from reader
+
+def _xlsx_rows(stream):
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+def read_rows(stream, file_format):
+    """Yield ``(line_number, {field: raw value})`` for each data row of the file."""
+    if file_format == 'xlsx':
+        if openpyxl is None:
+            raise ImportFileError('استيراد Excel غير متاح على هذا الخادم (openpyxl غير مثبت)، استخدم csv')
+        rows = _xlsx_rows(stream)
+    elif file_format == 'csv':
+        rows = _csv_rows(stream)
+    else:
+        raise ImportFileError('صيغة الملف يجب أن تكون csv أو xlsx')
+
+    header = next(rows, None)
+    if not header:
+        raise ImportFileError('الملف فارغ')
+    names = [HEADER_ALIASES.get(str(name).strip(), str(name).strip().lower()) for name in header]
+    for line_number, row in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in row):
+            continue
+        yield line_number, dict(zip(names, row))
+
+# -- التحقق ---------------------------------------------------------------------
+
+def _value(field, raw):
+    value = raw.strip() if isinstance(raw, str) else raw
+    if value in ('', None):
+        if field.required:
+            raise ValueError('مطلوب')
+        return None
+    if field.kind in (float, int):
+        try:
+            number = float(str(value).replace(',', ''))
+        except ValueError:
+            raise ValueError('رقم غير صالح')
+        if number < 0:
+            raise ValueError('يجب ألا يكون سالباً')
+        if field.kind is int:
+            if number != int(number):
+                raise ValueError('يجب أن يكون عدداً صحيحاً')
+            return int(number)
+        return number
+    value = str(value)
+    # الأرقام في Excel تُقرأ 6200000000188.0
+    if value.endswith('.0') and value[:-2].isdigit():
+        value = value[:-2]
+    if field.choices and value not in field.choices:
+        raise ValueError(f"يجب أن يكون أحد: {', '.join(field.choices)}")
+    return value
+
+def _default(table, column):
+    default = table.c[column].default
+    return default.arg if default is not None and default.is_scalar else None
+
+class Importer:
+    """Import one file into ``entity``; ``run`` yields a progress dict per chunk.
+
+    Use ``errors`` (the first ``MAX_REPORTED_ERRORS``) and the counters
+    once the run is finished.
+    """
+
+    def __init__(self, entity, mode='insert', create_categories=True, dry_run=False, user_id=None):
+        if entity not in ENTITIES:
+            raise ImportFileError('نوع الاستيراد غير معروف')
+        if mode not in MODES:
+            raise ImportFileError('mode يجب أن يكون insert أو upsert')
+        self.entity = ENTITIES[entity]
+        self.mode = mode
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.user_id = user_id
+        self.rows = self.inserted = self.updated = self.failed = 0
+        self.errors = []
+        self._seen_keys = set()
+        self._categories = None
+
+    def run(self, rows):
+        chunk = []
+        for line_number, raw in rows:
+            chunk.append((line_number, raw))
+            if len(chunk) >= CHUNK_SIZE:
+                self._process(chunk)
+                chunk = []
+                yield self.progress()
+        if chunk:
+            self._process(chunk)
+        yield self.progress()
+
+    def progress(self):
+        return {'rows': self.rows, 'inserted': self.inserted, 'updated': self.updated, 'failed': self.failed}
+
+    def _error(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_number, 'error': message})
+
+    def _validate(self, chunk):
+        valid = []
+        for line_number, raw in chunk:
+            self.rows += 1
+            values = {}
+            try:
+                for name, field in self.entity.fields.items():
+                    if name in raw or field.required:
+                        try:
+                            values[name] = _value(field, raw.get(name))
+                        except ValueError as e:
+                            raise ValueError(f'{name}: {e}')
+            except ValueError as e:
+                self._error(line_number, str(e))
+                continue
+            key = values.get(self.entity.key)
+            if key:
+                if key in self._seen_keys:
+                    self._error(line_number, f'{self.entity.key} مكرر في الملف: {key}')
+                    continue
+                self._seen_keys.add(key)
+            valid.append((line_number, values))
+        return valid
+
+    def _resolve_categories(self, connection, valid):
+        """Replace category names by ids, creating missing categories when allowed."""
+        table = Category.__table__
+        if self._categories is None:
+            self._categories = {name.strip(): category_id for category_id, name in connection.execute(select(table.c.id, table.c.name))}
+        missing = {values['category'] for _, values in valid if values.get('category')} - set(self._categories)
+        if missing and self.create_categories and not self.dry_run:
+            now = datetime.utcnow()
+            created = connection.execute(
+                table.insert().returning(table.c.id, table.c.name),
+                [{'name': name, 'description': '', 'created_at': now, 'updated_at': now} for name in sorted(missing)]
+            )
+            self._categories.update((name, category_id) for category_id, name in created)
+        resolved = []
+        for line_number, values in valid:
+            name = values.pop('category', None)
+            if name:
+                if name in self._categories:
+                    values['category_id'] = self._categories[name]
+                elif not self.create_categories:
+                    self._error(line_number, f'الفئة غير موجودة: {name}')
+                    continue
+                else:
+                    # تجربة بلا كتابة: الفئة ستُنشأ عند الاستيراد الفعلي
+                    values['category_id'] = None
+            resolved.append((line_number, values))
+        return resolved
+
+    def _existing(self, connection, valid):
+        """``{key: id}`` of the records the chunk's keys already match."""
+        column = self.entity.model.__table__.c[self.entity.key]
+        keys = [values[self.entity.key] for _, values in valid if values.get(self.entity.key)]
+        if not keys:
+            return {}
+        rows = connection.execute(
+            select(column, func.min(self.entity.model.__table__.c.id)).where(column.in_(keys)).group_by(column)
+        )
+        return dict(rows.all())
+
+    def _process(self, chunk):
+        connection = db.session.connection()
+        valid = self._validate(chunk)
+        if 'category' in self.entity.fields:
+            valid = self._resolve_categories(connection, valid)
+        existing = self._existing(connection, valid)
+
+        inserts, updates = [], []
+        for line_number, values in valid:
+            record_id = existing.get(values.get(self.entity.key))
+            if record_id is None:
+                inserts.append(values)
+            elif self.mode == 'upsert':
+                updates.append(dict(values, _id=record_id))
+            else:
+                self._error(line_number, f'{self.entity.key} موجود مسبقاً: {values[self.entity.key]}')
+
+        if self.dry_run:
+            self.inserted += len(inserts)
+            self.updated += len(updates)
+            return
+
+        table = self.entity.model.__table__
+        now = datetime.utcnow()
+        inserted_ids = updated_ids = []
+        tracks_stock = 'stock_quantity' in self.entity.fields
+        if inserts:
+            # نفس الأعمدة لكل الصفوف حتى تُرسل في executemany واحد؛ الخلايا الفارغة تأخذ القيمة الافتراضية
+            columns = sorted({column for values in inserts for column in values})
+            defaults = {column: _default(table, column) for column in columns}
+            rows = []
+            for values in inserts:
+                row = {'created_at': now, 'updated_at': now}
+                for column in columns:
+                    value = values.get(column)
+                    row[column] = defaults[column] if value is None else value
+                rows.append(row)
+            # RETURNING بلا ترتيب: نحتاج مجموعة الأرقام للفهرسة فقط، فتبقى الإضافة دفعات متعددة القيم
+            returning = [table.c.id, table.c.stock_quantity] if tracks_stock else [table.c.id]
+            inserted = connection.execute(table.insert().returning(*returning), rows).all()
+            inserted_ids = [row[0] for row in inserted]
+            if tracks_stock:
+                stock_ledger.record(connection, {row.id: row.stock_quantity for row in inserted}, 'opening', None,
+                                    self.user_id, adjustment=True, notes='رصيد أول المدة (استيراد)')
+        if updates:
+            columns = sorted({column for values in updates for column in values if column != '_id'})
+            stock_changes = {values['_id']: values['stock_quantity'] for values in updates
+                             if values.get('stock_quantity') is not None}
+            if tracks_stock and stock_changes:
+                # الكمية قبل التحديث لحساب فرق الجرد
+                old_stock = connection.execute(
+                    select(table.c.id, table.c.stock_quantity).where(table.c.id.in_(stock_changes))
+                )
+                stock_changes = {product_id: stock_changes[product_id] - (stock or 0) for product_id, stock in old_stock}
+            # الخلية الفارغة تُبقي القيمة المخزنة
+            assignments = {column: func.coalesce(bindparam(f'new_{column}'), table.c[column]) for column in columns}
+            assignments.update(updated_at=now, version=table.c.version + 1)
+            connection.execute(
+                update(table).where(table.c.id == bindparam('_id')).values(assignments),
+                [dict({f'new_{column}': values.get(column) for column in columns}, _id=values['_id'])
+                 for values in updates]
+            )
+            updated_ids = [values['_id'] for values in updates]
+            if tracks_stock and stock_changes:
+                stock_ledger.record(connection, stock_changes, 'import', None, self.user_id,
+                                    adjustment=True, notes='تعديل الكمية (استيراد)')
+
+        search.index_rows(connection, self.entity.search_kind, inserted_ids, new=True)
+        search.index_rows(connection, self.entity.search_kind, updated_ids)
+        generations.bump(connection, self.entity.tables)
+        db.session.commit()
+        self.inserted += len(inserts)
+        self.updated += len(updates)
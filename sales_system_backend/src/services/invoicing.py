@@ -0,0 +1,235 @@
+from src.models.user import db
+from src.models.inventory import Product, Customer, Supplier
+from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
+from src.services import daily_summary, stock_ledger
+from src.services.transactions import retry_on_conflict
+from sqlalchemy import case, insert, update
+import uuid
+
+class InvoiceError(ValueError):
+    """Invalid invoice payload; reported to the client as a 400."""
+
+def placeholder_number():
+    """Unique stand-in for ``invoice_number`` until the row id is known."""
+    return f"TMP-{uuid.uuid4().hex}"
+
+def parse_lines(items):
+    """Validate the posted line items and return them as plain dicts."""
+    lines = []
+    for index, item_data in enumerate(items or [], start=1):
+        try:
+            product_id = int(item_data['product_id'])
+            quantity = float(item_data['quantity'])
+            unit_price = float(item_data['unit_price'])
+        except (KeyError, TypeError, ValueError):
+            raise InvoiceError(f"بيانات البند رقم {index} غير صحيحة")
+        if quantity <= 0:
+            raise InvoiceError(f"كمية البند رقم {index} يجب أن تكون أكبر من صفر")
+        lines.append({
+            'product_id': product_id,
+            'color': item_data.get('color', ''),  # اللون المدخل يدوياً
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total_price': quantity * unit_price
+        })
+    return lines
+
+def check_products(lines):
+    """Make sure every referenced product exists, with a single ``IN`` query."""
+    product_ids = {line['product_id'] for line in lines}
+    if not product_ids:
+        return
+    found = {product_id for (product_id,) in db.session.query(Product.id).filter(Product.id.in_(product_ids))}
+    missing = sorted(product_ids - found)
+    if missing:
+        raise InvoiceError(f"المنتجات غير موجودة: {', '.join(str(product_id) for product_id in missing)}")
+
+def insert_items(item_model, invoice_id, lines):
+    """Bulk-insert the invoice lines and return the invoice total."""
+    if lines:
+        db.session.execute(insert(item_model), [dict(line, invoice_id=invoice_id) for line in lines])
+    return sum(line['total_price'] for line in lines)
+
+def stock_deltas(lines, sign):
+    """Net stock change per product, ``sign`` is -1 for sales and +1 for purchases."""
+    deltas = {}
+    for line in lines:
+        deltas[line['product_id']] = deltas.get(line['product_id'], 0) + sign * line['quantity']
+    return deltas
+
+def apply_stock_deltas(deltas, reference_type, reference_id, user_id, created_at=None):
+    """Apply every product's stock change with one set-based ``UPDATE``.
+
+    The arithmetic happens in SQL, so concurrent invoices from other
+    workers cannot overwrite each other's stock changes. The changes are
+    appended to the inventory ledger in the same transaction; pass
+    ``created_at`` for a document back-dated to the past.
+    """
+    if not deltas:
+        return
+    db.session.execute(
+        update(Product).where(
+            Product.id.in_(deltas)
+        ).values(
+            stock_quantity=Product.stock_quantity + case(deltas, value=Product.id, else_=0),
+            version=Product.version + 1
+        ).execution_options(synchronize_session=False)
+    )
+    stock_ledger.record(db.session, deltas, reference_type, reference_id, user_id, created_at)
+
+def adjust_balance(model, row_id, delta):
+    """Atomically add ``delta`` to a customer's or supplier's balance.
+
+    Returns False when the row does not exist.
+    """
+    result = db.session.execute(
+        update(model).where(
+            model.id == row_id
+        ).values(
+            balance=model.balance + delta,
+            version=model.version + 1
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+def _finish_invoice(invoice, prefix, item_model, lines, stock_sign, reference_type, created_at=None):
+    db.session.add(invoice)
+    db.session.flush()  # Get invoice ID
+    
+    # Generate invoice number
+    invoice.invoice_number = f"{prefix}{invoice.id:06d}"
+    
+    # Add items (bulk insert) and update stock with one UPDATE
+    total_amount = insert_items(item_model, invoice.id, lines)
+    apply_stock_deltas(stock_deltas(lines, stock_sign), reference_type, invoice.id, invoice.user_id, created_at)
+    
+    # Calculate discount and final total
+    invoice.total_amount = total_amount
+    invoice.discount = total_amount * (invoice.discount_percentage / 100)
+    invoice.final_amount = total_amount - invoice.discount
+
+@retry_on_conflict()
+def create_sales_invoice(data, user_id, created_at=None):
+    """Validate and store a sales invoice, then commit. Returns the invoice.
+
+    ``created_at`` keeps the original time of an invoice made offline.
+    """
+    # التحقق من البنود والمنتجات باستعلام واحد قبل أي كتابة
+    lines = parse_lines(data.get('items', []))
+    check_products(lines)
+    
+    invoice = SalesInvoice(
+        invoice_number=placeholder_number(),
+        customer_id=data.get('customer_id'),
+        customer_name=data.get('customer_name', ''),  # اسم الزبون للمبيعات النقدية
+        user_id=user_id,
+        payment_type=data.get('payment_type', 'cash'),
+        notes=data.get('notes', ''),
+        discount_percentage=data.get('discount_percentage', 0),
+        client_ref=data.get('client_ref'),
+    )
+    if created_at is not None:
+        invoice.created_at = invoice.invoice_date = created_at
+    _finish_invoice(invoice, 'S', SalesInvoiceItem, lines, -1, 'sale', created_at)
+    
+    # إذا كان الدفع آجل، أضف المبلغ إلى ديون العميل
+    if invoice.payment_type == 'credit' and invoice.customer_id:
+        adjust_balance(Customer, invoice.customer_id, invoice.final_amount)
+    
+    daily_summary.record_sales_invoice(invoice)
+    db.session.commit()
+    return invoice
+
+@retry_on_conflict()
+def create_purchase_invoice(data, user_id):
+    """Validate and store a purchase invoice, then commit. Returns the invoice."""
+    # التحقق من البنود والمنتجات باستعلام واحد قبل أي كتابة
+    lines = parse_lines(data.get('items', []))
+    check_products(lines)
+    
+    invoice = PurchaseInvoice(
+        invoice_number=placeholder_number(),
+        supplier_id=data.get('supplier_id'),
+        user_id=user_id,
+        payment_type=data.get('payment_type', 'cash'),
+        notes=data.get('notes', ''),
+        discount_percentage=data.get('discount_percentage', 0),
+    )
+    _finish_invoice(invoice, 'P', PurchaseInvoiceItem, lines, 1, 'purchase')
+    
+    # إذا كان الدفع آجل، أضف المبلغ إلى ديون المورد
+    if invoice.payment_type == 'credit' and invoice.supplier_id:
+        adjust_balance(Supplier, invoice.supplier_id, invoice.final_amount)
+    
+    daily_summary.record_purchase_invoice(invoice)
+    db.session.commit()
+    return invoice
+
+def _payment_amount(data):
+    try:
+        amount = float(data.get('amount', 0))
+    except (TypeError, ValueError):
+        raise InvoiceError('المبلغ غير صحيح')
+    if amount <= 0:
+        raise InvoiceError('يجب أن يكون المبلغ أكبر من صفر')
+    return amount
+
+@retry_on_conflict()
+def create_payment_receipt(data, user_id):
+    """Store a payment receipt and reduce the customer's balance.
+
+    Returns None when the customer does not exist.
+    """
+    customer_id = data.get('customer_id')
+    if not customer_id:
+        raise InvoiceError('يجب تحديد العميل')
+    amount = _payment_amount(data)
+    
+    # تحديث رصيد العميل ذرياً، ولا صف محدَّث يعني أن العميل غير موجود
+    if not adjust_balance(Customer, customer_id, -amount):
+        db.session.rollback()
+        return None
+    
+    receipt = PaymentReceipt(
+        receipt_number=placeholder_number(),
+        customer_id=customer_id,
+        user_id=user_id,
+        amount=amount,
+        notes=data.get('notes', '')
+    )
+    db.session.add(receipt)
+    db.session.flush()  # للحصول على معرف السند
+    receipt.receipt_number = f"R{receipt.id:06d}"
+    
+    db.session.commit()
+    return receipt
+
+@retry_on_conflict()
+def create_payment_voucher(data, user_id):
+    """Store a payment voucher and reduce the supplier's balance.
+
+    Returns None when the supplier does not exist.
+    """
+    supplier_id = data.get('supplier_id')
+    if not supplier_id:
+        raise InvoiceError('يجب تحديد المورد')
+    amount = _payment_amount(data)
+    
+    # تحديث رصيد المورد ذرياً، ولا صف محدَّث يعني أن المورد غير موجود
+    if not adjust_balance(Supplier, supplier_id, -amount):
+        db.session.rollback()
+        return None
+    
+    voucher = PaymentVoucher(
+        voucher_number=placeholder_number(),
+        supplier_id=supplier_id,
+        user_id=user_id,
+        amount=amount,
+        notes=data.get('notes', '')
+    )
+    db.session.add(voucher)
+    db.session.flush()  # للحصول على معرف السند
+    voucher.voucher_number = f"V{voucher.id:06d}"
+    
+    db.session.commit()
+    return voucher
@@ -0,0 +1,110 @@
+from src.models.user import db
+from datetime import datetime
+import base64
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import joinedload, raiseload
+
+def items_count(document_model, item_model):
+    """Correlated ``COUNT`` of a document's line items, labelled ``items_count``."""
+    return select(
+        func.count(item_model.id)
+    ).where(
+        item_model.invoice_id == document_model.id
+    ).correlate(document_model).scalar_subquery().label('items_count')
+
+def list_query(model, eager=(), items=None):
+    """Build the base query for a paginated list endpoint.
+
+    ``eager`` relationships are joined into the page query and every other
+    relationship raises on access, so a page costs the same number of
+    statements whatever its size. When ``items`` (the line item model) is
+    given, each result row is ``(document, items_count)``.
+    """
+    columns = [model]
+    if items is not None:
+        columns.append(items_count(model, items))
+    options = [joinedload(relationship) for relationship in eager]
+    options.append(raiseload('*'))
+    return db.session.query(*columns).options(*options)
+
+class InvalidCursor(ValueError):
+    """Bad paging arguments (``cursor`` or ``per_page``); list endpoints answer 400."""
+    pass
+
+def page_size(args, default, limit=100):
+    """``per_page`` from the query string, kept between 1 and ``limit``."""
+    value = args.get('per_page')
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidCursor('per_page غير صالح')
+    return max(1, min(value, limit))
+
+def encode_cursor(created_at, row_id, balance=None):
+    """Cursor token for the ``(created_at, id)`` position, and the running balance there if given."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    if balance is not None:
+        raw += f"|{balance!r}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token, with_balance=False):
+    """Return the ``(created_at, id)`` position stored in a cursor token.
+
+    ``with_balance`` returns ``(created_at, id, balance)`` for the cursors
+    of running-balance lists.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        parts = raw.split('|')
+        if len(parts) != (3 if with_balance else 2):
+            raise ValueError(token)
+        position = datetime.fromisoformat(parts[0]), int(parts[1])
+        return position + (float(parts[2]),) if with_balance else position
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('cursor غير صالح')
+
+def paginate(query, model, args, default_per_page=10):
+    """Page ``query`` newest-first and return ``(items, meta)``.
+
+    Offset pages (``?page=``) keep the classic ``total``/``pages`` meta.
+    Passing ``?cursor=`` (empty for the first page) switches to keyset
+    paging on ``(created_at, id)``: each page is a single indexed range
+    query whatever its depth, ``next_cursor`` continues from the last row,
+    and the ``COUNT(*)`` is only run when ``?total=1`` is given.
+    """
+    per_page = page_size(args, default_per_page)
+    ordered = query.order_by(model.created_at.desc(), model.id.desc())
+
+    if 'cursor' not in args:
+        page = args.get('page', 1, type=int)
+        result = ordered.paginate(page=page, per_page=per_page, error_out=False)
+        return result.items, {
+            'total': result.total,
+            'pages': result.pages,
+            'current_page': page
+        }
+
+    meta = {}
+    if args.get('total', type=int):
+        meta['total'] = query.order_by(None).count()
+
+    token = args.get('cursor')
+    if token:
+        created_at, row_id = decode_cursor(token)
+        ordered = ordered.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    items = ordered.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    last = items[-1] if items else None
+    if last is not None and not isinstance(last, model) and isinstance(last[0], model):
+        # (document, items_count) صفوف؛ صفوف الـ projection فيها id و created_at مباشرة
+        last = last[0]
+    meta['has_more'] = has_more
+    meta['next_cursor'] = encode_cursor(last.created_at, last.id) if has_more else None
+    return items, meta
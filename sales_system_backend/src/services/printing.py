@@ -0,0 +1,138 @@
+"""Server-side rendering of printable A5 documents.
+
+The Jinja template in ``src/templates/print/documents.html`` is compiled
+once by the application's Jinja environment and cached; every request
+only fills it in. Documents are loaded in chunks of ``CHUNK_SIZE``: one
+query for the headers and one per chunk for the line items, and the page
+is streamed to the client while the next chunk is read, so a whole day
+of invoices prints from a single request.
+"""
+from src.serializers import projection
+from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem, PaymentReceipt, PaymentVoucher
+
+TEMPLATE = 'print/documents.html'
+
+# عدد المستندات التي تُقرأ بنودها في استعلام واحد
+CHUNK_SIZE = 200
+# أقصى عدد مستندات في طلب طباعة واحد
+MAX_DOCUMENTS = 5000
+# أقل عدد أسطر في جدول الفاتورة، تُكمل بأسطر فارغة كما في القالب الورقي
+MIN_ROWS = 5
+
+class DocumentType:
+    def __init__(self, model, header, title, party_label, items=None, item_model=None):
+        self.model = model
+        self.header = header
+        self.title = title
+        self.party_label = party_label
+        self.items = items
+        self.item_model = item_model
+
+DOCUMENT_TYPES = {
+    'sales-invoices': DocumentType(SalesInvoice, 'sales_invoice.print', ('فاتورة', 'مبيعات'), 'اسم العميل',
+                                   'sales_invoice_item.print', SalesInvoiceItem),
+    'purchase-invoices': DocumentType(PurchaseInvoice, 'purchase_invoice.print', ('فاتورة', 'مشتريات'), 'اسم المورد',
+                                      'purchase_invoice_item.print', PurchaseInvoiceItem),
+    'payment-receipts': DocumentType(PaymentReceipt, 'payment_receipt.print', ('سند', 'قبض'), 'استلمنا من'),
+    'payment-vouchers': DocumentType(PaymentVoucher, 'payment_voucher.print', ('سند', 'صرف'), 'دفعنا إلى'),
+}
+
+class TooManyDocuments(ValueError):
+    pass
+
+def header_rows(kind, ids=None, start=None, end=None):
+    """Header rows of ``kind`` by id list or by ``created_at`` range, oldest first."""
+    spec = DOCUMENT_TYPES[kind]
+    view = projection(spec.header)
+    query = view.query()
+    if ids is not None:
+        query = query.filter(spec.model.id.in_(ids))
+    if start is not None:
+        query = query.filter(spec.model.created_at >= start)
+    if end is not None:
+        query = query.filter(spec.model.created_at < end)
+    rows = query.order_by(spec.model.created_at, spec.model.id).limit(MAX_DOCUMENTS + 1).all()
+    if len(rows) > MAX_DOCUMENTS:
+        raise TooManyDocuments(f'لا يمكن طباعة أكثر من {MAX_DOCUMENTS} مستند في طلب واحد')
+    return [view.row(row) for row in rows]
+
+def documents(kind, headers):
+    """Yield ``headers`` with their ``items``, reading the items chunk by chunk."""
+    spec = DOCUMENT_TYPES[kind]
+    for offset in range(0, len(headers), CHUNK_SIZE):
+        chunk = headers[offset:offset + CHUNK_SIZE]
+        items = {}
+        if spec.items:
+            view = projection(spec.items)
+            rows = view.query().filter(
+                spec.item_model.invoice_id.in_([document['id'] for document in chunk])
+            ).order_by(spec.item_model.invoice_id, spec.item_model.id)
+            for row in view.rows(rows):
+                items.setdefault(row['invoice_id'], []).append(row)
+        for document in chunk:
+            document['items'] = items.get(document['id'], [])
+            yield document
+
+# -- المبلغ كتابةً ---------------------------------------------------------------
+
+_ONES = ['', 'واحد', 'اثنان', 'ثلاثة', 'أربعة', 'خمسة', 'ستة', 'سبعة', 'ثمانية', 'تسعة',
+         'عشرة', 'أحد عشر', 'اثنا عشر', 'ثلاثة عشر', 'أربعة عشر', 'خمسة عشر', 'ستة عشر',
+         'سبعة عشر', 'ثمانية عشر', 'تسعة عشر']
+_TENS = ['', '', 'عشرون', 'ثلاثون', 'أربعون', 'خمسون', 'ستون', 'سبعون', 'ثمانون', 'تسعون']
+_HUNDREDS = ['', 'مائة', 'مائتان', 'ثلاثمائة', 'أربعمائة', 'خمسمائة', 'ستمائة', 'سبعمائة', 'ثمانمائة', 'تسعمائة']
+# (مفرد، مثنى، جمع 3-10)
+_SCALES = [
+    (10 ** 9, ('مليار', 'ملياران', 'مليارات')),
+    (10 ** 6, ('مليون', 'مليونان', 'ملايين')),
+    (10 ** 3, ('ألف', 'ألفان', 'آلاف')),
+]
+
+def _below_thousand(number):
+    parts = []
+    if number >= 100:
+        parts.append(_HUNDREDS[number // 100])
+        number %= 100
+    if number >= 20:
+        # الآحاد قبل العشرات: خمسة وعشرون
+        parts.append(f'{_ONES[number % 10]} و{_TENS[number // 10]}' if number % 10 else _TENS[number // 10])
+    elif number:
+        parts.append(_ONES[number])
+    return ' و'.join(parts)
+
+def _words(number):
+    parts = []
+    for scale, (single, dual, plural) in _SCALES:
+        count, number = divmod(number, scale)
+        if count == 1:
+            parts.append(single)
+        elif count == 2:
+            parts.append(dual)
+        elif 3 <= count <= 10:
+            parts.append(f'{_below_thousand(count)} {plural}')
+        elif count >= 1000:
+            # أكبر من آخر مرتبة: يُكتب العدد نفسه كتابةً، مثل ألف مليار
+            parts.append(f'{_words(count)} {single}')
+        elif count:
+            parts.append(f'{_below_thousand(count)} {single}')
+    if number:
+        parts.append(_below_thousand(number))
+    return ' و'.join(parts)
+
+def amount_in_words(amount, currency='دينار عراقي'):
+    """Arabic words for a whole amount, e.g. ``100000`` -> ``مائة ألف دينار عراقي``.
+
+    A negative amount (a discount above the total) is written with ``سالب``.
+    """
+    number = int(round(amount or 0))
+    if number == 0:
+        return f'صفر {currency}'
+    sign = 'سالب ' if number < 0 else ''
+    return f'{sign}{_words(abs(number))} {currency}'
+
+def format_amount(value):
+    return f'{value or 0:,.0f}'
+
+def init_app(app):
+    """Register the template filters the print template uses."""
+    app.jinja_env.filters['amount'] = format_amount
+    app.jinja_env.filters['amount_in_words'] = amount_in_words
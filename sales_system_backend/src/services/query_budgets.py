@@ -0,0 +1,281 @@
+"""SQL statement budgets for the API routes.
+
+A route declares the most statements one request may execute::
+
+    @sales_bp.route('/sales/invoices/<int:invoice_id>', methods=['GET'])
+    @query_budget(2)
+    @jwt_required()
+    def get_sales_invoice(invoice_id): ...
+
+``check_query_budgets`` seeds two throw-away databases (SQLite, or on the
+server of a PostgreSQL ``DATABASE_URL``), a small one and one several
+times larger, calls every route of the checked blueprints on
+each, and fails a route that goes over its budget or runs more statements
+on the larger data (an N+1 over items or page rows).
+"""
+from src.engine import database_uri
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, make_url, text
+import os
+import re
+import tempfile
+
+CHECKED_BLUEPRINTS = ('auth', 'users', 'sales', 'reports', 'inventory', 'print', 'export')
+
+# مسارات قوائم التحضير تستخدم title وحقولا أخرى غير موجودة في نموذج PreparationList
+# فتفشل دائما بـ 500؛ أي 5xx من مسار آخر يفشل الفحص
+KNOWN_BROKEN = {
+    'inventory.get_preparation_lists',
+    'inventory.get_preparation_list',
+    'inventory.create_preparation_list',
+    'inventory.toggle_preparation_item',
+}
+
+# حجم البيانات: عدد الصفوف في كل قائمة وعدد البنود في كل فاتورة
+SMALL_SCALE = 2
+LARGE_SCALE = 12
+
+def query_budget(statements):
+    """Declare the most SQL statements the decorated view may execute.
+
+    Place it directly under ``@<blueprint>.route``.
+    """
+    def decorate(view):
+        view.query_budget = statements
+        return view
+    return decorate
+
+# -- البيانات التجريبية -------------------------------------------------------
+
+def seed(scale):
+    """Fill the current database with ``scale`` rows per list.
+
+    Returns the values the route arguments are filled from.
+    """
+    from src.models.user import db, User
+    from src.models.inventory import Category, Product, Customer, Supplier
+    from src.models.operations import Expense, InventoryMovement, PreparationList
+    from src.services import invoicing
+    import json
+
+    admin = User.query.filter_by(username='admin').one()
+    users = [User(username=f'user{i}', full_name=f'مستخدم {i}', role='user') for i in range(scale)]
+    for user in users:
+        user.set_password('secret1')
+    categories = [Category(name=f'فئة {i}') for i in range(scale)]
+    db.session.add_all(users + categories)
+    db.session.flush()
+    products = [
+        Product(name=f'منتج {i}', barcode=f'B{i:05d}', category_id=categories[i % scale].id,
+                selling_price=1000, purchase_price=700, stock_quantity=10 ** 6, min_stock=0)
+        for i in range(scale * scale)
+    ]
+    # منتجات قليلة المخزون لصفحة low-stock
+    products += [Product(name=f'ناقص {i}', category_id=categories[i % scale].id, stock_quantity=1, min_stock=5)
+                 for i in range(scale)]
+    # منتج بلا حركات يُعدَّل ويُحذف في النهاية
+    spare = Product(name='احتياطي', barcode='SPARE', category_id=categories[0].id)
+    customers = [Customer(name=f'زبون {i}') for i in range(scale)]
+    suppliers = [Supplier(name=f'مورد {i}') for i in range(scale)]
+    db.session.add_all(products + [spare] + customers + suppliers)
+    db.session.flush()
+    db.session.add_all([Expense(description=f'مصروف {i}', amount=100, category='عام', user_id=admin.id) for i in range(scale)])
+    db.session.add_all([
+        InventoryMovement(product_id=products[i].id, movement_type='in', quantity=1,
+                          reference_type='manual', user_id=admin.id)
+        for i in range(scale)
+    ])
+    db.session.add_all([
+        PreparationList(list_number=f'P{i:05d}', customer_name=f'زبون {i}', created_by=admin.id,
+                        items_json=json.dumps([{'product_id': products[n].id, 'quantity': 1} for n in range(scale)]))
+        for i in range(scale)
+    ])
+    db.session.commit()
+
+    def lines():
+        return [{'product_id': products[n].id, 'quantity': 1, 'unit_price': 1000} for n in range(scale)]
+    for i in range(scale):
+        sales_invoice = invoicing.create_sales_invoice(
+            {'customer_id': customers[i].id, 'payment_type': 'credit', 'items': lines()}, admin.id)
+        invoicing.create_purchase_invoice(
+            {'supplier_id': suppliers[i].id, 'payment_type': 'credit', 'items': lines()}, admin.id)
+        receipt = invoicing.create_payment_receipt({'customer_id': customers[i].id, 'amount': 10}, admin.id)
+        voucher = invoicing.create_payment_voucher({'supplier_id': suppliers[i].id, 'amount': 10}, admin.id)
+
+    return {
+        'scale': scale,
+        'lines': lines(),
+        'customer_id': customers[-1].id,
+        'supplier_id': suppliers[-1].id,
+        'category_id': categories[0].id,
+        'args': {
+            'user_id': users[-1].id,
+            'customer_id': customers[-1].id,
+            'supplier_id': suppliers[-1].id,
+            'invoice_id': sales_invoice.id,
+            'receipt_id': receipt.id,
+            'voucher_id': voucher.id,
+            'expense_id': Expense.query.order_by(Expense.id.desc()).first().id,
+            'product_id': spare.id,
+            'barcode': spare.barcode,
+            'list_id': PreparationList.query.order_by(PreparationList.id.desc()).first().id,
+            'item_id': 1,
+            'kind': 'sales-invoices',
+            'document_id': sales_invoice.id,
+            'dataset': 'sales-invoice-items',
+        },
+    }
+
+# جسم الطلب لكل route تكتب بيانات
+PAYLOADS = {
+    'auth.login': lambda data: {'username': 'admin', 'password': 'admin123'},
+    'auth.change_password': lambda data: {'current_password': 'admin123', 'new_password': 'admin123'},
+    'users.create_user': lambda data: {'username': 'new_user', 'password': 'secret1', 'full_name': 'جديد'},
+    'users.update_user': lambda data: {'full_name': 'معدل'},
+    'sales.create_sales_invoice': lambda data: {'customer_id': data['customer_id'], 'payment_type': 'credit', 'items': data['lines']},
+    'sales.create_purchase_invoice': lambda data: {'supplier_id': data['supplier_id'], 'payment_type': 'credit', 'items': data['lines']},
+    'sales.create_customer': lambda data: {'name': 'زبون جديد'},
+    'sales.create_payment_receipt': lambda data: {'customer_id': data['customer_id'], 'amount': 5},
+    'sales.create_payment_voucher': lambda data: {'supplier_id': data['supplier_id'], 'amount': 5},
+    'reports.create_expense': lambda data: {'description': 'مصروف', 'amount': 50},
+    'inventory.create_product': lambda data: {'name': 'منتج جديد', 'category_id': data['category_id'], 'stock_quantity': 5},
+    'inventory.update_product': lambda data: {'stock_quantity': 3},
+    'inventory.create_category': lambda data: {'name': 'فئة جديدة'},
+    'inventory.create_preparation_list': lambda data: {'title': 'قائمة', 'items': []},
+    'inventory.update_preparation_list_status': lambda data: {'status': 'completed'},
+}
+
+# القراءة أولاً ثم الكتابة، والحذف أخيراً حتى لا يختفي ما تحتاجه الطلبات الأخرى
+METHOD_ORDER = ('GET', 'POST', 'PUT', 'DELETE')
+
+_ARGUMENT = re.compile(r'<(?:\w+:)?(\w+)>')
+
+def _requests(app):
+    """``[(endpoint, method, rule)]`` for every checked route, in run order."""
+    routes = []
+    for rule in app.url_map.iter_rules():
+        blueprint = rule.endpoint.rpartition('.')[0]
+        if blueprint not in CHECKED_BLUEPRINTS:
+            continue
+        for method in rule.methods & set(METHOD_ORDER):
+            routes.append((METHOD_ORDER.index(method), rule.rule, rule.endpoint, method))
+    routes.sort()
+    return [(endpoint, method, rule) for _, rule, endpoint, method in routes]
+
+@contextmanager
+def _scratch_database(scale):
+    """Yield the URI of an empty throw-away database, dropped afterwards.
+
+    A temporary SQLite file, or a new database on the server of a
+    PostgreSQL ``DATABASE_URL`` so the check runs on that dialect.
+    """
+    server = database_uri('')
+    if server.startswith('postgresql'):
+        name = f'query_budgets_{os.getpid()}_{scale}'
+        admin = create_engine(server, isolation_level='AUTOCOMMIT')
+        try:
+            with admin.connect() as connection:
+                connection.execute(text(f'CREATE DATABASE {name}'))
+            try:
+                yield make_url(server).set(database=name).render_as_string(hide_password=False)
+            finally:
+                with admin.connect() as connection:
+                    connection.execute(text(f'DROP DATABASE IF EXISTS {name}'))
+        finally:
+            admin.dispose()
+        return
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        yield f'sqlite:///{path}'
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+def _measure(scale):
+    """Seed a fresh database at ``scale`` and count each route's statements.
+
+    Returns ``{(endpoint, method): (statements, status, error)}``.
+    """
+    from src.main import create_app
+    from src.cli import prepare_database
+    from src.models.user import db
+
+    with _scratch_database(scale) as uri:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'SLOW_REQUEST_MS': float('inf')})
+        with app.app_context():
+            prepare_database()
+            data = seed(scale)
+            engine = db.engine
+        client = app.test_client()
+        token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        executed = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+        event.listen(engine, 'before_cursor_execute', count)
+
+        adapter = app.url_map.bind('localhost')
+        results = {}
+        for endpoint, method, rule in _requests(app):
+            missing = [name for name in _ARGUMENT.findall(rule) if name not in data['args']]
+            if missing:
+                results[(endpoint, method)] = (None, None, f"no sample value for {', '.join(missing)}")
+                continue
+            url = _ARGUMENT.sub(lambda match: str(data['args'][match.group(1)]), rule)
+            served_by = adapter.match(url, method=method)[0]
+            if served_by != endpoint:
+                results[(endpoint, method)] = (None, None, f'unreachable, {served_by} serves this URL')
+                continue
+            if method == 'GET':
+                url += f'?per_page={scale}'
+            payload = PAYLOADS.get(endpoint)
+            del executed[:]
+            response = client.open(url, method=method, headers=headers,
+                                   json=payload(data) if payload else None)
+            # الاستجابات المبثوثة تنفذ استعلاماتها أثناء القراءة
+            response.get_data()
+            results[(endpoint, method)] = (len(executed), response.status_code, None)
+
+        event.remove(engine, 'before_cursor_execute', count)
+        with app.app_context():
+            db.engine.dispose()
+        return app, results
+
+def check_query_budgets():
+    """Run every checked route at both scales against its declared budget.
+
+    Returns ``[(route, status, budget, small, large, problem)]`` where
+    ``status`` is ``'OK'``, ``'FAIL'`` or ``'SKIP'`` (a ``KNOWN_BROKEN``
+    route errored or another route shadows its URL, so its statements say
+    nothing). Any other route answering 5xx fails.
+    """
+    app, small = _measure(SMALL_SCALE)
+    _, large = _measure(LARGE_SCALE)
+
+    report = []
+    for (endpoint, method), (small_count, small_status, error) in small.items():
+        large_count, large_status, _ = large[(endpoint, method)]
+        budget = getattr(app.view_functions[endpoint], 'query_budget', None)
+        route = f'{method} {endpoint}'
+        if error and error.startswith('unreachable'):
+            report.append((route, 'SKIP', budget, None, None, error))
+        elif error:
+            report.append((route, 'FAIL', budget, None, None, error))
+        elif small_status >= 500 or large_status >= 500:
+            status = 'SKIP' if endpoint in KNOWN_BROKEN else 'FAIL'
+            report.append((route, status, budget, small_count, large_count,
+                           f'responded {max(small_status, large_status)}'))
+        elif budget is None:
+            report.append((route, 'FAIL', budget, small_count, large_count, 'no @query_budget declared'))
+        elif max(small_count, large_count) > budget:
+            report.append((route, 'FAIL', budget, small_count, large_count, 'over budget'))
+        elif large_count > small_count:
+            report.append((route, 'FAIL', budget, small_count, large_count,
+                           f'grows with data ({SMALL_SCALE} -> {LARGE_SCALE} rows)'))
+        else:
+            report.append((route, 'OK', budget, small_count, large_count, None))
+    return report
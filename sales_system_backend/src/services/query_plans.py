@@ -0,0 +1,69 @@
+from src.models.user import db
+from src.models.inventory import Product
+from src.models.operations import InventoryMovement
+from src.models.invoices import SalesInvoiceItem
+from src.routes import reports
+from src.services import statements, stock_ledger
+from datetime import datetime, timedelta
+
+def _checks():
+    """(name, query, index that must appear in its plan) for each report query."""
+    today = datetime.now().date()
+    month_ago = today - timedelta(days=29)
+    checks = [
+        ('sales chart by day', reports.sales_by_day_query(month_ago, today),
+         'ix_sales_invoices_created_at_payment_type'),
+        ('sales chart by month', reports.sales_by_month_query(today - timedelta(days=365), today),
+         'ix_sales_invoices_created_at_payment_type'),
+        ('top products', reports.top_products_query(month_ago, today),
+         'ix_sales_invoices_created_at_payment_type'),
+        ('top products lines', reports.top_products_query(month_ago, today),
+         'ix_sales_invoice_items_invoice_id_product_id'),
+        ('invoice lines', SalesInvoiceItem.query.filter(SalesInvoiceItem.invoice_id == 1),
+         'ix_sales_invoice_items_invoice_id_product_id'),
+        ('product movements', InventoryMovement.query.filter(
+            InventoryMovement.product_id == 1
+        ).order_by(InventoryMovement.created_at.desc()),
+         'ix_inventory_movements_product_id_created_at'),
+        ('stock at date', stock_ledger.stock_at(datetime.combine(month_ago, datetime.min.time())).where(Product.id == 1),
+         'ix_inventory_movements_product_id_created_at'),
+    ]
+    month_start = datetime.combine(month_ago, datetime.min.time())
+    for kind, account in statements.ACCOUNTS.items():
+        for name, index_name in ((account.invoice.__tablename__, f'ix_{account.invoice.__tablename__}_{kind}_id_created_at'),
+                                 (account.payment.__tablename__, f'ix_{account.payment.__tablename__}_{kind}_id_created_at')):
+            checks.append((
+                f'{kind} statement {name}',
+                statements.page(account, 1, start=month_start, after=(month_start, 0)),
+                index_name
+            ))
+    for key, direction, amount, created_at, filters in reports.cash_flow_sources():
+        # مصادر الفواتير تُصفّى على نوع الدفع فتستخدم الفهرس المركّب
+        index_name = f'ix_{created_at.table.name}_created_at'
+        if filters:
+            index_name += '_payment_type'
+        checks.append((
+            f'cash flow {key}',
+            reports.daily_totals_query(amount, created_at, month_ago, today, *filters),
+            index_name
+        ))
+    return checks
+
+def explain(query):
+    """Return the ``EXPLAIN QUERY PLAN`` detail lines for an ORM query or a ``select``."""
+    compiled = getattr(query, 'statement', query).compile(dialect=db.engine.dialect)
+    params = [compiled.params[name] for name in compiled.positiontup]
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(params))
+    return [row[-1] for row in rows]
+
+def check_query_plans():
+    """Explain every report query and verify it searches its expected index.
+
+    Returns a list of ``(name, ok, plan_lines)`` tuples.
+    """
+    results = []
+    for name, query, index_name in _checks():
+        plan = explain(query)
+        ok = any(f"INDEX {index_name} " in f"{line} " for line in plan)
+        results.append((name, ok, plan))
+    return results
@@ -0,0 +1,246 @@
+from src.models.user import db
+from src.models.inventory import Customer, Supplier, Product
+from src.models.invoices import SalesInvoice, PurchaseInvoice
+from sqlalchemy import event, inspect, text, select, bindparam, Integer
+import re
+
+# كل سجل في فهرس البحث يُخزَّن بـ rowid = ref_id * 8 + رمز النوع
+# حتى يكون التحديث والحذف بحثاً مباشراً على المفتاح
+KIND_CODES = {
+    'customer': 1,
+    'supplier': 2,
+    'product': 3,
+    'sales_invoice': 4,
+    'purchase_invoice': 5,
+}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+ROWID_STRIDE = 8
+
+_TASHKEEL = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+_TOKEN = re.compile(r'\w+')
+
+CREATE_INDEX_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "label UNINDEXED, body, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+def normalize_arabic(value):
+    """Fold Arabic spelling variants so أحمد/احمد and فاطمة/فاطمه match.
+
+    Strips tashkeel and tatweel, unifies alef/hamza forms, ta marbuta,
+    alef maqsura and Arabic-Indic digits, and lower-cases Latin text.
+    """
+    if not value:
+        return ''
+    return _TASHKEEL.sub('', str(value)).translate(_LETTERS).lower()
+
+def _number_terms(number):
+    """``S000123`` is also indexed as ``000123`` and ``123``."""
+    if not number:
+        return ''
+    digits = re.sub(r'\D', '', number)
+    return ' '.join(filter(None, [number, digits, digits.lstrip('0')]))
+
+def _document(kind, target):
+    """Return ``(label, body)`` for an indexed row."""
+    if kind in ('customer', 'supplier'):
+        return target.name, ' '.join(filter(None, [target.name, target.phone]))
+    if kind == 'product':
+        return target.name, ' '.join(filter(None, [target.name, target.description]))
+    if kind == 'sales_invoice':
+        return target.invoice_number, ' '.join(filter(None, [
+            _number_terms(target.invoice_number), target.customer_name
+        ]))
+    return target.invoice_number, _number_terms(target.invoice_number)
+
+_ready_engines = set()
+
+def search_available(connection=None):
+    """True when the database is SQLite and the FTS5 index exists."""
+    connection = connection or db.session.connection()
+    engine = connection.engine
+    if engine.url in _ready_engines:
+        return True
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    )).first() is not None
+    if exists:
+        _ready_engines.add(engine.url)
+    return exists
+
+def _rowid(kind, ref_id):
+    return ref_id * ROWID_STRIDE + KIND_CODES[kind]
+
+def index_row(connection, kind, target):
+    label, body = _document(kind, target)
+    rowid = _rowid(kind, target.id)
+    connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {'rowid': rowid})
+    connection.execute(
+        text("INSERT INTO search_index (rowid, label, body) VALUES (:rowid, :label, :body)"),
+        {'rowid': rowid, 'label': label, 'body': normalize_arabic(body)}
+    )
+
+def index_rows(connection, kind, ids, new=False):
+    """Index the ``kind`` rows with ``ids`` in bulk (bulk writes skip the mapper events).
+
+    ``new`` rows were just inserted, so there is no old entry to delete.
+    """
+    if not ids or not search_available(connection):
+        return
+    model = INDEXED_MODELS[kind]
+    columns = [model.__table__.c.id] + [model.__table__.c[field] for field in INDEXED_FIELDS[kind]]
+    rows = []
+    for target in connection.execute(select(*columns).where(model.__table__.c.id.in_(ids))):
+        label, body = _document(kind, target)
+        rows.append({'rowid': _rowid(kind, target.id), 'label': label, 'body': normalize_arabic(body)})
+    if not rows:
+        return
+    if not new:
+        connection.execute(
+            text("DELETE FROM search_index WHERE rowid IN :rowids").bindparams(bindparam('rowids', expanding=True)),
+            {'rowids': [row['rowid'] for row in rows]}
+        )
+    connection.execute(text("INSERT INTO search_index (rowid, label, body) VALUES (:rowid, :label, :body)"), rows)
+
+def unindex_row(connection, kind, ref_id):
+    connection.execute(
+        text("DELETE FROM search_index WHERE rowid = :rowid"),
+        {'rowid': _rowid(kind, ref_id)}
+    )
+
+# الحقول التي يُبنى منها نص البحث لكل نوع
+INDEXED_FIELDS = {
+    'customer': ('name', 'phone'),
+    'supplier': ('name', 'phone'),
+    'product': ('name', 'description'),
+    'sales_invoice': ('invoice_number', 'customer_name'),
+    'purchase_invoice': ('invoice_number',),
+}
+
+def _register(model, kind):
+    def on_insert(mapper, connection, target):
+        if search_available(connection):
+            index_row(connection, kind, target)
+
+    def on_update(mapper, connection, target):
+        # تحديث الأرصدة والمجاميع لا يغيّر نص البحث
+        state = inspect(target)
+        if not any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS[kind]):
+            return
+        if search_available(connection):
+            index_row(connection, kind, target)
+
+    def on_delete(mapper, connection, target):
+        if search_available(connection):
+            unindex_row(connection, kind, target.id)
+
+    event.listen(model, 'after_insert', on_insert)
+    event.listen(model, 'after_update', on_update)
+    event.listen(model, 'after_delete', on_delete)
+
+INDEXED_MODELS = {
+    'customer': Customer,
+    'supplier': Supplier,
+    'product': Product,
+    'sales_invoice': SalesInvoice,
+    'purchase_invoice': PurchaseInvoice,
+}
+
+for _kind, _model in INDEXED_MODELS.items():
+    _register(_model, _kind)
+
+def rebuild(connection):
+    """Recreate the FTS index from the source tables. Returns the row count."""
+    connection.execute(text(CREATE_INDEX_SQL))
+    connection.execute(text("DELETE FROM search_index"))
+    total = 0
+    for kind, model in INDEXED_MODELS.items():
+        rows = []
+        # الأعمدة المفهرسة فقط، حتى تعمل الهجرة على قاعدة لم تُضف لها أعمدة لاحقة بعد
+        columns = [model.__table__.c.id] + [model.__table__.c[field] for field in INDEXED_FIELDS[kind]]
+        for target in connection.execute(select(*columns)):
+            label, body = _document(kind, target)
+            rows.append({'rowid': _rowid(kind, target.id), 'label': label, 'body': normalize_arabic(body)})
+        if rows:
+            connection.execute(
+                text("INSERT INTO search_index (rowid, label, body) VALUES (:rowid, :label, :body)"),
+                rows
+            )
+        total += len(rows)
+    _ready_engines.add(connection.engine.url)
+    return total
+
+def match_expression(term):
+    """Turn user input into an FTS5 query: every word must match as a prefix."""
+    tokens = _TOKEN.findall(normalize_arabic(term))
+    return ' '.join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+def matching_ids(kind, term):
+    """Select the ids of ``kind`` rows matching ``term``, for use in ``IN (...)``."""
+    return text(
+        "SELECT rowid / :stride AS ref_id FROM search_index "
+        "WHERE search_index MATCH :query AND rowid % :stride = :code"
+    ).bindparams(
+        bindparam('stride', ROWID_STRIDE, unique=True),
+        bindparam('query', match_expression(term), unique=True),
+        bindparam('code', KIND_CODES[kind], unique=True)
+    ).columns(ref_id=Integer)
+
+def filter_sales_invoices(query, term):
+    """Restrict a sales invoice query to ``?search=`` matches (number or customer name)."""
+    if match_expression(term) and search_available():
+        # بحث مفهرس (FTS5) في رقم الفاتورة واسم العميل مع توحيد الإملاء العربي
+        return query.filter(
+            SalesInvoice.id.in_(matching_ids('sales_invoice', term)) |
+            SalesInvoice.customer_id.in_(matching_ids('customer', term))
+        )
+    # البحث في رقم الفاتورة
+    if term.isdigit():
+        return query.filter(SalesInvoice.invoice_number.like(f"%{term}%"))
+    # البحث في اسم العميل (سواء كان مخزناً أو مدخلاً يدوياً)
+    customer_ids = db.session.query(Customer.id).filter(Customer.name.like(f"%{term}%"))
+    return query.filter(
+        (SalesInvoice.customer_id.in_(customer_ids)) |
+        (SalesInvoice.customer_name.like(f"%{term}%"))
+    )
+
+def filter_purchase_invoices(query, term):
+    """Restrict a purchase invoice query to ``?search=`` matches (number or supplier name)."""
+    if match_expression(term) and search_available():
+        # بحث مفهرس (FTS5) في رقم الفاتورة واسم المورد
+        return query.filter(
+            PurchaseInvoice.id.in_(matching_ids('purchase_invoice', term)) |
+            PurchaseInvoice.supplier_id.in_(matching_ids('supplier', term))
+        )
+    # البحث في رقم الفاتورة
+    if term.isdigit():
+        return query.filter(PurchaseInvoice.invoice_number.like(f"%{term}%"))
+    # البحث في اسم المورد
+    supplier_ids = db.session.query(Supplier.id).filter(Supplier.name.like(f"%{term}%"))
+    return query.filter(PurchaseInvoice.supplier_id.in_(supplier_ids))
+
+def search(term, kinds=None, limit=20):
+    """Ranked matches across the index as ``[(kind, id, label, rank)]``."""
+    query = match_expression(term)
+    if not query:
+        return []
+    codes = [KIND_CODES[kind] for kind in (kinds or KIND_CODES)]
+    rows = db.session.execute(text(
+        "SELECT rowid, label, bm25(search_index) AS rank FROM search_index "
+        "WHERE search_index MATCH :query AND rowid % :stride IN ({codes}) "
+        "ORDER BY rank LIMIT :limit".format(codes=', '.join(str(code) for code in codes))
+    ), {'query': query, 'stride': ROWID_STRIDE, 'limit': limit})
+    return [
+        (KINDS[row.rowid % ROWID_STRIDE], row.rowid // ROWID_STRIDE, row.label, row.rank)
+        for row in rows
+    ]
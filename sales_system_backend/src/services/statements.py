@@ -0,0 +1,114 @@
+"""Customer and supplier account statements.
+
+A statement lists the documents that move an account's balance, credit
+invoices (debit) and payment receipts or vouchers (credit), merged in
+SQL with ``UNION ALL`` in ``(created_at, sequence)`` order. ``sequence``
+is ``id * 2`` for invoices and ``id * 2 + 1`` for payments, so every
+entry has a unique position for keyset paging. The running balance is a
+window ``SUM`` over the page added to the balance the page starts from:
+the opening balance on the first page, the balance carried by the cursor
+after it.
+
+Each branch of the union is read through its ``(party_id, created_at)``
+index from the cursor on and cut to one page before the merge, so a page
+costs the same on a five-year agent account as on a new one.
+"""
+from src.models.inventory import Customer, Supplier
+from src.models.invoices import SalesInvoice, PurchaseInvoice, PaymentReceipt, PaymentVoucher
+from sqlalchemy import and_, case, func, literal, or_, select, true, union_all
+
+class Account:
+    """A party whose balance is moved by credit invoices (up) and payments (down)."""
+
+    def __init__(self, party, invoice, invoice_party, payment, payment_party, payment_number, payment_kind, not_found):
+        self.party = party
+        self.invoice = invoice
+        self.invoice_party = invoice_party
+        self.payment = payment
+        self.payment_party = payment_party
+        self.payment_number = payment_number
+        self.payment_kind = payment_kind
+        self.not_found = not_found
+
+    def sources(self):
+        """``(kind, model, party column, number, debit, credit, rank, filters)`` per union branch."""
+        return (
+            ('invoice', self.invoice, self.invoice_party, self.invoice.invoice_number,
+             self.invoice.final_amount, literal(0.0), 0, [self.invoice.payment_type == 'credit']),
+            (self.payment_kind, self.payment, self.payment_party, self.payment_number,
+             literal(0.0), self.payment.amount, 1, []),
+        )
+
+ACCOUNTS = {
+    'customer': Account(Customer, SalesInvoice, SalesInvoice.customer_id, PaymentReceipt, PaymentReceipt.customer_id,
+                        PaymentReceipt.receipt_number, 'receipt', 'العميل غير موجود'),
+    'supplier': Account(Supplier, PurchaseInvoice, PurchaseInvoice.supplier_id, PaymentVoucher, PaymentVoucher.supplier_id,
+                        PaymentVoucher.voucher_number, 'voucher', 'المورد غير موجود'),
+}
+
+def entries(account, party_id, start=None, end=None, after=None, limit=None):
+    """The account's entries as a ``UNION ALL`` subquery.
+
+    ``start``/``end`` bound ``created_at`` (``end`` excluded), ``after``
+    is a ``(created_at, sequence)`` keyset position and ``limit`` keeps
+    only the first rows of each branch from there.
+    """
+    branches = []
+    for kind, model, party_column, number, debit, credit, rank, filters in account.sources():
+        sequence = model.id * 2 + rank
+        branch = select(
+            literal(kind).label('kind'),
+            model.id.label('id'),
+            number.label('number'),
+            model.created_at.label('created_at'),
+            sequence.label('sequence'),
+            debit.label('debit'),
+            credit.label('credit'),
+            model.notes.label('notes')
+        ).where(party_column == party_id, *filters)
+        if start is not None:
+            branch = branch.where(model.created_at >= start)
+        if end is not None:
+            branch = branch.where(model.created_at < end)
+        if after is not None:
+            created_at, position = after
+            # created_at >= يبقي البحث نطاقاً على الفهرس، و OR تحسم التعادل
+            branch = branch.where(model.created_at >= created_at, or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, sequence > position)
+            ))
+        if limit is not None:
+            # SQLite لا يقبل ORDER BY/LIMIT داخل فرع UNION إلا كاستعلام فرعي
+            branch = select(branch.order_by(model.created_at, model.id).limit(limit).subquery())
+        branches.append(branch)
+    return union_all(*branches).subquery('entries')
+
+def summary(account, party_id, start=None, end=None):
+    """``(name, balance, opening, total_debit, total_credit)`` of the account for the range.
+
+    The opening balance is the party's current balance less everything
+    posted from ``start`` on, so it also covers a balance entered before
+    any document. Returns None when the party does not exist.
+    """
+    later = entries(account, party_id, start=start)
+    in_range = later.c.created_at < end if end is not None else true()
+    totals = select(
+        func.coalesce(func.sum(later.c.debit - later.c.credit), 0).label('posted'),
+        func.coalesce(func.sum(case((in_range, later.c.debit), else_=0)), 0).label('total_debit'),
+        func.coalesce(func.sum(case((in_range, later.c.credit), else_=0)), 0).label('total_credit')
+    ).subquery()
+    party = account.party
+    return select(
+        party.name,
+        party.balance,
+        (party.balance - totals.c.posted).label('opening'),
+        totals.c.total_debit,
+        totals.c.total_credit
+    ).select_from(party).join(totals, true()).where(party.id == party_id)
+
+def page(account, party_id, start=None, end=None, after=None, limit=50):
+    """Up to ``limit`` entries from ``after`` on, each with ``running``, the window sum of ``debit - credit``."""
+    merged = entries(account, party_id, start, end, after, limit)
+    order = (merged.c.created_at, merged.c.sequence)
+    running = func.sum(merged.c.debit - merged.c.credit).over(order_by=order, rows=(None, 0))
+    return select(merged, running.label('running')).order_by(*order).limit(limit)
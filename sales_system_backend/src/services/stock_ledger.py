@@ -0,0 +1,185 @@
+"""Inventory ledger and point-in-time stock.
+
+Every change to ``Product.stock_quantity`` appends ``inventory_movements``
+rows in the same transaction: invoices write ``in``/``out`` lines with the
+invoice as reference, manual edits and imports write signed
+``adjustment`` lines. The ledger of a product therefore always sums to its
+current stock.
+
+``take_snapshot`` (run periodically with ``flask snapshot-stock``) stores
+the stock of every product that moved since its previous snapshot, so the
+stock at any moment is the nearest snapshot before it plus the few
+movements in between, both read through the ``(product_id, ...)``
+indexes instead of replaying the whole history. A back-dated movement (an
+offline invoice) drops the snapshots it falls before; the next snapshot
+run recreates them.
+"""
+from src.models.user import User
+from src.models.inventory import Product
+from src.models.invoices import SalesInvoice, SalesInvoiceItem, PurchaseInvoice, PurchaseInvoiceItem
+from src.models.operations import InventoryMovement, StockSnapshot
+from datetime import datetime
+from sqlalchemy import DateTime, and_, case, delete, exists, func, insert, literal, select
+from sqlalchemy.orm import aliased
+
+# بداية السجل للمنتجات التي ليس لها لقطة بعد
+BEGINNING = datetime(1970, 1, 1)
+
+# مصادر حركات الفواتير: (reference_type، نوع الحركة، الفاتورة، البنود)
+INVOICE_SOURCES = (
+    ('sale', 'out', SalesInvoice, SalesInvoiceItem),
+    ('purchase', 'in', PurchaseInvoice, PurchaseInvoiceItem),
+)
+
+def signed_quantity():
+    """The movement's effect on stock: ``out`` subtracts, ``in`` and ``adjustment`` add."""
+    return case(
+        (InventoryMovement.movement_type == 'out', -InventoryMovement.quantity),
+        else_=InventoryMovement.quantity
+    )
+
+def record(executor, deltas, reference_type, reference_id, user_id, created_at=None, adjustment=False, notes=None):
+    """Append one movement per product of ``deltas`` (``{product_id: signed change}``).
+
+    ``executor`` is the session or connection the stock change was made
+    on. Pass ``created_at`` only for a change back-dated to the past: its
+    snapshots from that moment on are dropped.
+    """
+    moment = created_at or datetime.utcnow()
+    rows = []
+    for product_id, delta in deltas.items():
+        if not delta:
+            continue
+        if adjustment:
+            movement_type, quantity = 'adjustment', delta
+        else:
+            movement_type, quantity = ('in' if delta > 0 else 'out'), abs(delta)
+        rows.append({
+            'product_id': product_id,
+            'movement_type': movement_type,
+            'quantity': quantity,
+            'reference_type': reference_type,
+            'reference_id': reference_id,
+            'user_id': user_id,
+            'notes': notes,
+            'created_at': moment,
+        })
+    if not rows:
+        return
+    executor.execute(insert(InventoryMovement), rows)
+    if created_at is not None:
+        executor.execute(delete(StockSnapshot).where(
+            StockSnapshot.product_id.in_([row['product_id'] for row in rows]),
+            StockSnapshot.taken_at >= created_at
+        ))
+
+# -- المخزون في لحظة معينة ---------------------------------------------------------
+
+def _before(column, moment, inclusive):
+    return column <= moment if inclusive else column < moment
+
+def stock_at(moment, inclusive=True):
+    """``SELECT product_id, quantity`` for every product as of ``moment``.
+
+    With ``inclusive=False`` movements made exactly at ``moment`` are left
+    out (stock at the start of a day). Narrow it further with ``where``
+    on ``Product`` columns.
+    """
+    candidate = aliased(StockSnapshot)
+    latest = select(
+        func.max(candidate.taken_at)
+    ).where(
+        candidate.product_id == Product.id,
+        _before(candidate.taken_at, moment, inclusive)
+    ).scalar_subquery()
+    moved = select(
+        func.coalesce(func.sum(signed_quantity()), 0)
+    ).where(
+        InventoryMovement.product_id == Product.id,
+        InventoryMovement.created_at > func.coalesce(StockSnapshot.taken_at, BEGINNING),
+        _before(InventoryMovement.created_at, moment, inclusive)
+    ).scalar_subquery()
+    return select(
+        Product.id.label('product_id'),
+        (func.coalesce(StockSnapshot.quantity, 0) + moved).label('quantity')
+    ).select_from(Product).outerjoin(StockSnapshot, and_(
+        StockSnapshot.product_id == Product.id,
+        StockSnapshot.taken_at == latest
+    ))
+
+def take_snapshot(connection, moment=None):
+    """Snapshot the stock of every product that moved since its last snapshot.
+
+    Returns the number of snapshot rows written.
+    """
+    moment = moment or datetime.utcnow()
+    moved = exists().where(
+        InventoryMovement.product_id == Product.id,
+        InventoryMovement.created_at > func.coalesce(StockSnapshot.taken_at, BEGINNING),
+        InventoryMovement.created_at <= moment
+    )
+    query = stock_at(moment).add_columns(literal(moment, DateTime)).where(moved)
+    result = connection.execute(
+        insert(StockSnapshot).from_select(['product_id', 'quantity', 'taken_at'], query)
+    )
+    return result.rowcount
+
+# -- بناء السجل لبيانات موجودة ---------------------------------------------------
+
+def backfill(connection):
+    """Write the movements missing for existing data, then take a snapshot.
+
+    Each invoice without ledger rows gets one movement per product at the
+    invoice time; then every product whose ledger does not add up to its
+    ``stock_quantity`` gets an ``opening`` adjustment for the difference,
+    dated before its first movement. Safe to run again.
+
+    Returns ``(movements_written, snapshot_rows)``.
+    """
+    written = 0
+    for reference_type, movement_type, invoice_model, item_model in INVOICE_SOURCES:
+        recorded = exists().where(
+            InventoryMovement.reference_type == reference_type,
+            InventoryMovement.reference_id == invoice_model.id
+        )
+        lines = select(
+            item_model.product_id,
+            literal(movement_type),
+            func.sum(item_model.quantity),
+            literal(reference_type),
+            invoice_model.id,
+            invoice_model.user_id,
+            invoice_model.created_at
+        ).join(
+            invoice_model, item_model.invoice_id == invoice_model.id
+        ).where(~recorded).group_by(invoice_model.id, item_model.product_id)
+        written += connection.execute(insert(InventoryMovement).from_select(
+            ['product_id', 'movement_type', 'quantity', 'reference_type', 'reference_id', 'user_id', 'created_at'],
+            lines
+        )).rowcount
+
+    # الفرق بين المخزون الحالي ومجموع السجل هو رصيد أول المدة
+    ledger = select(
+        func.coalesce(func.sum(signed_quantity()), 0)
+    ).where(InventoryMovement.product_id == Product.id).scalar_subquery()
+    first_movement = select(
+        func.min(InventoryMovement.created_at)
+    ).where(InventoryMovement.product_id == Product.id).scalar_subquery()
+    admin_id = select(func.min(User.id)).where(User.role == 'admin').scalar_subquery()
+    opening = select(
+        Product.id,
+        literal('adjustment'),
+        Product.stock_quantity - ledger,
+        literal('opening'),
+        admin_id,
+        literal('رصيد أول المدة'),
+        case(
+            (first_movement < Product.created_at, first_movement),
+            else_=func.coalesce(Product.created_at, first_movement, literal(datetime.utcnow(), DateTime))
+        )
+    ).where(Product.stock_quantity != ledger, admin_id.is_not(None))
+    written += connection.execute(insert(InventoryMovement).from_select(
+        ['product_id', 'movement_type', 'quantity', 'reference_type', 'user_id', 'notes', 'created_at'],
+        opening
+    )).rowcount
+    return written, take_snapshot(connection)
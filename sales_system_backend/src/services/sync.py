@@ -0,0 +1,93 @@
+from src.models.user import db
+from src.models.inventory import Category, Product, Customer, Supplier
+from src.models.operations import SyncTombstone
+from datetime import datetime, timedelta
+from sqlalchemy import event, select
+import base64
+
+# الجداول التي تُزامَن مع أجهزة نقاط البيع والموبايل
+SYNCED_MODELS = {
+    'category': Category,
+    'product': Product,
+    'customer': Customer,
+    'supplier': Supplier,
+}
+
+# نعيد إرسال ما تغيّر قبل الرمز بقليل حتى لا تضيع معاملات طويلة
+# بدأت قبل آخر مزامنة ولم تُثبَّت إلا بعدها؛ العميل يستبدل الصف بنفسه
+SYNC_OVERLAP = timedelta(seconds=30)
+# سجلات الحذف الأقدم من هذا تُحذف، والعميل الأقدم منها يعيد التحميل كاملاً
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+class InvalidToken(ValueError):
+    pass
+
+def encode_token(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip('=')
+
+def decode_token(token):
+    """Return the server time stored in a change token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        return datetime.fromisoformat(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidToken('رمز المزامنة غير صالح')
+
+def _register(model, kind):
+    def on_delete(mapper, connection, target):
+        connection.execute(SyncTombstone.__table__.insert().values(
+            entity=kind,
+            ref_id=target.id,
+            deleted_at=datetime.utcnow()
+        ))
+
+    event.listen(model, 'after_delete', on_delete)
+
+for _kind, _model in SYNCED_MODELS.items():
+    _register(_model, _kind)
+
+def _plain(row):
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row._mapping.items()
+    }
+
+def changes(since=None, kinds=None, batch_size=500):
+    """Yield ``(kind, op, payload)`` for every change after ``since``.
+
+    Deletions come first, so a client replaying the stream in order ends
+    with the right state even if SQLite reused a deleted id. Without
+    ``since`` every row is yielded and there are no deletions. Rows are
+    fetched ``batch_size`` at a time from the ``updated_at`` index.
+    """
+    kinds = kinds or list(SYNCED_MODELS)
+
+    if since is not None:
+        tombstones = select(
+            SyncTombstone.entity, SyncTombstone.ref_id
+        ).where(
+            SyncTombstone.deleted_at >= since - SYNC_OVERLAP,
+            SyncTombstone.entity.in_(kinds)
+        ).order_by(SyncTombstone.deleted_at, SyncTombstone.id)
+        for entity, ref_id in db.session.execute(tombstones.execution_options(yield_per=batch_size)):
+            yield entity, 'delete', {'id': ref_id}
+
+    for kind in kinds:
+        model = SYNCED_MODELS[kind]
+        query = select(model.__table__).order_by(model.updated_at, model.id)
+        if since is not None:
+            query = query.where(model.updated_at >= since - SYNC_OVERLAP)
+        for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+            yield kind, 'upsert', _plain(row)
+
+def needs_reset(since):
+    """True when tombstones for part of the interval may already be pruned."""
+    return since < datetime.utcnow() - TOMBSTONE_RETENTION
+
+def prune_tombstones():
+    """Delete tombstones older than the retention window. Returns the count."""
+    result = db.session.execute(SyncTombstone.__table__.delete().where(
+        SyncTombstone.deleted_at < datetime.utcnow() - TOMBSTONE_RETENTION
+    ))
+    db.session.commit()
+    return result.rowcount
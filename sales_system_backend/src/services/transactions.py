@@ -0,0 +1,39 @@
+from src.models.user import db
+from functools import wraps
+from sqlalchemy.exc import OperationalError, DBAPIError
+from sqlalchemy.orm.exc import StaleDataError
+import time
+
+# رموز PostgreSQL لفشل التسلسل والجمود (deadlock)
+_RETRYABLE_PGCODES = {'40001', '40P01'}
+
+def is_conflict(error):
+    """True for errors that a fresh attempt of the same transaction can fix."""
+    if isinstance(error, StaleDataError):
+        return True
+    if isinstance(error, OperationalError) and 'database is locked' in str(error.orig):
+        return True
+    if isinstance(error, DBAPIError):
+        return getattr(error.orig, 'pgcode', None) in _RETRYABLE_PGCODES
+    return False
+
+def retry_on_conflict(attempts=3, backoff=0.05):
+    """Re-run a function that ends in ``db.session.commit()`` on write conflicts.
+
+    A stale optimistic version, a locked SQLite database or a PostgreSQL
+    serialization failure rolls the session back and retries with a short
+    exponential backoff; any other error propagates unchanged.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as error:
+                    db.session.rollback()
+                    if attempt == attempts - 1 or not is_conflict(error):
+                        raise
+                    time.sleep(backoff * (2 ** attempt))
+        return wrapper
+    return decorator
@@ -0,0 +1,12 @@
+"""Production entry point.
+
+    flask --app src.wsgi init-db          # once per deployment
+    gunicorn -w 4 -b 0.0.0.0:5000 src.wsgi:app
+    waitress-serve --port=5000 src.wsgi:app
+
+Importing this module builds the app only; the database is first opened
+by the first request, so workers start fast and never race on the schema.
+"""
+from src.main import create_app
+
+app = create_app()
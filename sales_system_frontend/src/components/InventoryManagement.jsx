@@ -518,8 +518,8 @@ const InventoryManagement = () => {
                       <tr key={movement.id} className="border-t">
                         <td className="p-3">{movement.product_name}</td>
                         <td className="p-3">
-                          <Badge className={movement.movement_type === 'in' ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'}>
-                            {movement.movement_type === 'in' ? 'إدخال' : 'إخراج'}
+                          <Badge className={movement.movement_type === 'in' ? 'bg-green-100 text-green-800' : movement.movement_type === 'adjustment' ? 'bg-yellow-100 text-yellow-800' : 'bg-red-100 text-red-800'}>
+                            {movement.movement_type === 'in' ? 'إدخال' : movement.movement_type === 'adjustment' ? 'تعديل' : 'إخراج'}
                           </Badge>
                         </td>
                         <td className="p-3">{movement.quantity}</td>